@@ -0,0 +1,183 @@
+"""Admission control for LLM calls: bounded concurrency, fair queue, fast 429s."""
+from __future__ import annotations
+
+import asyncio
+import math
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Deque, Dict, Optional
+
+from app.core.config import (
+    LLM_MAX_CONCURRENCY,
+    LLM_QUEUE_DEPTH,
+    LLM_QUEUE_MAX_WAIT_SECONDS,
+    LLM_QUEUE_PER_USER,
+)
+from app.core.metrics import LLM_CALLS_IN_FLIGHT, LLM_QUEUED, LLM_QUEUE_WAIT_SECONDS, LLM_REJECTED
+
+
+class AdmissionRejected(Exception):
+    """Raised when an LLM call can't be admitted; answer 429 with Retry-After."""
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(f"LLM is busy ({reason.replace('_', ' ')}), retry in {retry_after}s.")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionSlot:
+    """One admitted LLM call. release() is idempotent."""
+
+    def __init__(self, controller: Optional["AdmissionController"]):
+        self._controller = controller
+        self._acquired_at = time.monotonic()
+
+    def release(self):
+        controller, self._controller = self._controller, None
+        if controller is not None:
+            controller._release(time.monotonic() - self._acquired_at)
+
+
+class AdmissionController:
+    """
+    Lets at most max_concurrency LLM calls run; the rest wait in per-user
+    FIFO queues served round-robin, so one user's burst can't starve
+    everyone else. Requests that would overflow the queue (in total or
+    for their user), or that wait longer than max_wait_seconds, are
+    rejected at once with a Retry-After estimated from recent call times.
+
+    Only touched from the event loop thread, like WorkerPool.
+    """
+
+    def __init__(self, max_concurrency: int, max_queue: int, max_queue_per_user: int, max_wait_seconds: float):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.max_queue_per_user = max_queue_per_user
+        self.max_wait_seconds = max_wait_seconds
+        self._active = 0
+        self._queued = 0
+        # user_id -> waiters; dict order is the round-robin order
+        self._queues: "OrderedDict[str, Deque[asyncio.Future]]" = OrderedDict()
+        # Moving average of how long a call holds its slot
+        self._hold_seconds: Optional[float] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_concurrency > 0
+
+    async def acquire(self, user_id: str) -> AdmissionSlot:
+        if not self.enabled:
+            return AdmissionSlot(None)
+
+        if self._active < self.max_concurrency and not self._queued:
+            self._active += 1
+            self._update_gauges()
+            LLM_QUEUE_WAIT_SECONDS.observe(0.0, outcome="admitted")
+            return AdmissionSlot(self)
+
+        if self._queued >= self.max_queue:
+            self._reject("queue_full")
+        waiters = self._queues.get(user_id)
+        if waiters is not None and len(waiters) >= self.max_queue_per_user:
+            self._reject("user_queue_full")
+
+        future = asyncio.get_running_loop().create_future()
+        self._queues.setdefault(user_id, deque()).append(future)
+        self._queued += 1
+        self._update_gauges()
+
+        started = time.monotonic()
+        try:
+            # Shielded so a timeout leaves the future for us to inspect
+            await asyncio.wait_for(asyncio.shield(future), self.max_wait_seconds)
+        except asyncio.TimeoutError:
+            if not future.done():
+                self._dequeue(user_id, future)
+                LLM_QUEUE_WAIT_SECONDS.observe(time.monotonic() - started, outcome="timeout")
+                self._reject("wait_timeout")
+            # Granted just as the wait ran out: keep the slot
+        except asyncio.CancelledError:
+            # Client went away; hand back the slot if it had been granted
+            if future.done() and not future.cancelled():
+                self._release(0.0)
+            else:
+                self._dequeue(user_id, future)
+            LLM_QUEUE_WAIT_SECONDS.observe(time.monotonic() - started, outcome="cancelled")
+            raise
+
+        LLM_QUEUE_WAIT_SECONDS.observe(time.monotonic() - started, outcome="admitted")
+        return AdmissionSlot(self)
+
+    @asynccontextmanager
+    async def slot(self, user_id: str) -> AsyncIterator[None]:
+        """Holds an admission slot for the block."""
+        admitted = await self.acquire(user_id)
+        try:
+            yield
+        finally:
+            admitted.release()
+
+    def retry_after(self) -> int:
+        """Seconds until the current queue has likely drained."""
+        hold = self._hold_seconds if self._hold_seconds is not None else self.max_wait_seconds
+        estimate = (self._queued + 1) * hold / max(1, self.max_concurrency)
+        return max(1, math.ceil(min(estimate, max(self.max_wait_seconds, 1.0))))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "in_flight": self._active,
+            "queued": self._queued,
+            "queued_users": len(self._queues),
+            "avg_call_seconds": round(self._hold_seconds, 3) if self._hold_seconds is not None else None,
+        }
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+    def _reject(self, reason: str):
+        LLM_REJECTED.inc(reason=reason)
+        raise AdmissionRejected(reason, self.retry_after())
+
+    def _dequeue(self, user_id: str, future: asyncio.Future):
+        waiters = self._queues.get(user_id)
+        if waiters is not None and future in waiters:
+            waiters.remove(future)
+            self._queued -= 1
+            if not waiters:
+                del self._queues[user_id]
+        self._update_gauges()
+
+    def _release(self, held_seconds: float):
+        if held_seconds > 0:
+            self._hold_seconds = held_seconds if self._hold_seconds is None else (
+                0.8 * self._hold_seconds + 0.2 * held_seconds
+            )
+        # Hand the slot straight to the next user in the rotation
+        while self._queues:
+            user_id, waiters = next(iter(self._queues.items()))
+            future = waiters.popleft()
+            self._queued -= 1
+            if waiters:
+                self._queues.move_to_end(user_id)
+            else:
+                del self._queues[user_id]
+            if not future.done():
+                future.set_result(None)
+                self._update_gauges()
+                return
+        self._active -= 1
+        self._update_gauges()
+
+    def _update_gauges(self):
+        LLM_CALLS_IN_FLIGHT.set(self._active)
+        LLM_QUEUED.set(self._queued)
+
+
+# Singleton instance
+admission_controller = AdmissionController(
+    max_concurrency=LLM_MAX_CONCURRENCY,
+    max_queue=LLM_QUEUE_DEPTH,
+    max_queue_per_user=LLM_QUEUE_PER_USER,
+    max_wait_seconds=LLM_QUEUE_MAX_WAIT_SECONDS,
+)
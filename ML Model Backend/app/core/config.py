@@ -36,3 +36,112 @@ ALLOWED_ORIGINS = [
     "http://127.0.0.1:5173",
 ]
 
+
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+
+# Embedding cache: in-memory LRU in front of a SQLite file ("" disables the disk tier)
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "data/embedding_cache.sqlite")
+EMBEDDING_CACHE_MEMORY_ITEMS = int(os.getenv("EMBEDDING_CACHE_MEMORY_ITEMS", "10000"))
+EMBEDDING_CACHE_DISK_ITEMS = int(os.getenv("EMBEDDING_CACHE_DISK_ITEMS", "500000"))
+
+# Vector index snapshots ("" disables; interval 0 only snapshots on shutdown)
+VECTOR_SNAPSHOT_DIR = os.getenv("VECTOR_SNAPSHOT_DIR", "data/snapshots")
+VECTOR_SNAPSHOT_INTERVAL_SECONDS = float(os.getenv("VECTOR_SNAPSHOT_INTERVAL_SECONDS", "300"))
+VECTOR_SNAPSHOT_RETENTION = int(os.getenv("VECTOR_SNAPSHOT_RETENTION", "3"))
+
+# Embedding micro-batching across concurrent requests
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+EMBEDDING_BATCH_WAIT_MS = float(os.getenv("EMBEDDING_BATCH_WAIT_MS", "5"))
+
+# Worker pool for blocking CPU work (0 = one thread per core)
+WORKER_POOL_SIZE = int(os.getenv("WORKER_POOL_SIZE", "0"))
+WORKER_QUEUE_DEPTH = int(os.getenv("WORKER_QUEUE_DEPTH", "64"))
+
+# Shared index server for multi-worker serving (uvicorn --workers N).
+# Unix socket path of `python -m vectorstore.index_server`; "" keeps the
+# vector and record stores in this process.
+INDEX_SERVER_ADDRESS = os.getenv("INDEX_SERVER_ADDRESS", "")
+# Seconds a worker waits for the index server at startup
+INDEX_SERVER_CONNECT_TIMEOUT = float(os.getenv("INDEX_SERVER_CONNECT_TIMEOUT", "30"))
+
+# Local intent classifier: below this confidence we ask the LLM classifier instead
+INTENT_CONFIDENCE_THRESHOLD = float(os.getenv("INTENT_CONFIDENCE_THRESHOLD", "0.8"))
+
+# LLM client: "huggingface" (HF Inference API or an HF/TGI-compatible server at
+# LLM_BASE_URL) or "openai" (any OpenAI-compatible server at LLM_BASE_URL)
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", "huggingface").lower()
+LLM_BASE_URL = os.getenv("LLM_BASE_URL", "")
+LLM_API_KEY = os.getenv("LLM_API_KEY", "")
+LLM_MAX_NEW_TOKENS = int(os.getenv("LLM_MAX_NEW_TOKENS", "512"))
+LLM_POOL_SIZE = int(os.getenv("LLM_POOL_SIZE", "32"))
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "120"))
+LLM_CONNECT_TIMEOUT_SECONDS = float(os.getenv("LLM_CONNECT_TIMEOUT_SECONDS", "10"))
+LLM_WARMUP_REQUEST = os.getenv("LLM_WARMUP_REQUEST", "true").lower() in ("1", "true", "yes")
+
+# Admission control in front of LLM calls, per worker process. At most
+# LLM_MAX_CONCURRENCY calls run at once (0 = unlimited); up to
+# LLM_QUEUE_DEPTH more wait, at most LLM_QUEUE_PER_USER of them from one
+# user, served round-robin across users. Requests that would overflow the
+# queue or wait longer than LLM_QUEUE_MAX_WAIT_SECONDS get 429 + Retry-After.
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+LLM_QUEUE_DEPTH = int(os.getenv("LLM_QUEUE_DEPTH", "64"))
+LLM_QUEUE_PER_USER = int(os.getenv("LLM_QUEUE_PER_USER", "4"))
+LLM_QUEUE_MAX_WAIT_SECONDS = float(os.getenv("LLM_QUEUE_MAX_WAIT_SECONDS", "10"))
+
+# Semantic answer cache (similarity threshold is cosine over query embeddings)
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))
+ANSWER_CACHE_TTL_SECONDS = float(os.getenv("ANSWER_CACHE_TTL_SECONDS", "3600"))
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "10000"))
+
+# Shard index type: "flat" (exact), "hnsw", "ivfpq" or "sq8" (int8 scalar
+# quantization). Shards stay flat until they hold VECTOR_INDEX_TRAIN_MIN
+# vectors, then are rebuilt (and trained) as the configured type.
+VECTOR_INDEX_TYPE = os.getenv("VECTOR_INDEX_TYPE", "flat").lower()
+VECTOR_INDEX_TRAIN_MIN = int(os.getenv("VECTOR_INDEX_TRAIN_MIN", "2048"))
+VECTOR_INDEX_PCA_DIM = int(os.getenv("VECTOR_INDEX_PCA_DIM", "0"))  # 0 = no PCA
+VECTOR_INDEX_HNSW_M = int(os.getenv("VECTOR_INDEX_HNSW_M", "32"))
+VECTOR_INDEX_HNSW_EF_SEARCH = int(os.getenv("VECTOR_INDEX_HNSW_EF_SEARCH", "64"))
+VECTOR_INDEX_IVF_NLIST = int(os.getenv("VECTOR_INDEX_IVF_NLIST", "0"))  # 0 = about 4 * sqrt(n)
+VECTOR_INDEX_IVF_NPROBE = int(os.getenv("VECTOR_INDEX_IVF_NPROBE", "16"))
+VECTOR_INDEX_PQ_M = int(os.getenv("VECTOR_INDEX_PQ_M", "16"))
+
+# RAG context packing: token budget for retrieved chunks, counted with the
+# generation model's tokenizer (a chars/token estimate if it can't be loaded)
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "3000"))
+CONTEXT_TOKENIZER = os.getenv("CONTEXT_TOKENIZER", HF_MODEL)
+CONTEXT_MIN_TRUNCATED_TOKENS = int(os.getenv("CONTEXT_MIN_TRUNCATED_TOKENS", "128"))
+
+# Hierarchical transaction chunks: a month with more transactions than this
+# becomes a totals-only parent plus parts of at most this many lines, grouped
+# by category (MiniLM embeds only the first 256 word pieces, ~8 lines). 0 = off
+CHUNK_MAX_TRANSACTIONS = int(os.getenv("CHUNK_MAX_TRANSACTIONS", "8"))
+
+# Streamed syncs (/sync-user-data/stream) hand their records to the record
+# store at least this often, so an upload never sits in memory whole
+STREAM_SAVE_RECORDS = int(os.getenv("STREAM_SAVE_RECORDS", "5000"))
+
+# Model warm-up at startup: "background" (serve /health/live at once, report
+# ready when loaded), "blocking" (finish before accepting traffic) or "off"
+# (load on first request)
+STARTUP_WARMUP = os.getenv("STARTUP_WARMUP", "background").lower()
+# A warm-up that fails is retried in the background, waiting this long before
+# the first retry and doubling up to the max between later ones
+READINESS_RETRY_SECONDS = float(os.getenv("READINESS_RETRY_SECONDS", "5"))
+READINESS_RETRY_MAX_SECONDS = float(os.getenv("READINESS_RETRY_MAX_SECONDS", "300"))
+
+# Per-request sampling profiler, off unless one of the triggers is enabled:
+# a random share of requests (PROFILE_SAMPLE_RATE) or requests sent with
+# "X-Profile: 1" (PROFILE_HEADER_ENABLED). Profiles are folded-stack files
+# listed and downloaded under /admin/profiles.
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_HEADER_ENABLED = os.getenv("PROFILE_HEADER_ENABLED", "false").lower() in ("1", "true", "yes")
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "data/profiles")
+PROFILE_MAX_FILES = int(os.getenv("PROFILE_MAX_FILES", "100"))
+# Route prefixes eligible for profiling
+PROFILE_PATHS = [p.strip() for p in os.getenv("PROFILE_PATHS", "/chat,/sync-user-data").split(",") if p.strip()]
+
+# Shared secret for /admin endpoints and header-triggered profiling; unset,
+# both are refused
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
@@ -0,0 +1,69 @@
+"""Bounded worker pool for CPU-bound work (chunking, embedding, FAISS)."""
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, TypeVar
+
+from app.core.config import WORKER_POOL_SIZE, WORKER_QUEUE_DEPTH
+from app.core.profiler import active_profile, profiler
+
+T = TypeVar("T")
+
+
+class WorkerPoolFull(RuntimeError):
+    """Raised when the pool's queue is at capacity."""
+
+
+class WorkerPool:
+    """
+    Runs blocking calls off the event loop so /health and chat stay
+    responsive during big syncs.
+
+    A thread pool (not a process pool) because the shards, caches and the
+    embedding model live in this process; torch and FAISS release the GIL
+    for the heavy parts. At most max_workers + max_queue calls may be
+    in flight; beyond that callers get WorkerPoolFull immediately.
+    """
+
+    def __init__(self, max_workers: int, max_queue: int):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="cpu-worker")
+        # Only touched from the event loop thread
+        self._in_flight = 0
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    async def run(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        if self._in_flight >= self.max_workers + self.max_queue:
+            raise WorkerPoolFull("Worker pool is at capacity, try again shortly.")
+
+        loop = asyncio.get_running_loop()
+        ctx = contextvars.copy_context()
+        profile = active_profile.get()
+        if profile is not None:
+            # Sample the worker thread too while it runs this request's call
+            args = (profile, func) + args
+            func = profiler.run_in_thread
+        call = functools.partial(ctx.run, func, *args, **kwargs)
+        self._in_flight += 1
+        try:
+            return await loop.run_in_executor(self._executor, call)
+        finally:
+            self._in_flight -= 1
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+# Singleton instance
+worker_pool = WorkerPool(
+    max_workers=WORKER_POOL_SIZE or (os.cpu_count() or 1),
+    max_queue=WORKER_QUEUE_DEPTH,
+)
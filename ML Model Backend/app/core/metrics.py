@@ -0,0 +1,249 @@
+"""
+Prometheus text-format metrics (exposition format 0.0.4) without the
+client library: counters, gauges and histograms with labels, rendered by
+the /metrics route. Gauges that mirror other components' state (shard
+sizes, cache hit rates, RSS) are filled in by that route at scrape time.
+"""
+from __future__ import annotations
+
+import bisect
+import functools
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Sequence, Tuple, TypeVar
+
+T = TypeVar("T")
+
+# Seconds; spans a cached embedding lookup up to a slow LLM generation
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: Any):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def set_total(self, value: float, **labels: Any):
+        """For counters kept elsewhere (e.g. cache stats), copied in at scrape time."""
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{_labels(self.labelnames, key)} {_format_value(v)}" for key, v in values]
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def set(self, value: float, **labels: Any):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1.0, **labels: Any):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: Any):
+        self.inc(-amount, **labels)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{_labels(self.labelnames, key)} {_format_value(v)}" for key, v in values]
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts (non-cumulative) + overflow, sum]
+        self._series: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: Any):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = ([0] * (len(self.buckets) + 1), [0.0])
+            series[0][index] += 1
+            series[1][0] += value
+
+    @contextmanager
+    def time(self, **labels: Any):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            series = sorted((key, (list(counts), total[0])) for key, (counts, total) in self._series.items())
+        lines = []
+        for key, (counts, total) in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                le = 'le="' + _format_value(bound) + '"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: Metric) -> Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+def process_rss_bytes() -> int:
+    """Current resident set size; peak RSS where /proc isn't available."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        import resource
+
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+# ---------------------------------------------------------------------
+# Shared registry and the service's metrics
+# ---------------------------------------------------------------------
+registry = Registry()
+
+STAGE_SECONDS = registry.register(Histogram(
+    "insightedge_stage_duration_seconds",
+    "Time spent in one stage of the chat or sync pipeline.",
+    ("pipeline", "stage"),
+))
+HTTP_REQUEST_SECONDS = registry.register(Histogram(
+    "insightedge_http_request_duration_seconds",
+    "HTTP request latency, including streamed response bodies.",
+    ("method", "route", "status"),
+))
+HTTP_REQUESTS_IN_FLIGHT = registry.register(Gauge(
+    "insightedge_http_requests_in_flight",
+    "HTTP requests currently being served.",
+))
+LLM_CALLS_IN_FLIGHT = registry.register(Gauge(
+    "insightedge_llm_calls_in_flight",
+    "LLM calls holding an admission slot.",
+))
+LLM_QUEUED = registry.register(Gauge(
+    "insightedge_llm_queue_depth",
+    "Requests waiting for an LLM admission slot.",
+))
+LLM_QUEUE_WAIT_SECONDS = registry.register(Histogram(
+    "insightedge_llm_queue_wait_seconds",
+    "Time spent waiting for an LLM admission slot, by outcome.",
+    ("outcome",),
+))
+LLM_REJECTED = registry.register(Counter(
+    "insightedge_llm_rejected_total",
+    "LLM-bound requests turned away with 429, by reason.",
+    ("reason",),
+))
+
+
+@contextmanager
+def stage(pipeline: str, name: str):
+    """Times a block as one pipeline stage."""
+    with STAGE_SECONDS.time(pipeline=pipeline, stage=name):
+        yield
+
+
+def timed(pipeline: str, name: str, func: Callable[..., T]) -> Callable[..., T]:
+    """func wrapped to time each call as a stage, e.g. for worker_pool.run."""
+    @functools.wraps(func)
+    def wrapper(*args: Any, **kwargs: Any) -> T:
+        with stage(pipeline, name):
+            return func(*args, **kwargs)
+    return wrapper
@@ -0,0 +1,171 @@
+"""
+Opt-in sampling profiler for single requests.
+
+While a request is profiled, a sampler thread reads the stacks of the
+threads working on it every PROFILE_INTERVAL_MS: the event loop thread
+(which also runs other requests' coroutines, so its samples can include
+theirs) and any worker-pool thread running one of the request's blocking
+calls (chunking, embedding, FAISS). Stacks are written in the folded
+format ("frame;frame;frame count") that flamegraph.pl, inferno and
+speedscope read. Nothing runs, and no thread exists, until a request
+is profiled.
+"""
+from __future__ import annotations
+
+import contextvars
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, TypeVar
+
+from app.core.config import PROFILE_DIR, PROFILE_INTERVAL_MS, PROFILE_MAX_FILES
+
+T = TypeVar("T")
+
+# The profile of the request whose context is running, if any
+active_profile: contextvars.ContextVar[Optional["Profile"]] = contextvars.ContextVar("active_profile", default=None)
+
+
+@dataclass
+class Profile:
+    id: str
+    method: str
+    path: str
+    started_at: float = field(default_factory=time.time)
+    duration_s: Optional[float] = None
+    samples: int = 0
+    file: Optional[str] = None
+    stacks: Counter = field(default_factory=Counter, repr=False)
+    # thread ident -> role prefix of its stacks ("event-loop", "worker")
+    threads: Dict[int, str] = field(default_factory=dict, repr=False)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "started_at": self.started_at,
+            "duration_s": self.duration_s,
+            "samples": self.samples,
+            "distinct_stacks": len(self.stacks),
+        }
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def fold_stack(frame, root: str) -> str:
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    labels.append(root)
+    # ";" separates frames in the folded format
+    return ";".join(label.replace(";", ":") for label in reversed(labels))
+
+
+class SamplingProfiler:
+    def __init__(self, interval_ms: float, directory: str, max_files: int):
+        self.interval = interval_ms / 1000.0
+        self.directory = directory
+        self.max_files = max_files
+        self._active: List[Profile] = []
+        self._finished: "OrderedDict[str, Profile]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._thread: Optional[threading.Thread] = None
+
+    # ------------------------------------------------------------------
+    # Request lifecycle
+    # ------------------------------------------------------------------
+    def start(self, method: str, path: str) -> Profile:
+        profile = Profile(uuid.uuid4().hex[:12], method, path)
+        profile.threads[threading.get_ident()] = "event-loop"
+        with self._lock:
+            self._active.append(profile)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+                self._thread.start()
+            self._wakeup.notify()
+        return profile
+
+    def stop(self, profile: Profile):
+        with self._lock:
+            if profile in self._active:
+                self._active.remove(profile)
+        profile.duration_s = round(time.time() - profile.started_at, 4)
+        try:
+            profile.file = self._write(profile)
+        except OSError as e:
+            print(f"Warning: could not write profile {profile.id}: {e}")
+        with self._lock:
+            self._finished[profile.id] = profile
+            while len(self._finished) > self.max_files:
+                _, old = self._finished.popitem(last=False)
+                if old.file:
+                    try:
+                        os.remove(old.file)
+                    except OSError:
+                        pass
+
+    def run_in_thread(self, profile: Profile, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Runs func with the calling (worker) thread sampled for profile."""
+        ident = threading.get_ident()
+        with self._lock:
+            profile.threads[ident] = "worker"
+        try:
+            return func(*args, **kwargs)
+        finally:
+            with self._lock:
+                profile.threads.pop(ident, None)
+
+    # ------------------------------------------------------------------
+    # Sampling
+    # ------------------------------------------------------------------
+    def _run(self):
+        while True:
+            # Under the lock so stop() never writes a profile mid-sample
+            with self._lock:
+                while not self._active:
+                    self._wakeup.wait()
+                frames = sys._current_frames()
+                for profile in self._active:
+                    for ident, role in profile.threads.items():
+                        frame = frames.get(ident)
+                        if frame is not None:
+                            profile.stacks[fold_stack(frame, role)] += 1
+                    profile.samples += 1
+                del frames
+            time.sleep(self.interval)
+
+    # ------------------------------------------------------------------
+    # Stored profiles
+    # ------------------------------------------------------------------
+    def _write(self, profile: Profile) -> str:
+        os.makedirs(self.directory, exist_ok=True)
+        route = re.sub(r"[^A-Za-z0-9]+", "-", profile.path).strip("-") or "root"
+        stamp = time.strftime("%Y%m%dT%H%M%S", time.gmtime(profile.started_at))
+        path = os.path.join(self.directory, f"{stamp}-{route}-{profile.id}.folded")
+        with open(path, "w") as f:
+            for stack, count in profile.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        return path
+
+    def list(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [profile.summary() for profile in reversed(self._finished.values())]
+
+    def get(self, profile_id: str) -> Optional[Profile]:
+        with self._lock:
+            return self._finished.get(profile_id)
+
+
+# Singleton instance
+profiler = SamplingProfiler(PROFILE_INTERVAL_MS, PROFILE_DIR, PROFILE_MAX_FILES)
@@ -0,0 +1,132 @@
+"""Liveness / readiness state and the startup timing breakdown."""
+from __future__ import annotations
+
+import asyncio
+import inspect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+
+from app.core.config import READINESS_RETRY_MAX_SECONDS, READINESS_RETRY_SECONDS
+
+PENDING = "pending"
+LOADING = "loading"
+READY = "ready"
+FAILED = "failed"
+LAZY = "lazy"  # not warmed up; loads on first request
+
+
+class Readiness:
+    """
+    The process is live as soon as it serves requests; it is ready once
+    every registered component (embedding model, LLM client, restored
+    snapshot) has loaded. Each import / load phase is timed so slow cold
+    starts can be broken down. A failed load is retried in the background
+    with exponential backoff, so a transient error doesn't leave the
+    process unready for good.
+    """
+
+    def __init__(self, retry_seconds: float = 5.0, retry_max_seconds: float = 300.0):
+        self.started_at = time.time()
+        self._started = time.perf_counter()
+        self.timings: Dict[str, float] = {}
+        self.components: Dict[str, str] = {}
+        self.errors: Dict[str, str] = {}
+        self.ready_after: Optional[float] = None
+        self.retry_seconds = retry_seconds
+        self.retry_max_seconds = retry_max_seconds
+        self._retries: Dict[str, asyncio.Task] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started)
+
+    def record(self, name: str, seconds: float):
+        with self._lock:
+            self.timings[name] = round(seconds, 4)
+
+    def register(self, *names: str):
+        with self._lock:
+            for name in names:
+                self.components.setdefault(name, PENDING)
+
+    def set_state(self, name: str, state: str, error: Optional[str] = None):
+        with self._lock:
+            self.components[name] = state
+            if error is not None:
+                self.errors[name] = error
+            elif state == READY:
+                self.errors.pop(name, None)
+            if self.ready_after is None and self._all_ready():
+                self.ready_after = round(time.perf_counter() - self._started, 4)
+
+    async def load(self, name: str, func: Callable[[], Any], retry: bool = True) -> bool:
+        """
+        Runs a sync (in a thread) or async loader, tracking its state and time.
+        On failure the component is FAILED and, with retry, loaded again in
+        the background until it succeeds.
+        """
+        if await self._attempt(name, func):
+            return True
+        if retry and name not in self._retries:
+            self._retries[name] = asyncio.create_task(self._retry(name, func))
+        return False
+
+    async def _retry(self, name: str, func: Callable[[], Any]):
+        delay = self.retry_seconds
+        try:
+            while True:
+                await asyncio.sleep(delay)
+                if await self._attempt(name, func):
+                    return
+                delay = min(delay * 2, self.retry_max_seconds)
+        finally:
+            self._retries.pop(name, None)
+
+    def cancel_retries(self):
+        for task in list(self._retries.values()):
+            task.cancel()
+
+    async def _attempt(self, name: str, func: Callable[[], Any]) -> bool:
+        self.set_state(name, LOADING)
+        try:
+            with self.phase(f"load:{name}"):
+                if inspect.iscoroutinefunction(func):
+                    await func()
+                else:
+                    await asyncio.to_thread(func)
+        except Exception as e:
+            print(f"Error: loading {name} failed: {e}")
+            self.set_state(name, FAILED, str(e))
+            return False
+        self.set_state(name, READY)
+        return True
+
+    def _all_ready(self) -> bool:
+        return all(state in (READY, LAZY) for state in self.components.values())
+
+    @property
+    def ready(self) -> bool:
+        with self._lock:
+            return self._all_ready()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "ready": self._all_ready(),
+                "uptime_s": round(time.perf_counter() - self._started, 3),
+                "ready_after_s": self.ready_after,
+                "components": dict(self.components),
+                "errors": dict(self.errors),
+                "timings_s": dict(self.timings),
+            }
+
+
+# Singleton instance
+readiness = Readiness(READINESS_RETRY_SECONDS, READINESS_RETRY_MAX_SECONDS)
@@ -0,0 +1,46 @@
+"""Request latency and in-flight metrics middleware."""
+import time
+
+from fastapi import FastAPI
+
+from app.core.metrics import HTTP_REQUEST_SECONDS, HTTP_REQUESTS_IN_FLIGHT
+
+
+class MetricsMiddleware:
+    """
+    Plain ASGI middleware (not BaseHTTPMiddleware) so streamed responses
+    are timed to their last byte. Requests are labelled by the matched
+    route's template, never the raw path, to keep label cardinality bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        HTTP_REQUESTS_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_REQUESTS_IN_FLIGHT.dec()
+            # The router records the matched route in the (shared) scope
+            route = getattr(scope.get("route"), "path", "unmatched")
+            HTTP_REQUEST_SECONDS.observe(
+                time.perf_counter() - started,
+                method=scope["method"], route=route, status=status["code"],
+            )
+
+
+def setup_metrics(app: FastAPI) -> None:
+    app.add_middleware(MetricsMiddleware)
@@ -0,0 +1,62 @@
+"""Opt-in per-request profiling middleware."""
+import hmac
+import random
+
+from fastapi import FastAPI
+
+from app.core.config import ADMIN_TOKEN, PROFILE_HEADER_ENABLED, PROFILE_PATHS, PROFILE_SAMPLE_RATE
+from app.core.profiler import active_profile, profiler
+
+
+def _header(scope, name: bytes) -> str:
+    for key, value in scope["headers"]:
+        if key == name:
+            return value.decode("latin-1")
+    return ""
+
+
+class ProfilingMiddleware:
+    """
+    Profiles a request when it sends "X-Profile: 1" and the admin token
+    (never when no token is configured), or falls in the PROFILE_SAMPLE_RATE
+    sample.
+    The profile id comes back in the X-Profile-Id response header.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    def _wanted(self, scope) -> bool:
+        if not scope["path"].startswith(tuple(PROFILE_PATHS)):
+            return False
+        if PROFILE_HEADER_ENABLED and _header(scope, b"x-profile") == "1":
+            if ADMIN_TOKEN and hmac.compare_digest(_header(scope, b"x-admin-token").encode(), ADMIN_TOKEN.encode()):
+                return True
+        return PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._wanted(scope):
+            await self.app(scope, receive, send)
+            return
+
+        profile = profiler.start(scope["method"], scope["path"])
+        token = active_profile.set(profile)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-profile-id", profile.id.encode()),
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            active_profile.reset(token)
+            profiler.stop(profile)
+
+
+def setup_profiling(app: FastAPI) -> None:
+    # Not installed at all unless a trigger is enabled
+    if PROFILE_HEADER_ENABLED or PROFILE_SAMPLE_RATE > 0:
+        app.add_middleware(ProfilingMiddleware)
@@ -0,0 +1,46 @@
+"""
+Benchmark: build_chunks vs build_chunks_columnar.
+
+    python -m benchmarks.bench_chunk_builder --rows 1000000
+
+Byte-for-byte equivalence is covered by tests/test_chunk_builder.py.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import time
+
+from benchmarks.synthetic_data import make_transactions
+from utils.chunk_builder import build_chunks
+from utils.columnar_chunk_builder import build_chunks_columnar
+
+
+def timed(func, user_data):
+    started = time.perf_counter()
+    result = func(user_data)
+    return result, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    user_data = {"transactions": make_transactions(args.rows, args.seed), "budgets": [], "balance_sheets": []}
+
+    _, reference_s = timed(build_chunks, user_data)
+    columnar, columnar_s = timed(build_chunks_columnar, user_data)
+
+    print(json.dumps({
+        "rows": args.rows,
+        "chunks": len(columnar),
+        "build_chunks_s": round(reference_s, 3),
+        "build_chunks_columnar_s": round(columnar_s, 3),
+        "speedup": round(reference_s / columnar_s, 1),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
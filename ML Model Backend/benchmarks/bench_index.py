@@ -0,0 +1,85 @@
+"""
+recall@k / latency / memory of each shard index type against exact search.
+
+    python -m benchmarks.bench_index --vectors 20000 --queries 500
+    python -m benchmarks.bench_index --snapshot data/snapshots   # real shard vectors
+
+Settings come from the VECTOR_INDEX_* environment variables; flags override them.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+from dataclasses import replace
+
+import faiss
+import numpy as np
+
+from vectorstore.index_factory import INDEX_TYPES, IndexConfig, index_vectors, recall_report
+from vectorstore.shard_io import LATEST, MANIFEST, read_index
+
+
+def synthetic_vectors(n: int, dim: int, seed: int) -> np.ndarray:
+    """Unit vectors around a few hundred topics, roughly like sentence embeddings."""
+    rng = np.random.default_rng(seed)
+    topics = rng.normal(size=(max(8, n // 200), dim))
+    vectors = topics[rng.integers(0, len(topics), n)] + 0.6 * rng.normal(size=(n, dim))
+    vectors = vectors.astype(np.float32)
+    faiss.normalize_L2(vectors)
+    return vectors
+
+
+def snapshot_vectors(directory: str) -> np.ndarray:
+    """Stored vectors of every flat shard in the latest snapshot."""
+    with open(os.path.join(directory, LATEST)) as f:
+        path = os.path.join(directory, f.read().strip())
+    with open(os.path.join(path, MANIFEST)) as f:
+        manifest = json.load(f)
+
+    chunks = []
+    for files in manifest["users"].values():
+        vectors = index_vectors(read_index(os.path.join(path, files["index"])))
+        if vectors is not None:
+            chunks.append(vectors)
+    if not chunks:
+        raise SystemExit(f"No flat shards to read vectors from in {path}")
+    return np.concatenate(chunks)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--vectors", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--snapshot", help="read vectors from this snapshot directory instead")
+    parser.add_argument("--types", default=",".join(INDEX_TYPES))
+    parser.add_argument("--pca-dim", type=int)
+    parser.add_argument("--pq-m", type=int)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    config = IndexConfig.from_settings()
+    if args.pca_dim is not None:
+        config = replace(config, pca_dim=args.pca_dim)
+    if args.pq_m is not None:
+        config = replace(config, pq_m=args.pq_m)
+
+    if args.snapshot:
+        vectors = snapshot_vectors(args.snapshot)
+    else:
+        vectors = synthetic_vectors(args.vectors + args.queries, args.dim, args.seed)
+
+    # Held-out queries, perturbed so they aren't exact matches
+    rng = np.random.default_rng(args.seed + 1)
+    rng.shuffle(vectors)
+    queries = vectors[:args.queries] + 0.05 * rng.normal(size=(min(args.queries, len(vectors)), vectors.shape[1]))
+    base = vectors[args.queries:]
+
+    rows = recall_report(base, queries.astype(np.float32), config, kinds=args.types.split(","), k=args.k)
+    print(json.dumps({"vectors": len(base), "queries": len(queries), "dim": base.shape[1], "results": rows}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
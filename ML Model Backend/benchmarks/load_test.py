@@ -0,0 +1,371 @@
+"""
+End-to-end load test: mixed /chat, /chat/stream and /sync-user-data
+traffic at increasing concurrency, against a local stub LLM.
+
+    python -m benchmarks.load_test --concurrency 1,4,16,64 --duration 30 --out results/load.json
+    python -m benchmarks.load_test --target http://127.0.0.1:8000 --no-stub   # an app you started
+
+By default it starts benchmarks.stub_llm and the app (uvicorn, one
+process, LLM_PROVIDER=openai pointed at the stub; with --workers N, N
+uvicorn workers sharing a vectorstore.index_server), waits for
+/health/ready, seeds --users synthetic users through /sync-user-data,
+then runs each concurrency level for --duration seconds with closed-loop
+clients. Reports throughput, p50/p95/p99 latency and error rate per
+level and endpoint (plus time to first token for streams).
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+
+import httpx
+import numpy as np
+
+from benchmarks.synthetic_data import generate_user
+
+QUESTIONS = {
+    # Answered by retrieval + generation
+    "financial": [
+        "Why were my expenses so high in August 2025?",
+        "Which categories should I cut back on?",
+        "Summarize my dining transactions",
+        "How does my shopping compare with my budget?",
+        "What is my current ratio telling me?",
+    ],
+    # Generation only
+    "general": [
+        "hi there!",
+        "What is compound interest?",
+        "Tell me a fun fact about savings",
+    ],
+    # Exact answers from the aggregate cube, no LLM
+    "aggregate": [
+        "How much did I spend on groceries in July 2025?",
+        "What was my total income in 2025?",
+        "How many expense transactions did I have last month?",
+    ],
+}
+
+
+# ---------------------------------------------------------------------
+# Processes under test
+# ---------------------------------------------------------------------
+def create_app():
+    """The app, with the embedding model picked by LOAD_TEST_EMBEDDINGS (a factory for uvicorn workers)."""
+    import main as app_main
+
+    if os.environ.get("LOAD_TEST_EMBEDDINGS") == "hash":
+        from benchmarks.suite import HashEmbeddings
+        from vectorstore.vector_store import vector_db_instance
+
+        vector_db_instance.embedding_model.factory = HashEmbeddings
+    return app_main.app
+
+
+def serve_app(host: str, port: int, workers: int):
+    """Runs the app from this process (the harness starts it as a subprocess)."""
+    import uvicorn
+
+    if workers > 1:
+        uvicorn.run(
+            "benchmarks.load_test:create_app", factory=True,
+            host=host, port=port, workers=workers, log_level="warning",
+        )
+    else:
+        uvicorn.run(create_app(), host=host, port=port, log_level="warning")
+
+
+def start_process(args: List[str], env: Optional[Dict[str, str]] = None) -> subprocess.Popen:
+    return subprocess.Popen([sys.executable, "-m", *args], env={**os.environ, **(env or {})})
+
+
+def stop_process(process: Optional[subprocess.Popen]):
+    if process is None or process.poll() is not None:
+        return
+    process.send_signal(signal.SIGINT)
+    try:
+        process.wait(timeout=15)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+def wait_ready(url: str, timeout: float, process: Optional[subprocess.Popen] = None):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            raise SystemExit(f"Process serving {url} exited with {process.returncode}")
+        try:
+            if httpx.get(url, timeout=2).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.25)
+    raise SystemExit(f"{url} not ready after {timeout:.0f}s")
+
+
+# ---------------------------------------------------------------------
+# Traffic
+# ---------------------------------------------------------------------
+class Results:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.first_token: List[float] = []
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.error_samples: Dict[str, str] = {}
+
+    def record(self, kind: str, seconds: float, error: Optional[str] = None):
+        self.latencies[kind].append(seconds)
+        if error is not None:
+            self.errors[kind] += 1
+            self.error_samples.setdefault(kind, error[:200])
+
+
+async def chat(client: httpx.AsyncClient, results: Results, user_id: str, message: str, stream: bool):
+    body = {"user_id": user_id, "session_id": "load-test", "message": message}
+    started = time.perf_counter()
+    kind = "chat_stream" if stream else "chat"
+    try:
+        if not stream:
+            response = await client.post("/chat", json=body)
+            error = None if response.status_code == 200 else f"HTTP {response.status_code}: {response.text}"
+            results.record(kind, time.perf_counter() - started, error)
+            return
+
+        error = None
+        first_token = None
+        async with client.stream("POST", "/chat/stream", json=body) as response:
+            if response.status_code != 200:
+                error = f"HTTP {response.status_code}: {(await response.aread()).decode(errors='replace')}"
+            else:
+                async for line in response.aiter_lines():
+                    if line.startswith("event: token") and first_token is None:
+                        first_token = time.perf_counter() - started
+                    elif line.startswith("event: error"):
+                        error = "stream error event"
+        if first_token is not None:
+            results.first_token.append(first_token)
+        results.record(kind, time.perf_counter() - started, error)
+    except httpx.HTTPError as e:
+        results.record(kind, time.perf_counter() - started, f"{type(e).__name__}: {e}")
+
+
+async def sync(client: httpx.AsyncClient, results: Results, payload: Dict[str, Any]):
+    started = time.perf_counter()
+    try:
+        response = await client.post("/sync-user-data", json=payload)
+        error = None if response.status_code == 200 else f"HTTP {response.status_code}: {response.text}"
+    except httpx.HTTPError as e:
+        error = f"{type(e).__name__}: {e}"
+    results.record("sync", time.perf_counter() - started, error)
+
+
+async def client_loop(client, results, payloads, args, deadline: float, rng: random.Random):
+    mix = [(kind, weight) for kind, weight in (
+        ("financial", args.financial_ratio), ("general", args.general_ratio), ("aggregate", args.aggregate_ratio),
+    ) if weight > 0]
+    while time.perf_counter() < deadline:
+        payload = rng.choice(payloads)
+        if rng.random() < args.sync_ratio:
+            await sync(client, results, payload)
+            continue
+        kind = rng.choices([k for k, _ in mix], [w for _, w in mix])[0]
+        await chat(client, results, payload["user_id"], rng.choice(QUESTIONS[kind]), rng.random() < args.stream_ratio)
+
+
+def percentile_ms(values: List[float], q: float) -> Optional[float]:
+    return round(float(np.percentile(values, q)) * 1000, 1) if values else None
+
+
+def summarize(results: Results, elapsed: float, concurrency: int) -> Dict[str, Any]:
+    endpoints = {}
+    total = errors = 0
+    for kind, latencies in sorted(results.latencies.items()):
+        total += len(latencies)
+        errors += results.errors[kind]
+        endpoints[kind] = {
+            "requests": len(latencies),
+            "errors": results.errors[kind],
+            "error_rate": round(results.errors[kind] / len(latencies), 4),
+            "throughput_rps": round(len(latencies) / elapsed, 2),
+            "p50_ms": percentile_ms(latencies, 50),
+            "p95_ms": percentile_ms(latencies, 95),
+            "p99_ms": percentile_ms(latencies, 99),
+        }
+        if kind in results.error_samples:
+            endpoints[kind]["error_sample"] = results.error_samples[kind]
+    if results.first_token:
+        endpoints.setdefault("chat_stream", {}).update({
+            "ttft_p50_ms": percentile_ms(results.first_token, 50),
+            "ttft_p95_ms": percentile_ms(results.first_token, 95),
+            "ttft_p99_ms": percentile_ms(results.first_token, 99),
+        })
+    everything = [s for latencies in results.latencies.values() for s in latencies]
+    return {
+        "concurrency": concurrency,
+        "seconds": round(elapsed, 2),
+        "requests": total,
+        "throughput_rps": round(total / elapsed, 2),
+        "error_rate": round(errors / total, 4) if total else None,
+        "p50_ms": percentile_ms(everything, 50),
+        "p95_ms": percentile_ms(everything, 95),
+        "p99_ms": percentile_ms(everything, 99),
+        "endpoints": endpoints,
+    }
+
+
+async def run_level(base_url: str, payloads, args, concurrency: int, seed: int) -> Dict[str, Any]:
+    results = Results()
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.request_timeout, limits=limits) as client:
+        started = time.perf_counter()
+        deadline = started + args.duration
+        await asyncio.gather(*(
+            client_loop(client, results, payloads, args, deadline, random.Random(seed * 1000 + i))
+            for i in range(concurrency)
+        ))
+        elapsed = time.perf_counter() - started
+    return summarize(results, elapsed, concurrency)
+
+
+async def seed_users(base_url: str, args) -> List[Dict[str, Any]]:
+    payloads = []
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.request_timeout) as client:
+        for index in range(args.users):
+            user_id, user_data = generate_user(index, args.transactions_per_user, args.months, args.seed)
+            payload = {"user_id": f"load-{user_id}", **user_data}
+            response = await client.post("/sync-user-data", json=payload)
+            if response.status_code != 200:
+                raise SystemExit(f"Seeding {user_id} failed: {response.status_code} {response.text}")
+            payloads.append(payload)
+    return payloads
+
+
+def print_level(level: Dict[str, Any]):
+    print(
+        f"c={level['concurrency']:<4d} {level['throughput_rps']:8.2f} req/s  "
+        f"p50 {level['p50_ms']} ms  p95 {level['p95_ms']} ms  p99 {level['p99_ms']} ms  "
+        f"errors {level['error_rate']:.2%}"
+    )
+    for kind, stats in level["endpoints"].items():
+        ttft = f"  ttft p50 {stats['ttft_p50_ms']} ms" if "ttft_p50_ms" in stats else ""
+        print(
+            f"    {kind:12s} {stats.get('requests', 0):6d} req  p50 {stats.get('p50_ms')} ms  "
+            f"p95 {stats.get('p95_ms')} ms  p99 {stats.get('p99_ms')} ms  errors {stats.get('errors', 0)}{ttft}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mixed chat/sync load test against a stub LLM.")
+    parser.add_argument("--target", help="base URL of a running app (default: start one)")
+    parser.add_argument("--no-stub", action="store_true", help="don't start the stub LLM")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--app-port", type=int, default=8765)
+    parser.add_argument("--llm-port", type=int, default=8766)
+    parser.add_argument("--embeddings", choices=["hash", "model"], default="model",
+                        help="app embedding model; hash skips loading MiniLM")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="uvicorn workers; above 1 they share a vectorstore.index_server")
+    # Stub LLM behaviour
+    parser.add_argument("--ttft-ms", type=float, default=200)
+    parser.add_argument("--token-ms", type=float, default=20)
+    parser.add_argument("--tokens", type=int, default=128)
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    # Traffic
+    parser.add_argument("--concurrency", default="1,2,4,8,16,32")
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--sync-ratio", type=float, default=0.05, help="share of requests that are full syncs")
+    parser.add_argument("--stream-ratio", type=float, default=0.5, help="share of chats sent to /chat/stream")
+    parser.add_argument("--financial-ratio", type=float, default=0.6)
+    parser.add_argument("--general-ratio", type=float, default=0.2)
+    parser.add_argument("--aggregate-ratio", type=float, default=0.2)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--transactions-per-user", type=int, default=300)
+    parser.add_argument("--months", type=int, default=12)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--request-timeout", type=float, default=120)
+    parser.add_argument("--ready-timeout", type=float, default=300)
+    parser.add_argument("--out", help="write the JSON report here")
+    parser.add_argument("--serve-app", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve_app:
+        serve_app(args.host, args.app_port, args.workers)
+        return
+
+    stub = app = index_server = None
+    llm_url = f"http://{args.host}:{args.llm_port}"
+    try:
+        if not args.no_stub:
+            stub = start_process([
+                "benchmarks.stub_llm", "--host", args.host, "--port", str(args.llm_port),
+                "--ttft-ms", str(args.ttft_ms), "--token-ms", str(args.token_ms),
+                "--tokens", str(args.tokens), "--error-rate", str(args.llm_error_rate),
+            ])
+            wait_ready(f"{llm_url}/health", args.ready_timeout, stub)
+
+        base_url = args.target
+        if base_url is None:
+            base_url = f"http://{args.host}:{args.app_port}"
+            shared = {
+                "VECTOR_SNAPSHOT_DIR": "",
+                "EMBEDDING_CACHE_PATH": "",
+                "INDEX_SERVER_ADDRESS": "",
+            }
+            if args.workers > 1:
+                shared["INDEX_SERVER_ADDRESS"] = os.path.join(
+                    tempfile.gettempdir(), f"load-test-index-{os.getpid()}.sock"
+                )
+                # Workers wait for it (readiness "index_server") before reporting ready
+                index_server = start_process(["vectorstore.index_server"], env=shared)
+            app = start_process(
+                ["benchmarks.load_test", "--serve-app", "--host", args.host,
+                 "--app-port", str(args.app_port), "--workers", str(args.workers)],
+                env={
+                    **shared,
+                    "LOAD_TEST_EMBEDDINGS": args.embeddings,
+                    "LLM_PROVIDER": "openai",
+                    "LLM_BASE_URL": f"{llm_url}/v1",
+                    "LLM_API_KEY": "stub",
+                    "STARTUP_WARMUP": "blocking",
+                    # Measure the pipeline, not replays of earlier answers or state
+                    "ANSWER_CACHE_ENABLED": "false",
+                },
+            )
+        wait_ready(f"{base_url}/health/ready", args.ready_timeout, app)
+
+        payloads = asyncio.run(seed_users(base_url, args))
+        levels = []
+        for i, concurrency in enumerate(int(c) for c in args.concurrency.split(",")):
+            level = asyncio.run(run_level(base_url, payloads, args, concurrency, args.seed + i))
+            print_level(level)
+            levels.append(level)
+    finally:
+        stop_process(app)
+        stop_process(index_server)
+        stop_process(stub)
+
+    report = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "config": {k: v for k, v in vars(args).items() if k != "serve_app"},
+        "levels": levels,
+    }
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""
+Local stand-in for the generation model: an OpenAI-compatible
+/v1/chat/completions server with configurable latency and throughput.
+
+    python -m benchmarks.stub_llm --port 8766 --ttft-ms 200 --token-ms 20 --tokens 128
+
+Point the app at it with LLM_PROVIDER=openai LLM_BASE_URL=http://127.0.0.1:8766/v1.
+Classifier prompts (the ones ending "Respond with ONLY: FINANCIAL or
+GENERAL") get a one-word FINANCIAL / GENERAL answer from a keyword rule;
+every other prompt gets a canned answer streamed token by token.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import re
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Any, Dict, List
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import StreamingResponse
+
+CLASSIFIER_MARKER = "Respond with ONLY: FINANCIAL or GENERAL"
+_QUESTION = re.compile(r"User Question:\s*(.*?)\s*(?:Respond with|Final Answer|Answer:|$)", re.S)
+_FINANCIAL = re.compile(
+    r"\b(spen[dt]|spending|expenses?|income|salary|budget|transactions?|paid|payments?|rent|"
+    r"savings?|balance|assets?|liabilit(y|ies)|equity|category|categories|month|money|cost)\b",
+    re.I,
+)
+ANSWER = (
+    "Based on your records, your spending was concentrated in a few categories this period. "
+    "Rent and groceries made up the largest share of your expenses, while dining and transport "
+    "were moderate. Your income covered your expenses with a healthy margin, so your savings "
+    "grew over the month. Consider reviewing subscriptions and shopping for further savings."
+)
+
+
+@dataclass
+class StubSettings:
+    ttft_ms: float = 200.0      # time to first token
+    token_ms: float = 20.0      # per generated token after the first
+    tokens: int = 128           # answer length cap (max_tokens may lower it)
+    jitter: float = 0.1         # +/- fraction applied to each delay
+    error_rate: float = 0.0     # fraction of requests answered with HTTP 500
+
+
+settings = StubSettings()
+app = FastAPI(title="Stub LLM")
+
+
+def _delay(ms: float) -> float:
+    return max(0.0, ms * (1 + random.uniform(-settings.jitter, settings.jitter)) / 1000)
+
+
+def _prompt(messages: List[Dict[str, Any]]) -> str:
+    parts = []
+    for message in messages:
+        content = message.get("content", "")
+        if isinstance(content, list):  # content parts
+            content = " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+        parts.append(str(content))
+    return "\n".join(parts)
+
+
+def reply_tokens(prompt: str, max_tokens: int) -> List[str]:
+    if CLASSIFIER_MARKER in prompt:
+        match = _QUESTION.search(prompt)
+        question = match.group(1) if match else prompt
+        return ["FINANCIAL" if _FINANCIAL.search(question) else "GENERAL"]
+
+    words = ANSWER.split(" ")
+    count = max(1, min(settings.tokens, max_tokens))
+    return [(words[i % len(words)] + " ") for i in range(count)]
+
+
+def _usage(prompt: str, completion_tokens: int) -> Dict[str, int]:
+    prompt_tokens = max(1, len(prompt) // 4)
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+    }
+
+
+def _chunk(completion_id: str, model: str, delta: Dict[str, Any], finish_reason=None, usage=None) -> str:
+    body = {
+        "id": completion_id,
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}] if usage is None else [],
+    }
+    if usage is not None:
+        body["usage"] = usage
+    return f"data: {json.dumps(body)}\n\n"
+
+
+@app.get("/health")
+async def health():
+    return {"status": "ok", "settings": settings.__dict__}
+
+
+@app.get("/v1/models")
+async def models():
+    return {"object": "list", "data": [{"id": "stub", "object": "model", "owned_by": "stub"}]}
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    if settings.error_rate and random.random() < settings.error_rate:
+        raise HTTPException(status_code=500, detail="stub: injected error")
+
+    model = body.get("model", "stub")
+    prompt = _prompt(body.get("messages", []))
+    max_tokens = body.get("max_tokens") or body.get("max_completion_tokens") or settings.tokens
+    tokens = reply_tokens(prompt, int(max_tokens))
+    completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+
+    if not body.get("stream"):
+        await asyncio.sleep(_delay(settings.ttft_ms) + sum(_delay(settings.token_ms) for _ in tokens[1:]))
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": "".join(tokens).strip()},
+                "finish_reason": "stop",
+            }],
+            "usage": _usage(prompt, len(tokens)),
+        }
+
+    include_usage = bool((body.get("stream_options") or {}).get("include_usage"))
+
+    async def events():
+        await asyncio.sleep(_delay(settings.ttft_ms))
+        yield _chunk(completion_id, model, {"role": "assistant", "content": ""})
+        for i, token in enumerate(tokens):
+            if i:
+                await asyncio.sleep(_delay(settings.token_ms))
+            yield _chunk(completion_id, model, {"content": token})
+        yield _chunk(completion_id, model, {}, finish_reason="stop")
+        if include_usage:
+            yield _chunk(completion_id, model, {}, usage=_usage(prompt, len(tokens)))
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="OpenAI-compatible stub LLM server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--ttft-ms", type=float, default=settings.ttft_ms)
+    parser.add_argument("--token-ms", type=float, default=settings.token_ms)
+    parser.add_argument("--tokens", type=int, default=settings.tokens)
+    parser.add_argument("--jitter", type=float, default=settings.jitter)
+    parser.add_argument("--error-rate", type=float, default=settings.error_rate)
+    args = parser.parse_args()
+
+    settings.ttft_ms = args.ttft_ms
+    settings.token_ms = args.token_ms
+    settings.tokens = args.tokens
+    settings.jitter = args.jitter
+    settings.error_rate = args.error_rate
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+"""
+Component benchmark suite over synthetic users; results go to JSON so
+runs can be compared release to release.
+
+    python -m benchmarks.suite --scale small --out results/small.json
+    python -m benchmarks.suite --transactions 10000000 --users 100000 --index-users 200
+    python -m benchmarks.suite --scale small --baseline results/small.json
+
+Components timed:
+    build_chunks           build_chunks_columnar, every user
+    add_documents          VectorStore.add_documents (embedding included)
+    search                 VectorStore.search with query hints, top_k=10
+    delete_user_vectors    VectorStore.delete_user_vectors
+    sync_handler           POST /sync-user-data through the FastAPI app; a re-sync
+                           of the user just indexed, so embeddings come from the
+                           cache as they do for real re-syncs
+
+Vector-store and handler stages run on the first --index-users users.
+--embeddings hash (default) swaps MiniLM for a hashing embedder so the
+numbers track chunking / FAISS / handler cost; --embeddings model uses
+the real model. With --baseline, stages whose p50 regressed by more than
+--tolerance are listed and the exit status is 1.
+"""
+from __future__ import annotations
+
+import os
+
+# Benchmarks must not read or warm the service's persistent state
+os.environ.setdefault("EMBEDDING_CACHE_PATH", "")
+os.environ.setdefault("VECTOR_SNAPSHOT_DIR", "")
+os.environ.setdefault("ANSWER_CACHE_ENABLED", "false")
+
+import argparse
+import hashlib
+import json
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from benchmarks.synthetic_data import generate_users
+
+SCALES = {
+    "tiny": {"transactions": 1_000, "users": 1},
+    "small": {"transactions": 100_000, "users": 100},
+    "medium": {"transactions": 1_000_000, "users": 1_000},
+    "large": {"transactions": 10_000_000, "users": 100_000},
+}
+
+QUERIES = [
+    "How much did I spend on dining in July 2025?",
+    "What were my biggest expenses last month?",
+    "Show my groceries transactions",
+    "What is my current ratio?",
+    "Did I stay within my budget for shopping?",
+]
+
+
+class HashEmbeddings(Embeddings):
+    """Deterministic bag-of-words hashing into unit vectors; no model load, ~free to run."""
+
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+
+    def _embed(self, text: str) -> List[float]:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for token in text.lower().split():
+            digest = hashlib.blake2b(token.encode(), digest_size=8).digest()
+            bucket = int.from_bytes(digest[:4], "little") % self.dim
+            vector[bucket] += 1.0 if digest[4] & 1 else -1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
+
+
+class Timings:
+    """Per-call durations of one component."""
+
+    def __init__(self):
+        self.seconds: List[float] = []
+        self.items = 0
+
+    def time(self, func: Callable[[], Any], items: int = 1) -> Any:
+        started = time.perf_counter()
+        result = func()
+        self.seconds.append(time.perf_counter() - started)
+        self.items += items
+        return result
+
+    def summary(self, unit: str) -> Dict[str, Any]:
+        if not self.seconds:
+            return {"calls": 0}
+        seconds = np.asarray(self.seconds)
+        total = float(seconds.sum())
+        return {
+            "calls": len(seconds),
+            unit: self.items,
+            "total_s": round(total, 4),
+            "p50_ms": round(float(np.percentile(seconds, 50)) * 1000, 3),
+            "p95_ms": round(float(np.percentile(seconds, 95)) * 1000, 3),
+            "max_ms": round(float(seconds.max()) * 1000, 3),
+            f"{unit}_per_s": round(self.items / total, 1) if total else None,
+        }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args) -> Dict[str, Any]:
+    # Imported here so the environment defaults above apply to app config
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    from app.core.config import CHUNK_MAX_TRANSACTIONS
+    from routes.sync_data import router as sync_router
+    from utils.aggregate_cube import build_cube
+    from utils.columnar_chunk_builder import build_chunks_columnar
+    from utils.query_hints import parse_query_hints
+    from vectorstore.vector_store import vector_db_instance as store
+
+    if args.embeddings == "hash":
+        store.embedding_model.factory = HashEmbeddings
+    else:
+        store.warm_up()
+
+    build, add, search, delete, sync = Timings(), Timings(), Timings(), Timings(), Timings()
+    app = FastAPI()
+    app.include_router(sync_router)
+    client = TestClient(app)
+    chunk_counts = []
+
+    users = generate_users(args.transactions, args.users, args.months, args.seed, args.skew)
+    for index, (user_id, user_data) in enumerate(users):
+        rows = sum(len(records) for records in user_data.values())
+        chunks = build.time(lambda: build_chunks_columnar(user_data), items=rows)
+        chunk_counts.append(len(chunks))
+        if index >= args.index_users:
+            continue
+
+        add.time(lambda: store.add_documents(user_id, chunks), items=len(chunks))
+
+        cube = build_cube(user_data)
+        for query in QUERIES:
+            hints = parse_query_hints(query, cube.months, cube.categories)
+            search.time(lambda: store.search(user_id, query, top_k=10, hints=hints))
+
+        delete.time(lambda: store.delete_user_vectors(user_id))
+
+        payload = {"user_id": f"{user_id}-sync", **user_data}
+        response = sync.time(lambda: client.post("/sync-user-data", json=payload), items=rows)
+        if response.status_code != 200:
+            raise SystemExit(f"/sync-user-data failed for {user_id}: {response.status_code} {response.text}")
+        store.delete_user_vectors(f"{user_id}-sync")
+
+    return {
+        "suite_version": 1,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "git_commit": git_commit(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "config": {
+            "transactions": args.transactions,
+            "users": args.users,
+            "index_users": min(args.index_users, args.users),
+            "months": args.months,
+            "skew": args.skew,
+            "seed": args.seed,
+            "embeddings": args.embeddings,
+            "index_type": store.index_config.kind,
+            "chunk_max_transactions": CHUNK_MAX_TRANSACTIONS,
+        },
+        "chunks": {"total": int(sum(chunk_counts)), "max_per_user": int(max(chunk_counts, default=0))},
+        "results": {
+            "build_chunks": build.summary("rows"),
+            "add_documents": add.summary("chunks"),
+            "search": search.summary("queries"),
+            "delete_user_vectors": delete.summary("users"),
+            "sync_handler": sync.summary("rows"),
+        },
+    }
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Components whose p50 got slower than baseline by more than tolerance."""
+    if baseline.get("config") != report["config"]:
+        print(f"Warning: baseline ran with a different config: {baseline.get('config')}")
+    regressions = []
+    for name, result in report["results"].items():
+        before = baseline.get("results", {}).get(name, {}).get("p50_ms")
+        after = result.get("p50_ms")
+        if not before or after is None:
+            continue
+        change = after / before - 1
+        print(f"{name:22s} p50 {before:10.3f} ms -> {after:10.3f} ms ({change:+.1%})")
+        if change > tolerance:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Component benchmarks over synthetic users.")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    parser.add_argument("--transactions", type=int, help="overrides --scale")
+    parser.add_argument("--users", type=int, help="overrides --scale")
+    parser.add_argument("--index-users", type=int, default=200, help="users run through the vector store / handler")
+    parser.add_argument("--months", type=int, default=12)
+    parser.add_argument("--skew", type=float, default=1.0, help="log-normal sigma of transactions per user")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--embeddings", choices=["hash", "model"], default="hash")
+    parser.add_argument("--out", help="write the JSON report here (default: stdout only)")
+    parser.add_argument("--baseline", help="previous report to compare p50s against")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    scale = SCALES[args.scale]
+    args.transactions = args.transactions if args.transactions is not None else scale["transactions"]
+    args.users = args.users if args.users is not None else scale["users"]
+
+    report = run(args)
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        if regressions:
+            print(f"Regressed beyond {args.tolerance:.0%}: {', '.join(regressions)}")
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+"""
+Synthetic financial data shaped like CSVs/more_3m_transactions.csv
+(date, type, amount, category, paymentMethod, status, dueDate, notes),
+plus matching budgets and balance sheets, at any scale.
+
+Users are generated one at a time from (seed, user index), so a 10M
+transaction / 100k user run never holds more than one user in memory and
+any single user can be regenerated on its own.
+
+    python -m benchmarks.synthetic_data --transactions 1000000 --users 1000 --out exports/
+
+writes one directory of CSVs per user, the layout scripts.backfill reads.
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import math
+import os
+import random
+from datetime import date, timedelta
+from typing import Any, Dict, Iterator, List, Tuple
+
+# category -> (type, weight, min amount, max amount, notes), after the sample export
+CATEGORY_PROFILES = {
+    "Salary": ("income", 4, 50000, 120000, ["Monthly Salary", "Paycheck"]),
+    "Freelance": ("income", 8, 10000, 30000, ["Website fix", "Consulting Fee", "Project X Payment", "Freelance project"]),
+    "Bonus": ("income", 1, 10000, 40000, ["Performance bonus"]),
+    "Interest": ("income", 4, 1000, 5000, ["FD Interest", "Savings interest"]),
+    "Rent": ("expense", 4, 15000, 40000, ["Monthly Rent"]),
+    "Groceries": ("expense", 13, 2000, 8000, ["Weekly shopping", "Supermarket visit", "Weekly groceries"]),
+    "Utilities": ("expense", 4, 3000, 4600, ["Water bill", "Electricity bill"]),
+    "Dining": ("expense", 17, 600, 6000, ["Lunch with friends", "Dinner date", "Team dinner"]),
+    "Transport": ("expense", 15, 600, 2500, ["Cab fares", "Bus ticket"]),
+    "Entertainment": ("expense", 7, 1200, 3000, ["Movies and snacks", "Concert tickets"]),
+    "Shopping": ("expense", 7, 6000, 15000, ["Home decor", "Clothes", "New gadgets"]),
+    "Subscriptions": ("expense", 4, 1300, 1500, ["Streaming service", "Music + cloud"]),
+    "Credit Card Payment": ("expense", 4, 4000, 18500, ["Monthly Credit Card Bill", "Upcoming credit card payment"]),
+}
+CATEGORIES = list(CATEGORY_PROFILES)
+CATEGORY_WEIGHTS = [profile[1] for profile in CATEGORY_PROFILES.values()]
+PAYMENT_METHODS = ["Card", "UPI", "Cash", "Bank Transfer"]
+PAYMENT_WEIGHTS = [32, 23, 19, 18]
+PENDING_RATE = 0.12
+
+TRANSACTION_FIELDS = ["date", "type", "amount", "category", "paymentMethod", "status", "dueDate", "notes"]
+BUDGET_FIELDS = ["month", "category", "budgetAmount", "notes"]
+BALANCE_SHEET_FIELDS = ["date", "currentAssets", "currentLiabilities", "totalLiabilities", "totalEquity", "notes"]
+
+END_MONTH = date(2025, 9, 1)
+
+
+def _month_starts(months: int) -> List[date]:
+    starts = []
+    year, month = END_MONTH.year, END_MONTH.month
+    for _ in range(months):
+        starts.append(date(year, month, 1))
+        year, month = (year, month - 1) if month > 1 else (year - 1, 12)
+    return starts[::-1]
+
+
+def _days_in(month_start: date) -> int:
+    following = (month_start.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return (following - month_start).days
+
+
+def make_transactions(rows: int, seed: int = 7, months: int = 120) -> List[Dict[str, Any]]:
+    """rows transactions spread evenly at random over the last months months."""
+    rng = random.Random(seed)
+    starts = _month_starts(months)
+    categories = rng.choices(CATEGORIES, CATEGORY_WEIGHTS, k=rows)
+    payments = rng.choices(PAYMENT_METHODS, PAYMENT_WEIGHTS, k=rows)
+
+    txs = []
+    for i, (category, payment) in enumerate(zip(categories, payments)):
+        tx_type, _, low, high, notes = CATEGORY_PROFILES[category]
+        month_start = starts[rng.randrange(months)]
+        tx_date = month_start + timedelta(days=rng.randrange(_days_in(month_start)))
+        pending = tx_type == "expense" and rng.random() < PENDING_RATE
+        tx = {
+            "_id": f"tx{seed}-{i}",
+            "date": tx_date.isoformat(),
+            "type": tx_type,
+            "amount": round(rng.uniform(low, high), 2),
+            "category": category,
+            "paymentMethod": "Bank Transfer" if tx_type == "income" and payment == "Cash" else payment,
+            "status": "Pending" if pending else "Completed",
+            "notes": rng.choice(notes),
+        }
+        if pending:
+            tx["dueDate"] = (tx_date + timedelta(days=rng.randrange(3, 10))).isoformat()
+        txs.append(tx)
+    return txs
+
+
+def make_budgets(months: int, seed: int = 7) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    budgets = []
+    for month_start in _month_starts(months):
+        label = month_start.strftime("%Y-%m")
+        for category, (tx_type, weight, low, high, _) in CATEGORY_PROFILES.items():
+            if tx_type != "expense":
+                continue
+            budgets.append({
+                "_id": f"b{seed}-{label}-{category}",
+                "month": label,
+                "category": category,
+                "budgetAmount": float(round(high * max(1, weight // 4) * rng.uniform(0.8, 1.2), -2)),
+                "notes": f"{month_start.strftime('%B')} budget",
+            })
+    return budgets
+
+
+def make_balance_sheets(months: int, seed: int = 7) -> List[Dict[str, Any]]:
+    """Mid-month and month-end snapshots."""
+    rng = random.Random(seed)
+    equity = rng.uniform(100000, 300000)
+    sheets = []
+    for month_start in _month_starts(months):
+        for day, note in ((15, "Mid-month snapshot"), (_days_in(month_start), "Month-end snapshot")):
+            equity *= rng.uniform(0.98, 1.04)
+            liabilities = equity * rng.uniform(0.5, 0.8)
+            current_liabilities = liabilities * rng.uniform(0.6, 0.8)
+            sheets.append({
+                "_id": f"bs{seed}-{month_start.isoformat()}-{day}",
+                "date": month_start.replace(day=day).isoformat(),
+                "currentAssets": round(current_liabilities * rng.uniform(1.2, 1.8), 2),
+                "currentLiabilities": round(current_liabilities, 2),
+                "totalLiabilities": round(liabilities, 2),
+                "totalEquity": round(equity, 2),
+                "notes": note,
+            })
+    return sheets
+
+
+def user_sizes(transactions: int, users: int, seed: int = 7, skew: float = 1.0) -> List[int]:
+    """
+    Transactions per user, summing to transactions. Log-normal, so a few
+    heavy users carry much of the volume; skew 0 gives equal sizes.
+    """
+    if users <= 0:
+        return []
+    rng = random.Random(seed)
+    weights = [math.exp(rng.gauss(0, skew)) for _ in range(users)]
+    scale = transactions / sum(weights)
+    sizes = [int(w * scale) for w in weights]
+    # Hand out the rounding remainder to the largest fractional parts
+    remainder = transactions - sum(sizes)
+    by_fraction = sorted(range(users), key=lambda i: weights[i] * scale - sizes[i], reverse=True)
+    for i in by_fraction[:remainder]:
+        sizes[i] += 1
+    return sizes
+
+
+def generate_user(index: int, transactions: int, months: int = 12, seed: int = 7) -> Tuple[str, Dict[str, List[Dict[str, Any]]]]:
+    user_seed = seed * 1_000_003 + index
+    return f"user-{index:06d}", {
+        "transactions": make_transactions(transactions, user_seed, months),
+        "budgets": make_budgets(months, user_seed),
+        "balance_sheets": make_balance_sheets(months, user_seed),
+    }
+
+
+def generate_users(
+    transactions: int, users: int, months: int = 12, seed: int = 7, skew: float = 1.0,
+) -> Iterator[Tuple[str, Dict[str, List[Dict[str, Any]]]]]:
+    """(user_id, user_data) pairs, generated lazily."""
+    for index, size in enumerate(user_sizes(transactions, users, seed, skew)):
+        yield generate_user(index, size, months, seed)
+
+
+def _write_csv(path: str, fields: List[str], rows: List[Dict[str, Any]]):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=fields, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def write_user_csvs(directory: str, user_data: Dict[str, List[Dict[str, Any]]]):
+    os.makedirs(directory, exist_ok=True)
+    _write_csv(os.path.join(directory, "Transaction.csv"), TRANSACTION_FIELDS, user_data["transactions"])
+    _write_csv(os.path.join(directory, "Budget.csv"), BUDGET_FIELDS, user_data["budgets"])
+    _write_csv(os.path.join(directory, "Balance Sheet.csv"), BALANCE_SHEET_FIELDS, user_data["balance_sheets"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write synthetic per-user CSV exports.")
+    parser.add_argument("--transactions", type=int, default=100_000)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--months", type=int, default=12)
+    parser.add_argument("--skew", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--out", required=True)
+    args = parser.parse_args()
+
+    for user_id, user_data in generate_users(args.transactions, args.users, args.months, args.seed, args.skew):
+        write_user_csvs(os.path.join(args.out, user_id), user_data)
+    print(f"Wrote {args.users} users / {args.transactions} transactions to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,22 +7,95 @@ load_dotenv()
 if os.getenv("HUGGINGFACEHUB_API_TOKEN") is None:
     raise RuntimeError("HUGGINGFACEHUB_API_TOKEN missing even after loading .env")
 
-from fastapi import FastAPI
-from routes.chat import router as chat_router
-from routes.sync_data import router as sync_router
-from routes.health import router as health_router
-from app.middleware.cors import setup_cors
+from app.core.readiness import LAZY, readiness
+
+# Import-time breakdown, reported by /health/ready
+with readiness.phase("import:total"):
+    import asyncio
+    from contextlib import asynccontextmanager
+    with readiness.phase("import:fastapi"):
+        from fastapi import FastAPI
+    with readiness.phase("import:routes.chat"):
+        from routes.chat import router as chat_router, intent_classifier
+    with readiness.phase("import:routes.sync_data"):
+        from routes.sync_data import router as sync_router
+    from routes.health import router as health_router
+    from routes.metrics import router as metrics_router
+    from routes.profiles import router as profiles_router
+    from app.middleware.cors import setup_cors
+    from app.middleware.metrics import setup_metrics
+    from app.middleware.profiling import setup_profiling
+    from app.core.config import STARTUP_WARMUP
+    from app.core.executor import worker_pool
+    from model.llm import llm_manager
+    from utils.context_packer import token_counter
+    from vectorstore.index_client import index_client
+    from vectorstore.snapshot import snapshot_manager
+    from vectorstore.vector_store import vector_db_instance
+
+
+def load_embeddings():
+    vector_db_instance.warm_up()
+    intent_classifier.warm_up()
+
+
+async def warm_up():
+    await readiness.load("embeddings", load_embeddings)
+    # Builds the pooled LLM client and opens its connection
+    await readiness.load("llm", llm_manager.warm_up)
+    # Context packing counts tokens with the generation model's tokenizer
+    await readiness.load("tokenizer", token_counter.warm_up)
+    print(f"Startup timings: {readiness.snapshot()['timings_s']}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    readiness.register("snapshot", "embeddings", "llm", "tokenizer")
+    if index_client is not None:
+        # Worker of a multi-worker deployment: the index server holds the data
+        readiness.register("index_server")
+        await readiness.load("index_server", index_client.wait_ready)
+    # Restore vectors from the last snapshot instead of waiting for re-syncs
+    if snapshot_manager is not None:
+        # Not retried: a late restore would overwrite users synced meanwhile
+        await readiness.load("snapshot", snapshot_manager.restore, retry=False)
+        snapshot_manager.start()
+    else:
+        readiness.set_state("snapshot", LAZY)
+
+    warm_task = None
+    if STARTUP_WARMUP == "blocking":
+        await warm_up()
+    elif STARTUP_WARMUP == "background":
+        warm_task = asyncio.create_task(warm_up())
+    else:
+        readiness.set_state("embeddings", LAZY)
+        readiness.set_state("llm", LAZY)
+        readiness.set_state("tokenizer", LAZY)
+    yield
+    if warm_task is not None:
+        warm_task.cancel()
+    readiness.cancel_retries()
+    worker_pool.shutdown()
+    if snapshot_manager is not None:
+        snapshot_manager.stop()
+
 
 app = FastAPI(
     title="Financial Analysis ML Backend",
-    version="1.0"
+    version="1.0",
+    lifespan=lifespan,
 )
 
 setup_cors(app)
+setup_metrics(app)
+setup_profiling(app)
 
 app.include_router(chat_router, prefix="")
 app.include_router(sync_router, prefix="")
 app.include_router(health_router, prefix="")
+app.include_router(metrics_router, prefix="")
+app.include_router(profiles_router, prefix="")
     
 # if __name__ == "__main__":
 #     import uvicorn
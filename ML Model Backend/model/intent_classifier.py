@@ -0,0 +1,111 @@
+"""Local FINANCIAL/GENERAL intent classifier over the MiniLM embeddings."""
+from __future__ import annotations
+
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+
+FINANCIAL_EXAMPLES = [
+    "What was my total spend last month?",
+    "How much did I spend on groceries in July?",
+    "Where does most of my income go?",
+    "What categories am I spending the most on?",
+    "Show me my expense summary for this year",
+    "How much money did I receive from freelance work?",
+    "What is my net savings for June 2025?",
+    "Am I over budget on entertainment?",
+    "Compare my income and expenses month by month",
+    "What was the total spend on salary last month",
+    "What are the remaining expenses of 7/3/2025",
+    "Analyze my financial data and give me some insights",
+    "Which transactions are still pending?",
+    "How much did I pay by card in May?",
+    "What does my balance sheet look like?",
+    "What is my debt to equity ratio?",
+    "How much did I spend on rent and utilities?",
+    "Tell me something about my financial data",
+    "What categories should I reduce spending on?",
+    "Did my expenses go up compared to the previous month?",
+]
+
+GENERAL_EXAMPLES = [
+    "Hi",
+    "Hello there!",
+    "Good morning",
+    "How are you?",
+    "Thanks a lot!",
+    "Who are you?",
+    "What can you do?",
+    "Tell me a joke",
+    "What is the capital of France?",
+    "Explain what inflation means",
+    "What is a mutual fund?",
+    "How does compound interest work in general?",
+    "Write a short poem about the sea",
+    "What's the weather like today?",
+    "Can you help me with a Python question?",
+    "Bye, see you later",
+    "What is the difference between stocks and bonds?",
+    "Recommend a good book to read",
+    "Translate hello into Spanish",
+    "What time is it in Tokyo?",
+]
+
+
+class IntentClassifier:
+    """
+    Nearest-centroid classifier over labelled example prompts.
+
+    Returns the label and a softmax confidence over the cosine similarities
+    to each centroid; callers fall back to the LLM classifier when the
+    confidence is below their threshold.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        examples: Optional[Dict[str, Sequence[str]]] = None,
+        temperature: float = 0.05,
+    ):
+        self.embeddings = embeddings
+        self.examples = examples or {"FINANCIAL": FINANCIAL_EXAMPLES, "GENERAL": GENERAL_EXAMPLES}
+        self.temperature = temperature
+        self._labels: List[str] = []
+        self._centroids: Optional[np.ndarray] = None
+        self._lock = threading.Lock()
+
+    def _ensure_centroids(self) -> np.ndarray:
+        if self._centroids is None:
+            with self._lock:
+                if self._centroids is None:
+                    labels, centroids = [], []
+                    for label, texts in self.examples.items():
+                        vectors = np.asarray(self.embeddings.embed_documents(list(texts)), dtype=np.float32)
+                        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True) + 1e-12
+                        centroid = vectors.mean(axis=0)
+                        labels.append(label)
+                        centroids.append(centroid / (np.linalg.norm(centroid) + 1e-12))
+                    self._labels = labels
+                    self._centroids = np.stack(centroids)
+        return self._centroids
+
+    def warm_up(self):
+        self._ensure_centroids()
+
+    def classify_vector(self, vector: Sequence[float]) -> Tuple[str, float]:
+        """Classifies an already-embedded query. Returns (label, confidence)."""
+        centroids = self._ensure_centroids()
+        query = np.asarray(vector, dtype=np.float32)
+        query = query / (np.linalg.norm(query) + 1e-12)
+
+        sims = centroids @ query
+        logits = (sims - sims.max()) / self.temperature
+        probs = np.exp(logits) / np.exp(logits).sum()
+        best = int(np.argmax(probs))
+        return self._labels[best], float(probs[best])
+
+    def classify(self, text: str) -> Tuple[str, float]:
+        return self.classify_vector(self.embeddings.embed_query(text))
@@ -1,24 +1,142 @@
+import asyncio
 import os
+import threading
+from typing import Optional
+
+import httpx
+from langchain_core.language_models import BaseChatModel
 from langchain_huggingface import HuggingFaceEndpoint, ChatHuggingFace
 
 from langchain_ollama import ChatOllama
 
+from app.core.config import (
+    HF_MODEL,
+    LLM_PROVIDER,
+    LLM_BASE_URL,
+    LLM_API_KEY,
+    LLM_MAX_NEW_TOKENS,
+    LLM_POOL_SIZE,
+    LLM_TIMEOUT_SECONDS,
+    LLM_CONNECT_TIMEOUT_SECONDS,
+    LLM_WARMUP_REQUEST,
+)
 
 
-def get_llm():
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=LLM_POOL_SIZE,
+        max_keepalive_connections=LLM_POOL_SIZE,
+        keepalive_expiry=60,
+    )
+
+
+def _timeout() -> httpx.Timeout:
+    return httpx.Timeout(LLM_TIMEOUT_SECONDS, connect=LLM_CONNECT_TIMEOUT_SECONDS)
+
+
+def _configure_hf_http_pool():
     """
-    Returns a configured HuggingFace Endpoint LLM.
-    # """
-
-    # return ChatOllama(
-    #     model="gemma3:1b"     # 100% works on 4GB VRAM
-    # )
-
-    return ChatHuggingFace(
-        llm=HuggingFaceEndpoint(
-            repo_id="google/gemma-2-2b-it",
-            task="conversational",
-            max_new_tokens=512,
-            huggingfacehub_api_token=os.getenv("HUGGINGFACEHUB_API_TOKEN"),
+    Points huggingface_hub at keep-alive pooled HTTP clients.
+    huggingface_hub >= 1.0 uses httpx client factories; older releases use
+    a requests.Session backend factory.
+    """
+    import huggingface_hub
+
+    if hasattr(huggingface_hub, "set_client_factory"):
+        huggingface_hub.set_client_factory(
+            lambda: httpx.Client(limits=_limits(), timeout=_timeout(), follow_redirects=True)
         )
-    )
+        huggingface_hub.set_async_client_factory(
+            lambda: httpx.AsyncClient(limits=_limits(), timeout=_timeout(), follow_redirects=True)
+        )
+    elif hasattr(huggingface_hub, "configure_http_backend"):
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        def session_factory():
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=LLM_POOL_SIZE, pool_maxsize=LLM_POOL_SIZE)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            return session
+
+        huggingface_hub.configure_http_backend(backend_factory=session_factory)
+
+
+class LLMClientManager:
+    """
+    Owns one long-lived chat model (and its pooled HTTP connections) for the
+    whole process, instead of building a new client per request.
+
+    LLM_PROVIDER=huggingface talks to the HF Inference API, or to any
+    HF/TGI-compatible server at LLM_BASE_URL. LLM_PROVIDER=openai talks to
+    an OpenAI-compatible server at LLM_BASE_URL (vLLM, llama.cpp, a stub).
+    """
+
+    def __init__(self):
+        self._llm: Optional[BaseChatModel] = None
+        self._lock = threading.Lock()
+
+    def get(self) -> BaseChatModel:
+        if self._llm is None:
+            with self._lock:
+                if self._llm is None:
+                    self._llm = self._build()
+        return self._llm
+
+    def _build(self) -> BaseChatModel:
+        if LLM_PROVIDER == "openai":
+            from langchain_openai import ChatOpenAI
+
+            return ChatOpenAI(
+                model=HF_MODEL,
+                base_url=LLM_BASE_URL or None,
+                api_key=LLM_API_KEY or "not-needed",
+                max_tokens=LLM_MAX_NEW_TOKENS,
+                timeout=LLM_TIMEOUT_SECONDS,
+                http_client=httpx.Client(limits=_limits(), timeout=_timeout()),
+                http_async_client=httpx.AsyncClient(limits=_limits(), timeout=_timeout()),
+            )
+
+        _configure_hf_http_pool()
+
+        # return ChatOllama(
+        #     model="gemma3:1b"     # 100% works on 4GB VRAM
+        # )
+
+        endpoint_kwargs = (
+            {"endpoint_url": LLM_BASE_URL}
+            if LLM_BASE_URL
+            else {"repo_id": HF_MODEL}
+        )
+        return ChatHuggingFace(
+            llm=HuggingFaceEndpoint(
+                **endpoint_kwargs,
+                task="conversational",
+                max_new_tokens=LLM_MAX_NEW_TOKENS,
+                timeout=LLM_TIMEOUT_SECONDS,
+                huggingfacehub_api_token=LLM_API_KEY or os.getenv("HUGGINGFACEHUB_API_TOKEN"),
+            ),
+            model_id=HF_MODEL,
+        )
+
+    async def warm_up(self):
+        """Builds the client and, if enabled, opens a pooled connection with a 1-token call."""
+        llm = self.get()
+        if not LLM_WARMUP_REQUEST:
+            return
+        try:
+            await asyncio.wait_for(llm.ainvoke("ping", max_tokens=1), LLM_CONNECT_TIMEOUT_SECONDS)
+        except Exception as e:
+            print(f"Warning: LLM warm-up request failed: {e}")
+
+
+# Singleton instance
+llm_manager = LLMClientManager()
+
+
+def get_llm():
+    """
+    Returns the shared, pooled chat model.
+    """
+    return llm_manager.get()
@@ -73,21 +73,42 @@
 
 
 
+import json
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
 from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, field_validator
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.runnables import RunnablePassthrough
 from langchain_core.output_parsers import StrOutputParser
 from model.llm import get_llm
-from vectorstore.vector_store import vector_db_instance  # shared DB
+from model.intent_classifier import IntentClassifier
+from app.core.admission import AdmissionRejected, AdmissionSlot, admission_controller
+from app.core.config import INTENT_CONFIDENCE_THRESHOLD
+from app.core.executor import worker_pool, WorkerPoolFull
+from app.core.metrics import STAGE_SECONDS, stage, timed
+from utils.answer_cache import answer_cache
+from utils.aggregate_cube import answer_aggregate, build_cube, cube_store
+from utils.context_packer import pack_context, token_counter
+from utils.query_hints import parse_query_hints
+from vectorstore.vector_store import check_user_id, vector_db_instance  # shared DB
+from vectorstore.record_store import DataVersion, record_store_instance
 
 router = APIRouter()
 
+# Local classifier over the same MiniLM embeddings used for retrieval
+intent_classifier = IntentClassifier(vector_db_instance.embeddings)
+
 class ChatRequest(BaseModel):
     user_id: str
     session_id: str
     message: str
 
+    _check_user_id = field_validator("user_id")(check_user_id)
+
 # -------------------------------
 # CLASSIFIER PROMPT (LLM #1)
 # -------------------------------
@@ -169,6 +190,135 @@ Answer:
 general_prompt = ChatPromptTemplate.from_template(GENERAL_TEMPLATE)
 
 
+def embed_and_classify(message: str):
+    """Embeds the query once (reused for retrieval) and classifies it locally."""
+    with stage("chat", "embed_query"):
+        query_vector = vector_db_instance.embeddings.embed_query(message)
+    with stage("chat", "classify"):
+        label, confidence = intent_classifier.classify_vector(query_vector)
+    return query_vector, label, confidence
+
+
+@dataclass
+class PreparedAnswer:
+    classification: str
+    query_vector: List[float]
+    data_version: DataVersion
+    prompt: Optional[ChatPromptTemplate] = None
+    inputs: Dict[str, Any] = field(default_factory=dict)
+    # Set when the answer needs no generation ("cache" or "aggregate")
+    reply: Optional[str] = None
+    reply_source: Optional[str] = None
+    context_tokens: int = 0
+
+
+def user_cube(user_id: str, version: DataVersion):
+    """The user's aggregate cube, rebuilt from the record store if missing (e.g. after a restart)."""
+    cube = cube_store.get(user_id, version)
+    if cube is None and record_store_instance.has_user(user_id):
+        cube = build_cube(record_store_instance.user_data(user_id))
+        cube_store.put(user_id, version, cube)
+    return cube
+
+
+async def prepare_answer(request: ChatRequest, llm) -> PreparedAnswer:
+    """
+    Runs classification and the answer cache lookup, answers aggregate
+    questions from the cube, otherwise runs retrieval and returns the
+    answer prompt plus its inputs. Shared by /chat and /chat/stream.
+    """
+    # A socket round trip when the index server holds the records
+    data_version = await worker_pool.run(record_store_instance.version, request.user_id)
+
+    # ----------------------------------------------------------
+    # STEP 1 — Local classifier, LLM classifier only if unsure
+    # ----------------------------------------------------------
+    query_vector, classification, confidence = await worker_pool.run(
+        embed_and_classify, request.message
+    )
+
+    # Near-identical question against the same data → reuse the answer
+    if answer_cache is not None:
+        cached = answer_cache.lookup(request.user_id, data_version, query_vector)
+        if cached is not None:
+            return PreparedAnswer(
+                classification, query_vector, data_version, reply=cached, reply_source="cache"
+            )
+
+    if confidence < INTENT_CONFIDENCE_THRESHOLD:
+        classifier_chain = classifier_prompt | llm | StrOutputParser()
+        async with admission_controller.slot(request.user_id):
+            with stage("chat", "classify_llm"):
+                classification = await classifier_chain.ainvoke({"question": request.message})
+        classification = classification.strip().upper()
+
+    print(f"Classifier Output: {classification} (local confidence {confidence:.2f})")
+
+    # ----------------------------------------------------------
+    # STEP 2 — If GENERAL → No vector search, no financial logic
+    # ----------------------------------------------------------
+    if classification == "GENERAL":
+        return PreparedAnswer(
+            classification, query_vector, data_version,
+            prompt=general_prompt,
+            inputs={"question": request.message},
+        )
+
+    # ----------------------------------------------------------
+    # STEP 3 — If FINANCIAL → exact aggregate answer, no retrieval or generation
+    # ----------------------------------------------------------
+    cube = cube_store.get(request.user_id, data_version)
+    if cube is None:
+        cube = await worker_pool.run(user_cube, request.user_id, data_version)
+    aggregate_reply = answer_aggregate(request.message, cube)
+    if aggregate_reply is not None:
+        return PreparedAnswer(
+            classification, query_vector, data_version, reply=aggregate_reply, reply_source="aggregate"
+        )
+
+    # ----------------------------------------------------------
+    # STEP 4 — Otherwise RAG search + LLM #2
+    # ----------------------------------------------------------
+    # Month / category / type hints narrow the candidates before ranking
+    hints = parse_query_hints(
+        request.message,
+        known_months=cube.months if cube is not None else (),
+        known_categories=cube.categories if cube is not None else (),
+    )
+
+    # Embedding + FAISS are CPU-bound; keep them off the event loop
+    docs = await worker_pool.run(
+        timed("chat", "vector_search", vector_db_instance.search),
+        request.user_id,
+        request.message,
+        top_k=10,
+        query_vector=query_vector,
+        hints=hints,
+    )
+    # Fit the retrieved chunks into the context token budget, best first
+    context = await worker_pool.run(timed("chat", "context_build", pack_context), docs, token_counter)
+    print(
+        f"Context: {context.tokens} tokens from {context.chunks}/{len(docs)} chunks "
+        f"({context.dropped} dropped, {context.truncated} truncated)"
+    )
+
+    return PreparedAnswer(
+        classification, query_vector, data_version,
+        prompt=rag_prompt,
+        inputs={"context": context.text, "question": request.message},
+        context_tokens=context.tokens,
+    )
+
+
+def remember_answer(request: ChatRequest, prepared: PreparedAnswer, reply: str):
+    if answer_cache is not None and reply.strip():
+        answer_cache.store(request.user_id, prepared.data_version, prepared.query_vector, reply)
+
+
+def too_busy(e: AdmissionRejected) -> HTTPException:
+    return HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
+
 # =================================================================
 #                        MAIN CHAT ENDPOINT
 # =================================================================
@@ -177,48 +327,135 @@ general_prompt = ChatPromptTemplate.from_template(GENERAL_TEMPLATE)
 async def chat(request: ChatRequest):
     try:
         llm = get_llm()
+        prepared = await prepare_answer(request, llm)
+        if prepared.reply is not None:
+            return {"reply": prepared.reply}
+
+        answer_chain = prepared.prompt | llm | StrOutputParser()
+        async with admission_controller.slot(request.user_id):
+            with stage("chat", "llm_generate"):
+                response = await answer_chain.ainvoke(prepared.inputs)
+        remember_answer(request, prepared, response)
+        return {"reply": response}
 
-        # ----------------------------------------------------------
-        # STEP 1 — Classifier LLM CALL
-        # ----------------------------------------------------------
-        classifier_chain = classifier_prompt | llm | StrOutputParser()
-        classification = classifier_chain.invoke({"question": request.message})
-        classification = classification.strip().upper()
+    except AdmissionRejected as e:
+        raise too_busy(e)
+    except WorkerPoolFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        print(f"Error in chat: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
 
-        print("Classifier Output:", classification)
-
-        # ----------------------------------------------------------
-        # STEP 2 — If GENERAL → No vector search, no financial logic
-        # ----------------------------------------------------------
-        if classification == "GENERAL":
-            answer_chain = general_prompt | llm | StrOutputParser()
-            response = answer_chain.invoke({"question": request.message})
-            return {"reply": response}
-
-        # ----------------------------------------------------------
-        # STEP 3 — If FINANCIAL → RAG search + LLM #2
-        # ----------------------------------------------------------
-        docs = vector_db_instance.search(request.user_id, request.message, top_k=10)
-        context_text = "\n\n".join([d.page_content for d in docs])
-
-        if not context_text.strip():
-            context_text = "No relevant financial records available."
-
-        print("Retrieved Context:", context_text)
-
-        rag_chain = (
-            {
-                "context": lambda x: context_text,
-                "question": lambda x: request.message
-            }
-            | rag_prompt
-            | llm
-            | StrOutputParser()
-        )
 
-        response = rag_chain.invoke({})
-        return {"reply": response}
+# =================================================================
+#                   STREAMING CHAT ENDPOINT (SSE)
+# =================================================================
+
+def sse_event(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+class AdmittedStreamingResponse(StreamingResponse):
+    """Releases the LLM admission slot however the stream ends, even if the client left before the first byte."""
 
+    def __init__(self, *args: Any, slot: AdmissionSlot, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.slot = slot
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.slot.release()
+
+
+def stream_timing(started: float, prepared_at: float, first_token_at: float, finished: float, queued_s: float = 0.0):
+    return {
+        "prepare_ms": round((prepared_at - started) * 1000, 1),
+        "queue_ms": round(queued_s * 1000, 1),
+        "time_to_first_token_ms": round((first_token_at - started) * 1000, 1),
+        "generation_ms": round((finished - prepared_at - queued_s) * 1000, 1),
+        "total_ms": round((finished - started) * 1000, 1),
+    }
+
+
+@router.post("/chat/stream")
+async def chat_stream(request: ChatRequest):
+    """
+    Same pipeline as /chat, but streams answer tokens as Server-Sent Events:
+    `token` events while generating, then one `done` event with usage and
+    timing (or an `error` event).
+    """
+    started = time.perf_counter()
+    slot = None
+    try:
+        llm = get_llm()
+        prepared = await prepare_answer(request, llm)
+        prepared_at = time.perf_counter()
+        if prepared.reply is None:
+            # Admitted before streaming starts, so overflow is a real 429
+            slot = await admission_controller.acquire(request.user_id)
+    except AdmissionRejected as e:
+        raise too_busy(e)
+    except WorkerPoolFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
-        print(f"Error in chat: {e}")
+        print(f"Error in chat_stream: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+    generation_started = time.perf_counter()
+    queued_s = generation_started - prepared_at
+
+    async def events():
+        first_token_at = None
+        chunks = 0
+        usage: Dict[str, int] = {}
+        parts: List[str] = []
+
+        if prepared.reply is not None:
+            yield sse_event("token", {"token": prepared.reply})
+            finished = time.perf_counter()
+            yield sse_event("done", {
+                "classification": prepared.classification,
+                "source": prepared.reply_source,
+                "usage": {},
+                "timing": stream_timing(started, prepared_at, finished, finished),
+            })
+            return
+
+        try:
+            async for chunk in (prepared.prompt | llm).astream(prepared.inputs):
+                if getattr(chunk, "usage_metadata", None):
+                    for key, value in chunk.usage_metadata.items():
+                        if isinstance(value, int):
+                            usage[key] = usage.get(key, 0) + value
+                if not chunk.content:
+                    continue
+                if first_token_at is None:
+                    first_token_at = time.perf_counter()
+                chunks += 1
+                parts.append(chunk.content)
+                yield sse_event("token", {"token": chunk.content})
+        except Exception as e:
+            print(f"Error in chat_stream: {e}")
+            yield sse_event("error", {"detail": str(e)})
+            return
+        finally:
+            slot.release()
+
+        finished = time.perf_counter()
+        STAGE_SECONDS.observe(finished - generation_started, pipeline="chat", stage="llm_generate")
+        STAGE_SECONDS.observe((first_token_at or finished) - generation_started, pipeline="chat", stage="llm_first_token")
+        remember_answer(request, prepared, "".join(parts))
+        usage.setdefault("output_tokens", chunks)
+        usage["context_tokens"] = prepared.context_tokens
+        yield sse_event("done", {
+            "classification": prepared.classification,
+            "source": "llm",
+            "usage": usage,
+            "timing": stream_timing(started, prepared_at, first_token_at or finished, finished, queued_s),
+        })
+
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    if slot is None:
+        return StreamingResponse(events(), media_type="text/event-stream", headers=headers)
+    return AdmittedStreamingResponse(events(), media_type="text/event-stream", headers=headers, slot=slot)
@@ -1,10 +1,26 @@
-"""Health check endpoint."""
+"""Health check endpoints: liveness and readiness."""
 from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+
 from app.core.config import HF_MODEL
+from app.core.readiness import readiness
 
 router = APIRouter()
 
 @router.get("/health")
 async def health():
     """Lightweight health check endpoint."""
-    return {"status": "ok", "service": "insightedge-chatbot", "model": HF_MODEL}
+    return {"status": "ok", "service": "insightedge-chatbot", "model": HF_MODEL, "ready": readiness.ready}
+
+
+@router.get("/health/live")
+async def live():
+    """Liveness: the event loop answers. Never waits on models."""
+    return {"status": "alive"}
+
+
+@router.get("/health/ready")
+async def ready():
+    """Readiness: 503 until the embedding model, LLM client, tokenizer and snapshot are loaded."""
+    state = readiness.snapshot()
+    return JSONResponse(state, status_code=200 if state["ready"] else 503)
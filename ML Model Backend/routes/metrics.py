@@ -0,0 +1,83 @@
+"""Prometheus /metrics endpoint."""
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.core.executor import worker_pool
+from app.core.metrics import Counter, Gauge, process_rss_bytes, registry
+from app.core.readiness import readiness
+from utils.answer_cache import answer_cache
+from vectorstore.vector_store import vector_db_instance
+
+router = APIRouter()
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# ---------------------------------------------------------------------
+# Gauges mirrored from other components at scrape time
+# ---------------------------------------------------------------------
+# Aggregates only: a per-user label would grow with the user base
+VECTORS = registry.register(Gauge(
+    "insightedge_vectors", "Vectors across all in-memory user shards."
+))
+SHARD_VECTORS_MAX = registry.register(Gauge(
+    "insightedge_shard_vectors_max", "Vectors in the largest in-memory user shard."
+))
+SHARDS = registry.register(Gauge(
+    "insightedge_shards", "User shards, in memory or still on disk (snapshot, not yet loaded).", ("state",)
+))
+EMBEDDING_CACHE_LOOKUPS = registry.register(Counter(
+    "insightedge_embedding_cache_lookups_total", "Embedding cache lookups by outcome.", ("result",)
+))
+EMBEDDING_CACHE_HIT_RATIO = registry.register(Gauge(
+    "insightedge_embedding_cache_hit_ratio", "Embedding cache hits / lookups since start."
+))
+ANSWER_CACHE_LOOKUPS = registry.register(Counter(
+    "insightedge_answer_cache_lookups_total", "Semantic answer cache lookups by outcome.", ("result",)
+))
+ANSWER_CACHE_HIT_RATIO = registry.register(Gauge(
+    "insightedge_answer_cache_hit_ratio", "Semantic answer cache hits / lookups since start."
+))
+EMBEDDING_BATCH_QUEUE = registry.register(Gauge(
+    "insightedge_embedding_batch_queue", "Embedding requests waiting for the micro-batcher."
+))
+WORKER_POOL_IN_FLIGHT = registry.register(Gauge(
+    "insightedge_worker_pool_in_flight", "Blocking calls running or queued in the worker pool."
+))
+RESIDENT_MEMORY = registry.register(Gauge(
+    "insightedge_process_resident_memory_bytes", "Resident set size of this process."
+))
+READY = registry.register(Gauge(
+    "insightedge_ready", "1 once every startup component has loaded."
+))
+
+
+def collect():
+    stats = vector_db_instance.stats()
+    # stats() leaves staging shards out
+    VECTORS.set(sum(stats["vectors"].values()))
+    SHARD_VECTORS_MAX.set(max(stats["vectors"].values(), default=0))
+    SHARDS.set(len(stats["vectors"]), state="memory")
+    SHARDS.set(stats["shards_on_disk"], state="disk")
+
+    cache = stats["embedding_cache"]
+    for result in ("memory_hits", "disk_hits", "misses"):
+        EMBEDDING_CACHE_LOOKUPS.set_total(cache[result], result=result)
+    EMBEDDING_CACHE_HIT_RATIO.set(cache["hit_rate"])
+    EMBEDDING_BATCH_QUEUE.set(stats["embedding_batcher"]["queued"])
+
+    if answer_cache is not None:
+        answers = answer_cache.stats()
+        for result in ("hits", "misses"):
+            ANSWER_CACHE_LOOKUPS.set_total(answers[result], result=result)
+        ANSWER_CACHE_HIT_RATIO.set(answers["hit_rate"])
+
+    WORKER_POOL_IN_FLIGHT.set(worker_pool.in_flight)
+    RESIDENT_MEMORY.set(process_rss_bytes())
+    READY.set(1 if readiness.ready else 0)
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Prometheus text exposition. Sync, so FastAPI runs it off the event loop."""
+    collect()
+    return PlainTextResponse(registry.render(), media_type=CONTENT_TYPE)
@@ -0,0 +1,41 @@
+"""Admin endpoints for request profiles."""
+import hmac
+from typing import Optional
+
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.responses import PlainTextResponse
+
+from app.core.config import ADMIN_TOKEN
+from app.core.profiler import profiler
+
+router = APIRouter()
+
+
+def _check_admin(token: Optional[str]):
+    # Fail closed: without a configured token the admin routes stay shut
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled; set ADMIN_TOKEN")
+    if token is None or not hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+@router.get("/admin/profiles")
+async def list_profiles(x_admin_token: Optional[str] = Header(default=None)):
+    """Recent request profiles, newest first."""
+    _check_admin(x_admin_token)
+    return {"profiles": profiler.list()}
+
+
+@router.get("/admin/profiles/{profile_id}", response_class=PlainTextResponse)
+async def get_profile(profile_id: str, x_admin_token: Optional[str] = Header(default=None)):
+    """Folded stacks of one profile, for flamegraph.pl / inferno / speedscope."""
+    _check_admin(x_admin_token)
+    profile = profiler.get(profile_id)
+    if profile is None or not profile.file:
+        raise HTTPException(status_code=404, detail=f"Profile {profile_id} not found")
+    try:
+        with open(profile.file) as f:
+            return PlainTextResponse(f.read())
+    except OSError as e:
+        print(f"Error reading profile {profile_id}: {e}")
+        raise HTTPException(status_code=404, detail=f"Profile {profile_id} not found")
@@ -1,39 +1,315 @@
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
+import asyncio
+import functools
+from fastapi import APIRouter, HTTPException, Request
+from pydantic import BaseModel, field_validator
 from typing import List, Dict, Any, Optional
-from utils.chunk_builder import build_chunks
-from vectorstore.vector_store import vector_db_instance
+from app.core.config import STREAM_SAVE_RECORDS
+from app.core.executor import worker_pool, WorkerPoolFull
+from app.core.metrics import stage
+from utils.columnar_chunk_builder import build_chunks_columnar
+from utils.delta_sync import affected_scope, select_records, chunk_in_scope, empty_scope
+from utils.stream_ingest import MonthStream, NDJSONDecoder, NDJSONError
+from utils.answer_cache import answer_cache
+from utils.aggregate_cube import build_cube, cube_store
+from vectorstore.vector_store import check_user_id, staging_shard_id, vector_db_instance
+from vectorstore.record_store import RECORD_KINDS, RecordStore, record_store_instance
 
 router = APIRouter()
 
+
+class UserNotSynced(LookupError):
+    """A delta for a user with no full sync (with Mongo _ids) to apply it to."""
+
 class SyncDataRequest(BaseModel):
     user_id: str
     transactions: List[Dict[str, Any]] = []
     budgets: List[Dict[str, Any]] = []
     balance_sheets: List[Dict[str, Any]] = []
 
+    _check_user_id = field_validator("user_id")(check_user_id)
+
+
+class RecordUpserts(BaseModel):
+    transactions: List[Dict[str, Any]] = []
+    budgets: List[Dict[str, Any]] = []
+    balance_sheets: List[Dict[str, Any]] = []
+
+
+class RecordDeletes(BaseModel):
+    transactions: List[str] = []
+    budgets: List[str] = []
+    balance_sheets: List[str] = []
+
+
+class DeltaSyncRequest(BaseModel):
+    user_id: str
+    upserts: RecordUpserts = RecordUpserts()
+    deletes: RecordDeletes = RecordDeletes()
+
+    _check_user_id = field_validator("user_id")(check_user_id)
+
+
+def replace_user_data(user_id: str, user_data: Dict[str, List[Dict[str, Any]]]) -> int:
+    """Rebuilds all of a user's chunks. Blocking; run it in the worker pool."""
+    # 1. Build chunks
+    with stage("sync", "build_chunks"):
+        chunks = build_chunks_columnar(user_data)
+
+    # 2. Embed into a staging shard; searches keep seeing the old vectors
+    staging_id = staging_shard_id(user_id, "sync")
+    try:
+        if chunks:
+            vector_db_instance.add_documents(staging_id, chunks)
+
+        with record_store_instance.user_lock(user_id):
+            # 3. Swap the new vectors in at once (no chunks: drops the old shard)
+            vector_db_instance.promote_shard(staging_id, user_id)
+
+            # 4. Keep the raw records so later deltas can rebuild single months
+            record_store_instance.replace(user_id, user_data)
+
+            # 5. Aggregate cube for exact answers to aggregate questions
+            cube_store.put(user_id, record_store_instance.version(user_id), build_cube(user_data))
+    finally:
+        # No-op after a successful promote
+        discard_staging(staging_id)
+
+    if answer_cache is not None:
+        answer_cache.invalidate_user(user_id)
+    return len(chunks)
+
+
+def apply_delta(data: "DeltaSyncRequest") -> Dict[str, Any]:
+    """Applies a delta and re-embeds the affected chunks. Blocking; run it in the worker pool."""
+    with record_store_instance.user_lock(data.user_id):
+        if not record_store_instance.has_user(data.user_id):
+            raise UserNotSynced("No synced data for this user; run a full /sync-user-data first.")
+        if record_store_instance.keyed_by_position(data.user_id):
+            # Upserts by _id would duplicate these rows instead of replacing them
+            raise UserNotSynced(
+                "This user's records have no _id (e.g. from a CSV backfill); "
+                "run a full /sync-user-data with _ids first."
+            )
+        result = _apply_delta_locked(data)
+
+    if answer_cache is not None:
+        answer_cache.invalidate_user(data.user_id)
+    return result
+
+
+def _apply_delta_locked(data: "DeltaSyncRequest") -> Dict[str, Any]:
+    user_id = data.user_id
+    previous = record_store_instance.user_data(user_id)
+
+    # 1. Apply the changes to a scratch copy, collecting old + new versions
+    #    of every touched record; the real store is untouched until step 3
+    preview = RecordStore()
+    preview.replace(user_id, previous)
+    changes = {
+        kind: (list(getattr(data.upserts, kind)), list(getattr(data.deletes, kind)))
+        for kind in RECORD_KINDS
+    }
+    touched = {
+        kind: preview.apply(user_id, kind, upserts=upserts, deletes=deletes)
+        for kind, (upserts, deletes) in changes.items()
+    }
+    updated = preview.user_data(user_id)
+
+    # 2. Rebuild and embed only the affected chunks
+    scope = affected_scope(touched)
+    with stage("sync", "build_chunks"):
+        chunks = build_chunks_columnar(select_records(updated, scope))
+    vectors = []
+    if chunks:
+        with stage("sync", "embed_documents"):
+            vectors = vector_db_instance.embeddings.embed_documents([chunk["text"] for chunk in chunks])
+
+    # 3. Commit records and vectors together; put the old records back if
+    #    the index update fails, so the next delta starts from what is indexed
+    try:
+        for kind, (upserts, deletes) in changes.items():
+            record_store_instance.apply(user_id, kind, upserts=upserts, deletes=deletes)
+        # A partial, not a lambda, so it can be sent to the index server
+        deleted = vector_db_instance.replace_documents(
+            user_id, functools.partial(chunk_in_scope, scope=scope), chunks, vectors
+        )
+    except Exception:
+        record_store_instance.replace(user_id, previous)
+        raise
+
+    # 4. Refresh the aggregate cube (vectorised, cheap next to embedding)
+    cube_store.put(user_id, record_store_instance.version(user_id), build_cube(updated))
+
+    return {
+        "status": "success",
+        "vectors_deleted": deleted,
+        "vectors_stored": len(chunks),
+        "months_rebuilt": sorted(scope["transactions"] | scope["budgets"]),
+    }
+
+
+def discard_staging(staging_id: str):
+    """Drops a sync's staging shard and staged records; no-op after a successful promote. Blocking."""
+    vector_db_instance.delete_user_vectors(staging_id)
+    record_store_instance.discard_staged(staging_id)
+
+
+def stage_chunks(staging_id: str, user_data: Dict[str, List[Dict[str, Any]]]) -> int:
+    """Chunks and embeds part of a streamed sync into the staging shard. Blocking."""
+    with stage("sync", "build_chunks"):
+        chunks = build_chunks_columnar(user_data)
+    if chunks:
+        vector_db_instance.add_documents(staging_id, chunks)
+    return len(chunks)
+
+
+def finish_stream(user_id: str, staging_id: str, months: MonthStream) -> int:
+    """
+    Rebuilds reopened months, adds budget and balance sheet chunks, then
+    swaps the staged vectors and records in for the user's. Blocking; run
+    it in the worker pool.
+    """
+    record_store_instance.append_staged(staging_id, months.take_unsaved())
+
+    # 1. Months that came back after being flushed are rebuilt from all their records
+    scope = empty_scope()
+    scope["transactions"] = months.reopened
+    vector_db_instance.delete_documents(staging_id, functools.partial(chunk_in_scope, scope=scope))
+
+    stage_chunks(staging_id, {
+        "transactions": record_store_instance.staged_records(staging_id, "transactions", months.reopened),
+        "budgets": record_store_instance.staged_records(staging_id, "budgets"),
+        "balance_sheets": record_store_instance.staged_records(staging_id, "balance_sheets"),
+    })
+
+    stored = vector_db_instance.count(staging_id)
+
+    # 2. Swap everything in at once, like replace_user_data
+    with record_store_instance.user_lock(user_id):
+        vector_db_instance.promote_shard(staging_id, user_id)
+        record_store_instance.promote_staged(staging_id, user_id)
+        cube_store.put(
+            user_id, record_store_instance.version(user_id), build_cube(record_store_instance.user_data(user_id))
+        )
+
+    if answer_cache is not None:
+        answer_cache.invalidate_user(user_id)
+    return stored
+
+
 @router.post("/sync-user-data")
 async def sync_user_data(data: SyncDataRequest):
     try:
-        # 1. Build chunks
-        
-        # print(f"balance_sheets:  {data.balance_sheets} ")
-
         user_data = {
             "transactions": data.transactions,
             "budgets": data.budgets,
             "balance_sheets": data.balance_sheets
         }
-        chunks = build_chunks(user_data)
-        
-        # 2. Delete old vectors
-        vector_db_instance.delete_user_vectors(data.user_id)
-        
-        # 3. Add new vectors
-        if chunks:
-            vector_db_instance.add_documents(data.user_id, chunks)
-            
-        return {"status": "success", "vectors_stored": len(chunks)}
+        stored = await worker_pool.run(replace_user_data, data.user_id, user_data)
+        return {"status": "success", "vectors_stored": stored}
+    except WorkerPoolFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         print(f"Error in sync_user_data: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/sync-user-data/delta")
+async def sync_user_data_delta(data: DeltaSyncRequest):
+    """
+    Applies record-level upserts/deletes (keyed by Mongo _id) and re-embeds
+    only the monthly / budget / balance sheet chunks they touch.
+    """
+    for kind in RECORD_KINDS:
+        if any(record.get("_id") is None for record in getattr(data.upserts, kind)):
+            raise HTTPException(status_code=400, detail=f"Every upserted {kind} record needs an '_id'.")
+
+    try:
+        return await worker_pool.run(apply_delta, data)
+    except UserNotSynced as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except WorkerPoolFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        print(f"Error in sync_user_data_delta: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/sync-user-data/stream")
+async def sync_user_data_stream(user_id: str, request: Request):
+    """
+    Full sync from a newline-delimited JSON body (plain or chunked transfer),
+    one {"kind": ..., "record": {...}} object per line.
+
+    Nothing is materialized up front: lines are parsed as they arrive and
+    each transaction month is chunked and embedded as soon as it completes,
+    while the next one is being read. Records go to a staging entry in the
+    record store as months complete (at least every STREAM_SAVE_RECORDS
+    records). Searches keep seeing the old vectors and records until the
+    whole stream has been ingested.
+    """
+    try:
+        check_user_id(user_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    staging_id = staging_shard_id(user_id, "stream")
+    decoder = NDJSONDecoder()
+    months = MonthStream()
+    in_flight: Optional[asyncio.Future] = None
+    records = 0
+
+    async def stage_month(transactions: List[Dict[str, Any]]):
+        # At most one month embedding while the next is parsed
+        nonlocal in_flight
+        if in_flight is not None:
+            await in_flight
+        in_flight = asyncio.ensure_future(
+            worker_pool.run(stage_chunks, staging_id, {"transactions": transactions})
+        )
+
+    async def ingest(items):
+        nonlocal records
+        for kind, record in items:
+            records += 1
+            completed = months.add(kind, record)
+            if completed:
+                await stage_month(completed)
+            if completed or months.unsaved_count >= STREAM_SAVE_RECORDS:
+                await worker_pool.run(record_store_instance.append_staged, staging_id, months.take_unsaved())
+
+    try:
+        async for data in request.stream():
+            await ingest(decoder.feed(data))
+        await ingest(decoder.close())
+
+        completed = months.finish()
+        if completed:
+            await stage_month(completed)
+        if in_flight is not None:
+            await in_flight
+
+        stored = await worker_pool.run(finish_stream, user_id, staging_id, months)
+        return {
+            "status": "success",
+            "records": records,
+            "vectors_stored": stored,
+            "months_streamed": len(months.flushed),
+            "months_reopened": len(months.reopened),
+        }
+    except NDJSONError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except WorkerPoolFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        print(f"Error in sync_user_data_stream: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        if in_flight is not None and not in_flight.done():
+            # Let the worker finish so it can't re-create the staging shard
+            await asyncio.gather(in_flight, return_exceptions=True)
+        try:
+            await worker_pool.run(discard_staging, staging_id)
+        except WorkerPoolFull:
+            # Cleanup can't be dropped; go around the pool's cap
+            await asyncio.to_thread(discard_staging, staging_id)
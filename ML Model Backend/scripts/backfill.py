@@ -0,0 +1,284 @@
+"""
+Offline bulk backfill: builds index shards for many users straight from CSV
+exports and writes them as a snapshot the API restores on startup.
+
+Input is one directory per user, named by user id, holding the CSVs/
+layout:
+
+    exports/
+      <user_id>/
+        Transaction.csv             (plus any other *transactions*.csv)
+        Budget.csv                  (optional)
+        Balance Sheet.csv           (optional)
+
+    python -m scripts.backfill exports/ --workers 8
+
+Chunking and embedding run in a process pool; each worker writes its
+shards into the new snapshot directly. Users already in the latest
+snapshot are carried over (hard-linked) unless --no-merge is given.
+
+Every row needs the record's Mongo _id (an "_id" column, as mongoexport
+writes it) so later /sync-user-data/delta calls replace rows instead of
+duplicating them. --allow-missing-ids keys such rows by position; the API
+then refuses deltas for those users until their next full sync.
+
+The API and index server hold the snapshot directory while running; stop
+them first (the backfill refuses to start otherwise) and restart them to
+pick up the new snapshot.
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import glob
+import json
+import os
+import pickle
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import EMBEDDING_MODEL, VECTOR_SNAPSHOT_DIR
+from utils.columnar_chunk_builder import build_chunks_columnar
+from vectorstore.index_factory import IndexConfig, build_index, needs_rebuild
+from vectorstore.record_store import RecordStore
+from vectorstore.shard_io import (
+    LATEST,
+    MANIFEST,
+    link_or_copy,
+    lock_directory,
+    shard_name,
+    write_latest,
+    write_shard,
+)
+
+TRANSACTION_FILES = ("Transaction.csv", "*transactions*.csv")
+BUDGET_FILE = "Budget.csv"
+BALANCE_SHEET_FILE = "Balance Sheet.csv"
+
+# Columns the API receives as numbers from Mongo
+NUMERIC_FIELDS = {
+    "transactions": ("amount",),
+    "budgets": ("budgetAmount",),
+    "balance_sheets": ("currentAssets", "currentLiabilities", "totalLiabilities", "totalEquity"),
+}
+
+
+# ---------------------------------------------------------------------
+# CSV loading
+# ---------------------------------------------------------------------
+def read_records(path: str, kind: str, require_ids: bool = True) -> List[Dict[str, Any]]:
+    """Rows shaped like the /sync-user-data payload: empty cells dropped, amounts as floats."""
+    records = []
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        for line, row in enumerate(csv.DictReader(f), start=2):
+            record = {k: v for k, v in row.items() if k and v not in ("", None)}
+            if require_ids and "_id" not in record:
+                raise ValueError(f"{path}, line {line}: no _id (pass --allow-missing-ids to key rows by position)")
+            for field in NUMERIC_FIELDS[kind]:
+                if field in record:
+                    try:
+                        record[field] = float(record[field])
+                    except ValueError:
+                        pass
+            records.append(record)
+    return records
+
+
+def transaction_files(user_dir: str) -> List[str]:
+    files = []
+    for pattern in TRANSACTION_FILES:
+        for path in sorted(glob.glob(os.path.join(user_dir, pattern))):
+            if path not in files:
+                files.append(path)
+    return files
+
+
+def load_user(user_dir: str, require_ids: bool = True) -> Dict[str, List[Dict[str, Any]]]:
+    user_data = {"transactions": [], "budgets": [], "balance_sheets": []}
+    for path in transaction_files(user_dir):
+        user_data["transactions"].extend(read_records(path, "transactions", require_ids))
+
+    budget_path = os.path.join(user_dir, BUDGET_FILE)
+    if os.path.exists(budget_path):
+        user_data["budgets"] = read_records(budget_path, "budgets", require_ids)
+
+    balance_path = os.path.join(user_dir, BALANCE_SHEET_FILE)
+    if os.path.exists(balance_path):
+        user_data["balance_sheets"] = read_records(balance_path, "balance_sheets", require_ids)
+    return user_data
+
+
+def find_users(root: str) -> List[Tuple[str, str]]:
+    """(user_id, directory) pairs; a root holding CSVs directly is a single user."""
+    if transaction_files(root):
+        return [(os.path.basename(os.path.abspath(root)), root)]
+    return [
+        (name, os.path.join(root, name))
+        for name in sorted(os.listdir(root))
+        if os.path.isdir(os.path.join(root, name))
+    ]
+
+
+# ---------------------------------------------------------------------
+# Worker process
+# ---------------------------------------------------------------------
+_embeddings = None
+
+
+def init_worker(threads_per_worker: int):
+    """Loads the embedding model once per process."""
+    global _embeddings
+    try:
+        import torch
+        torch.set_num_threads(threads_per_worker)
+    except ImportError:
+        pass
+
+    from langchain_huggingface import HuggingFaceEmbeddings
+    _embeddings = HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL)
+
+
+def build_user(job: Tuple[str, str, str, bool]) -> Dict[str, Any]:
+    """Chunks, embeds and writes one user's shard. Runs in a worker process."""
+    from langchain_community.vectorstores import FAISS
+
+    user_id, user_dir, snapshot_path, require_ids = job
+    user_data = load_user(user_dir, require_ids)
+    chunks = build_chunks_columnar(user_data)
+    result = {
+        "user_id": user_id,
+        "user_data": user_data,
+        "rows": sum(len(records) for records in user_data.values()),
+        "chunks": len(chunks),
+        "files": None,
+    }
+    if not chunks:
+        return result
+
+    texts = [chunk["text"] for chunk in chunks]
+    metadatas = [dict(chunk["metadata"], user_id=user_id) for chunk in chunks]
+    vectors = _embeddings.embed_documents(texts)
+    shard = FAISS.from_embeddings(list(zip(texts, vectors)), _embeddings, metadatas=metadatas)
+    # Same VECTOR_INDEX_* settings the API applies when a shard grows
+    config = IndexConfig.from_settings()
+    if needs_rebuild(config, shard.index):
+        shard.index = build_index(config, np.asarray(vectors, dtype=np.float32))
+
+    stem = shard_name(user_id)
+    index_file = os.path.join("shards", f"{stem}.faiss")
+    docstore_file = os.path.join("shards", f"{stem}.pkl")
+    write_shard(shard, os.path.join(snapshot_path, index_file), os.path.join(snapshot_path, docstore_file))
+    result["files"] = {"index": index_file, "docstore": docstore_file}
+    return result
+
+
+# ---------------------------------------------------------------------
+# Snapshot assembly
+# ---------------------------------------------------------------------
+def latest_snapshot(directory: str) -> Optional[str]:
+    latest_file = os.path.join(directory, LATEST)
+    if not os.path.exists(latest_file):
+        return None
+    with open(latest_file) as f:
+        path = os.path.join(directory, f.read().strip())
+    return path if os.path.exists(os.path.join(path, MANIFEST)) else None
+
+
+def carry_over(previous: str, path: str, manifest: Dict[str, Any], records: RecordStore, skip: set) -> int:
+    """Links users from the previous snapshot that this backfill doesn't replace."""
+    with open(os.path.join(previous, MANIFEST)) as f:
+        previous_manifest = json.load(f)
+    records_path = os.path.join(previous, "records.pkl")
+    if os.path.exists(records_path):
+        with open(records_path, "rb") as f:
+            records.load_state(pickle.load(f))
+
+    carried = 0
+    for user_id, files in previous_manifest["users"].items():
+        if user_id in skip:
+            continue
+        for name in files.values():
+            link_or_copy(os.path.join(previous, name), os.path.join(path, name))
+        manifest["users"][user_id] = files
+        carried += 1
+    return carried
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build index shards for many users from CSV exports.")
+    parser.add_argument("input", help="directory with one sub-directory of CSVs per user")
+    parser.add_argument("--out", default=VECTOR_SNAPSHOT_DIR or "data/snapshots", help="snapshot directory")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--no-merge", action="store_true", help="don't carry over users from the latest snapshot")
+    parser.add_argument(
+        "--allow-missing-ids", action="store_true",
+        help="key rows without an _id by position (no delta syncs for those users until a full sync)",
+    )
+    parser.add_argument("--progress-every", type=int, default=100)
+    args = parser.parse_args()
+
+    users = find_users(args.input)
+    if not users:
+        raise SystemExit(f"No user directories found in {args.input}")
+
+    # Held until exit; a running API or index server would overwrite LATEST
+    # on its next save and prune this snapshot
+    directory_lock = lock_directory(args.out, exclusive=True, blocking=False)
+    if directory_lock is None:
+        raise SystemExit(f"{args.out} is in use by a running API or index server; stop it first")
+
+    name = "snapshot-" + datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+    path = os.path.join(args.out, name)
+    os.makedirs(os.path.join(path, "shards"))
+
+    manifest: Dict[str, Any] = {"created_at": time.time(), "users": {}}
+    records = RecordStore()
+    previous = None if args.no_merge else latest_snapshot(args.out)
+    carried = carry_over(previous, path, manifest, records, {user_id for user_id, _ in users}) if previous else 0
+
+    workers = max(1, args.workers)
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    jobs = [(user_id, user_dir, path, not args.allow_missing_ids) for user_id, user_dir in users]
+
+    started = time.perf_counter()
+    rows = chunks = done = 0
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(threads,)) as pool:
+        for result in pool.map(build_user, jobs, chunksize=4):
+            records.replace(result["user_id"], result["user_data"])
+            if result["files"] is not None:
+                manifest["users"][result["user_id"]] = result["files"]
+            rows += result["rows"]
+            chunks += result["chunks"]
+            done += 1
+            if done % args.progress_every == 0:
+                elapsed = time.perf_counter() - started
+                print(f"{done}/{len(jobs)} users, {rows / elapsed:,.0f} rows/s, {chunks / elapsed:,.1f} chunks/s")
+
+    elapsed = time.perf_counter() - started
+    with open(os.path.join(path, "records.pkl"), "wb") as f:
+        pickle.dump(records.to_state(), f, protocol=pickle.HIGHEST_PROTOCOL)
+    # The manifest goes last: a snapshot without one is incomplete
+    with open(os.path.join(path, MANIFEST), "w") as f:
+        json.dump(manifest, f)
+    write_latest(args.out, name)
+    directory_lock.close()
+
+    print(json.dumps({
+        "snapshot": path,
+        "users": done,
+        "users_carried_over": carried,
+        "rows": rows,
+        "chunks": chunks,
+        "seconds": round(elapsed, 2),
+        "users_per_s": round(done / elapsed, 2),
+        "rows_per_s": round(rows / elapsed, 1),
+        "chunks_per_s": round(chunks / elapsed, 1),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+# Run from anywhere; config refuses to import without a Hugging Face token
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("HUGGINGFACEHUB_API_TOKEN", "test-token")
+# Nothing on disk: no embedding cache, no snapshots
+os.environ.setdefault("EMBEDDING_CACHE_PATH", "")
+os.environ.setdefault("VECTOR_SNAPSHOT_DIR", "")
+
+
+@pytest.fixture
+def stores(monkeypatch):
+    """Fresh stores behind the sync routes, embedding with a deterministic fake model."""
+    from langchain_core.embeddings import DeterministicFakeEmbedding
+
+    from routes import sync_data
+    from utils.aggregate_cube import CubeStore
+    from vectorstore.record_store import RecordStore
+    from vectorstore.vector_store import VectorStore
+
+    vectors = VectorStore()
+    vectors.embeddings = DeterministicFakeEmbedding(size=16)
+    records = RecordStore()
+    cubes = CubeStore()
+    monkeypatch.setattr(sync_data, "vector_db_instance", vectors)
+    monkeypatch.setattr(sync_data, "record_store_instance", records)
+    monkeypatch.setattr(sync_data, "cube_store", cubes)
+    monkeypatch.setattr(sync_data, "answer_cache", None)
+    return SimpleNamespace(vectors=vectors, records=records, cubes=cubes)
+
+
+@pytest.fixture
+def sync_client(stores):
+    """The sync routes on their own app."""
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    from routes.sync_data import router
+
+    app = FastAPI()
+    app.include_router(router)
+    return TestClient(app)
@@ -0,0 +1,127 @@
+"""Admission control for LLM calls."""
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from langchain_core.language_models import FakeListChatModel
+from langchain_core.prompts import ChatPromptTemplate
+
+from app.core.admission import AdmissionController, AdmissionRejected
+from routes import chat
+
+
+def controller(max_concurrency=1, max_queue=10, max_queue_per_user=10, max_wait_seconds=5.0):
+    return AdmissionController(max_concurrency, max_queue, max_queue_per_user, max_wait_seconds)
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_queued_users_take_turns():
+    async def scenario():
+        admission = controller()
+        holder = await admission.acquire("a")
+        order = []
+
+        async def call(user_id, name):
+            slot = await admission.acquire(user_id)
+            order.append(name)
+            await asyncio.sleep(0)
+            slot.release()
+
+        # "a" queues a burst before "b" arrives; "b" still goes second
+        tasks = [asyncio.create_task(call("a", f"a{i}")) for i in range(3)]
+        await settle()
+        tasks.append(asyncio.create_task(call("b", "b0")))
+        await settle()
+        assert admission.stats()["queued"] == 4
+
+        holder.release()
+        await asyncio.gather(*tasks)
+        return order, admission.stats()
+
+    order, stats = asyncio.run(scenario())
+    assert order == ["a0", "b0", "a1", "a2"]
+    assert stats["in_flight"] == 0 and stats["queued"] == 0
+
+
+@pytest.mark.parametrize("limits, reason", [
+    ({"max_queue": 0}, "queue_full"),
+    ({"max_queue_per_user": 1}, "user_queue_full"),
+    ({"max_wait_seconds": 0.01}, "wait_timeout"),
+])
+def test_overflow_is_rejected_with_retry_after(limits, reason):
+    async def scenario():
+        admission = controller(**limits)
+        await admission.acquire("a")
+        if reason == "user_queue_full":
+            asyncio.create_task(admission.acquire("b"))
+            await settle()
+        with pytest.raises(AdmissionRejected) as rejected:
+            await admission.acquire("b")
+        return rejected.value, admission.stats()
+
+    error, stats = asyncio.run(scenario())
+    assert error.reason == reason
+    assert error.retry_after >= 1
+    assert stats["in_flight"] == 1
+
+
+def test_release_is_idempotent():
+    async def scenario():
+        admission = controller(max_concurrency=2)
+        first = await admission.acquire("a")
+        await admission.acquire("b")
+        first.release()
+        first.release()
+        return admission.stats()["in_flight"]
+
+    assert asyncio.run(scenario()) == 1
+
+
+def test_cancelled_waiter_leaves_the_queue():
+    async def scenario():
+        admission = controller()
+        holder = await admission.acquire("a")
+        waiter = asyncio.create_task(admission.acquire("b"))
+        await settle()
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        queued = admission.stats()["queued"]
+        holder.release()
+        return queued, admission.stats()["in_flight"]
+
+    assert asyncio.run(scenario()) == (0, 0)
+
+
+# ---------------------------------------------------------------
+# Routes
+# ---------------------------------------------------------------
+@pytest.fixture
+def busy_client(monkeypatch):
+    """/chat with every LLM slot taken and no room to queue."""
+    admission = controller(max_queue=0)
+    asyncio.run(admission.acquire("someone-else"))
+
+    async def prepare_answer(request, llm):
+        return chat.PreparedAnswer(
+            "FINANCIAL", [0.0], ("epoch", 1),
+            prompt=ChatPromptTemplate.from_template("{question}"), inputs={"question": request.message},
+        )
+
+    monkeypatch.setattr(chat, "admission_controller", admission)
+    monkeypatch.setattr(chat, "get_llm", lambda: FakeListChatModel(responses=["fine"]))
+    monkeypatch.setattr(chat, "prepare_answer", prepare_answer)
+    app = FastAPI()
+    app.include_router(chat.router)
+    return TestClient(app)
+
+
+@pytest.mark.parametrize("path", ["/chat", "/chat/stream"])
+def test_busy_llm_answers_429(busy_client, path):
+    response = busy_client.post(path, json={"user_id": "u", "session_id": "s", "message": "how much did I spend?"})
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
@@ -0,0 +1,124 @@
+"""Aggregate cube and the deterministic answer engine."""
+import pytest
+
+from utils.aggregate_cube import answer_aggregate, build_cube, parse_period
+
+
+def tx(date, tx_type, amount, category, **fields):
+    return {"date": date, "type": tx_type, "amount": amount, "category": category, **fields}
+
+
+@pytest.fixture
+def cube():
+    return build_cube({
+        "transactions": [
+            tx("2025-05-05", "expense", 50, "Food", paymentMethod="Card"),
+            tx("2025-06-03", "income", 200, "Salary"),
+            tx("2025-06-03", "expense", 20, "Credit Card Payment"),
+            tx("2025-06-04", "transfer", 500, "Investments"),
+            tx("2025-08-02", "expense", 35475.29, "Rent", status="Pending"),
+            tx("2025-08-05", "expense", 100, "Food"),
+        ],
+        "budgets": [{"month": "2025-08", "category": "Food", "budgetAmount": 90}],
+    })
+
+
+# ---------------------------------------------------------------
+# Answered from the cube
+# ---------------------------------------------------------------
+def test_category_month_total(cube):
+    assert answer_aggregate("How much did I spend on rent in August 2025?", cube) == (
+        "You spent a total of 35,475.29 on Rent in August 2025 across 1 transaction."
+    )
+
+
+def test_last_month_is_relative_to_latest_data(cube):
+    assert answer_aggregate("How much did I spend this month?", cube) == (
+        "You spent a total of 35,575.29 in August 2025 across 2 transactions."
+    )
+    # No data for July 2025: nothing exact to say
+    assert answer_aggregate("How much did I spend last month?", cube) is None
+    assert parse_period("last month", cube.months) == (["2025-07"], "July 2025")
+    assert parse_period("this month", cube.months) == (["2025-08"], "August 2025")
+
+
+def test_only_income_and_expense_count_towards_totals(cube):
+    # The 500 transfer is neither income nor spending, as in the monthly summary
+    assert answer_aggregate("What is my net savings in june 2025?", cube) == (
+        "Your net savings in June 2025 are 180.00 (income 200.00 minus expenses 20.00)."
+    )
+    assert answer_aggregate("How many transactions do I have in 2025-06?", cube) == (
+        "You have 3 transactions in June 2025."
+    )
+
+
+def test_category_name_with_filter_words(cube):
+    assert answer_aggregate("How much did I spend on credit card payment in june 2025?", cube) == (
+        "You spent a total of 20.00 on Credit Card Payment in June 2025 across 1 transaction."
+    )
+
+
+def test_budget(cube):
+    assert answer_aggregate("Am I over budget in august 2025?", cube) == (
+        "Budget vs actual for August 2025:\n- Food: budget 90.00, spent 100.00, over budget by 10.00"
+    )
+
+
+# ---------------------------------------------------------------
+# Left to RAG
+# ---------------------------------------------------------------
+@pytest.mark.parametrize("question", [
+    "How much does a Tesla cost?",
+    "What is the budget of the US government?",
+    "total spend on food in august 2025",
+])
+def test_needs_first_person(cube, question):
+    assert answer_aggregate(question, cube) is None
+
+
+@pytest.mark.parametrize("question", [
+    "What was my total spend last month excluding rent?",
+    "How much did I spend in August 2025 except food?",
+    "How much did I spend in August 2025 without rent?",
+    "What did I spend on things other than rent in August 2025?",
+])
+def test_exclusions(cube, question):
+    assert answer_aggregate(question, cube) is None
+
+
+@pytest.mark.parametrize("question", [
+    "How much did I pay by card in May 2025?",
+    "How much did I spend in cash in May 2025?",
+])
+def test_payment_method(cube, question):
+    assert answer_aggregate(question, cube) is None
+
+
+@pytest.mark.parametrize("question", [
+    "How much are my pending bills last month?",
+    "How much did I spend on completed transactions in August 2025?",
+])
+def test_status(cube, question):
+    assert answer_aggregate(question, cube) is None
+
+
+def test_notes(cube):
+    assert answer_aggregate("How much did I spend on rent with the note deposit in August 2025?", cube) is None
+
+
+@pytest.mark.parametrize("question", [
+    "How much did I spend in the first week of June 2025?",
+    "How much did I spend between 1st and 15th August 2025?",
+    "How much did I spend yesterday?",
+])
+def test_part_of_a_month(cube, question):
+    assert answer_aggregate(question, cube) is None
+
+
+def test_unrecognised_words(cube):
+    assert answer_aggregate("How much did I spend on food at the mall in August 2025?", cube) is None
+
+
+def test_invalid_iso_month_is_no_period(cube):
+    assert parse_period("how much did i spend in 2025-13", cube.months) == (None, "overall")
+    assert answer_aggregate("how much did i spend in 2025-13", cube) is None
@@ -0,0 +1,63 @@
+"""build_chunks_columnar must produce exactly what build_chunks does."""
+from datetime import datetime
+
+import pytest
+
+from benchmarks.synthetic_data import make_transactions
+from utils.chunk_builder import build_chunks
+from utils.columnar_chunk_builder import build_chunks_columnar
+
+
+def tx(date, tx_type, amount, category="Food", status="Completed", payment="UPI"):
+    return {"date": date, "type": tx_type, "amount": amount, "category": category,
+            "status": status, "paymentMethod": payment}
+
+
+def assert_same_chunks(user_data, max_lines):
+    assert build_chunks_columnar(user_data, max_lines) == build_chunks(user_data, max_lines)
+
+
+@pytest.mark.parametrize("max_lines", [0, 3, 8, 10_000])
+def test_synthetic_history(max_lines):
+    user_data = {"transactions": make_transactions(5_000, seed=7), "budgets": [], "balance_sheets": []}
+    assert_same_chunks(user_data, max_lines)
+
+
+@pytest.mark.parametrize("max_lines", [0, 2])
+@pytest.mark.parametrize("transactions", [
+    # int and float amounts mixed, int totals must stay int
+    [tx("2025-07-01", "income", 100), tx("2025-07-02", "expense", 0.1), tx("2025-07-03", "expense", 0.2),
+     tx("2025-07-04", "expense", 7), tx("2025-08-01", "expense", 3)],
+    # types other than income / expense
+    [tx("2025-07-01", "transfer", 40), tx("2025-07-02", "expense", 10), tx("2025-07-03", "income", 5)],
+    # whitespace that normalize() collapses, missing fields, empty category
+    [tx("2025-07-01", "expense", 5, category="Eating  out "), tx("2025-07-02", "expense", 6, category=""),
+     {"date": "2025-07-03", "type": "income", "amount": 9}],
+    # ISO timestamps, datetime values and month order by first appearance
+    [tx("2025-09-01T10:00:00Z", "expense", 1), tx(datetime(2025, 7, 5), "income", 2),
+     tx("2025-07-06T08:30:00", "expense", 3)],
+])
+def test_edge_cases(transactions, max_lines):
+    assert_same_chunks({"transactions": transactions, "budgets": [], "balance_sheets": []}, max_lines)
+
+
+def test_unparseable_date_fails_like_the_reference():
+    user_data = {"transactions": [tx("not a date", "expense", 1), tx("2025-07-01", "expense", 2)]}
+    with pytest.raises(IndexError):
+        build_chunks(user_data)
+    with pytest.raises(IndexError):
+        build_chunks_columnar(user_data)
+
+
+def test_budgets_and_balance_sheets():
+    user_data = {
+        "transactions": [tx("2025-07-01", "expense", 50)],
+        "budgets": [{"month": "2025-07", "category": "Food", "budgetAmount": 100}],
+        "balance_sheets": [{"date": "2025-06-30", "currentAssets": 10, "currentLiabilities": 5,
+                            "totalLiabilities": 20, "totalEquity": 40}],
+    }
+    assert_same_chunks(user_data, 8)
+
+
+def test_no_transactions():
+    assert_same_chunks({"transactions": [], "budgets": [], "balance_sheets": []}, 8)
@@ -0,0 +1,38 @@
+"""Token-budgeted context packing."""
+from langchain_core.documents import Document
+
+from utils.context_packer import SEPARATOR, pack_context
+
+
+class CharCounter:
+    """One token per character, so the separator costs two."""
+
+    def count(self, text: str) -> int:
+        return len(text)
+
+
+def doc(text, chunk_type, month="2025-07"):
+    return Document(page_content=text, metadata={"type": chunk_type, "month": month})
+
+
+def test_evicting_the_first_summary_refunds_the_next_separator():
+    summary = doc("S" * 10, "monthly_summary")
+    transactions = doc("T" * 10, "monthly_transaction")
+    extra = doc("E" * 10, "monthly_budget")
+
+    # Summary + separator + transactions fill the budget; once the summary
+    # is dropped, the extra chunk and its separator fit exactly
+    packed = pack_context([summary, transactions, extra], CharCounter(), budget=22, min_truncated_tokens=100)
+
+    assert packed.text == SEPARATOR.join(["T" * 10, "E" * 10])
+    assert packed.tokens == 22
+    assert packed.dropped == 1
+
+
+def test_summary_dropped_when_its_month_is_in():
+    packed = pack_context(
+        [doc("T" * 10, "monthly_transaction"), doc("S" * 10, "monthly_summary")],
+        CharCounter(), budget=100,
+    )
+    assert packed.text == "T" * 10
+    assert packed.dropped == 1
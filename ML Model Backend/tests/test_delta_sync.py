@@ -0,0 +1,119 @@
+"""Record-level delta sync against /sync-user-data/delta."""
+import numpy as np
+import pytest
+
+
+def tx(record_id, date, amount, category="Food", tx_type="expense"):
+    return {
+        "_id": record_id, "date": date, "type": tx_type, "amount": amount,
+        "category": category, "status": "Completed", "paymentMethod": "UPI",
+    }
+
+
+INITIAL = {
+    "transactions": [
+        tx("a", "2025-06-01", 1000, "Salary", "income"),
+        tx("b", "2025-06-03", 40),
+        tx("c", "2025-07-02", 50),
+        tx("d", "2025-07-09", 300, "Rent"),
+    ],
+    "budgets": [{"_id": "bud1", "month": "2025-07", "category": "Food", "budgetAmount": 200}],
+    "balance_sheets": [],
+}
+
+
+def documents(stores, user_id):
+    """A shard's chunks as comparable (text, metadata) pairs."""
+    shard = stores.vectors.get_shard(user_id)
+    docs = shard.docstore._dict.values() if shard is not None else []
+    return sorted(
+        (doc.page_content, sorted((k, str(v)) for k, v in doc.metadata.items() if k != "user_id"))
+        for doc in docs
+    )
+
+
+def assert_same_cube(stores, a, b):
+    cube_a = stores.cubes.get(a, stores.records.version(a))
+    cube_b = stores.cubes.get(b, stores.records.version(b))
+    assert cube_a.months == cube_b.months
+    assert cube_a.categories == cube_b.categories
+    assert np.array_equal(cube_a.sums, cube_b.sums)
+    assert np.array_equal(cube_a.budgets, cube_b.budgets)
+
+
+def test_delta_matches_a_full_sync(sync_client, stores):
+    assert sync_client.post("/sync-user-data", json={"user_id": "delta", **INITIAL}).status_code == 200
+
+    response = sync_client.post("/sync-user-data/delta", json={
+        "user_id": "delta",
+        "upserts": {
+            "transactions": [tx("c", "2025-07-02", 75), tx("e", "2025-08-01", 20)],
+            "budgets": [{"_id": "bud1", "month": "2025-07", "category": "Food", "budgetAmount": 250}],
+        },
+        "deletes": {"transactions": ["b"]},
+    })
+    assert response.status_code == 200
+    assert response.json()["months_rebuilt"] == ["2025-06", "2025-07", "2025-08"]
+
+    # A full sync of the same records into another user ends up identical
+    full = stores.records.user_data("delta")
+    assert sync_client.post("/sync-user-data", json={"user_id": "full", **full}).status_code == 200
+    assert documents(stores, "delta") == documents(stores, "full")
+    assert_same_cube(stores, "delta", "full")
+
+
+def test_untouched_months_are_not_rebuilt(sync_client, stores):
+    sync_client.post("/sync-user-data", json={"user_id": "u", **INITIAL})
+    response = sync_client.post("/sync-user-data/delta", json={
+        "user_id": "u", "upserts": {"transactions": [tx("d", "2025-07-09", 320, "Rent")]},
+    })
+    assert response.json()["months_rebuilt"] == ["2025-07"]
+
+
+def test_unsynced_user_is_a_conflict(sync_client, stores):
+    response = sync_client.post("/sync-user-data/delta", json={
+        "user_id": "nobody", "upserts": {"transactions": [tx("a", "2025-06-01", 10)]},
+    })
+    assert response.status_code == 409
+    assert not stores.records.has_user("nobody")
+
+
+def test_records_without_ids_are_a_conflict(sync_client, stores):
+    unkeyed = [{k: v for k, v in record.items() if k != "_id"} for record in INITIAL["transactions"]]
+    sync_client.post("/sync-user-data", json={"user_id": "csv", "transactions": unkeyed})
+
+    response = sync_client.post("/sync-user-data/delta", json={
+        "user_id": "csv", "upserts": {"transactions": [tx("a", "2025-06-01", 10)]},
+    })
+    assert response.status_code == 409
+    assert len(stores.records.records("csv", "transactions")) == 4
+
+
+def test_upserts_need_an_id(sync_client, stores):
+    sync_client.post("/sync-user-data", json={"user_id": "u", **INITIAL})
+    record = tx("x", "2025-07-01", 5)
+    del record["_id"]
+    response = sync_client.post("/sync-user-data/delta", json={"user_id": "u", "upserts": {"transactions": [record]}})
+    assert response.status_code == 400
+
+
+def test_failed_index_update_keeps_the_old_records(sync_client, stores, monkeypatch):
+    sync_client.post("/sync-user-data", json={"user_id": "u", **INITIAL})
+    before = stores.records.user_data("u")
+    chunks = documents(stores, "u")
+
+    def fail(*args, **kwargs):
+        raise RuntimeError("index update failed")
+
+    monkeypatch.setattr(stores.vectors, "replace_documents", fail)
+    response = sync_client.post("/sync-user-data/delta", json={
+        "user_id": "u", "upserts": {"transactions": [tx("e", "2025-08-01", 20)]},
+    })
+    assert response.status_code == 500
+    assert stores.records.user_data("u") == before
+    assert documents(stores, "u") == chunks
+
+
+@pytest.mark.parametrize("user_id", ["a#b", "#sync"])
+def test_staging_separator_is_rejected(sync_client, user_id):
+    assert sync_client.post("/sync-user-data", json={"user_id": user_id, **INITIAL}).status_code == 422
@@ -0,0 +1,98 @@
+"""Cross-request embedding micro-batcher."""
+import threading
+
+import pytest
+from langchain_core.embeddings import Embeddings
+
+from vectorstore.embedding_batcher import EmbeddingBatcher
+
+TIMEOUT = 5
+
+
+class RecordingEmbeddings(Embeddings):
+    """Embeds "t<n>" as [n]; records every batch and can hold the first one."""
+
+    def __init__(self, fail_on=None):
+        self.batches = []
+        self.fail_on = fail_on
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.release.set()
+
+    def embed_documents(self, texts):
+        self.batches.append(list(texts))
+        self.started.set()
+        self.release.wait(TIMEOUT)
+        if self.fail_on is not None and self.fail_on in texts:
+            raise RuntimeError("model failed")
+        return [[float(text[1:])] for text in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+def texts(start, stop):
+    return [f"t{i}" for i in range(start, stop)]
+
+
+def vectors(start, stop):
+    return [[float(i)] for i in range(start, stop)]
+
+
+def test_concurrent_callers_share_a_forward_pass():
+    model = RecordingEmbeddings()
+    model.release.clear()
+    batcher = EmbeddingBatcher(model, max_batch_size=64, max_wait_ms=50)
+
+    first = batcher.submit(texts(0, 1))
+    assert model.started.wait(TIMEOUT)
+    # Queued while the first pass runs: both go out together next
+    second = batcher.submit(texts(1, 3))
+    third = batcher.submit(texts(3, 4))
+    model.release.set()
+
+    assert first.result(TIMEOUT) == vectors(0, 1)
+    assert second.result(TIMEOUT) == vectors(1, 3)
+    assert third.result(TIMEOUT) == vectors(3, 4)
+    assert sorted(model.batches[1]) == texts(1, 4)
+
+
+def test_large_submission_is_sliced_in_order():
+    model = RecordingEmbeddings()
+    batcher = EmbeddingBatcher(model, max_batch_size=4, max_wait_ms=1)
+
+    assert batcher.submit(texts(0, 10)).result(TIMEOUT) == vectors(0, 10)
+    assert [len(batch) for batch in model.batches] == [4, 4, 2]
+
+
+def test_small_request_waits_for_at_most_one_slice():
+    model = RecordingEmbeddings()
+    model.release.clear()
+    batcher = EmbeddingBatcher(model, max_batch_size=4, max_wait_ms=1)
+
+    bulk = batcher.submit(texts(0, 20))
+    assert model.started.wait(TIMEOUT)
+    query = batcher.submit(["t100"])
+    model.release.set()
+
+    assert query.result(TIMEOUT) == [[100.0]]
+    assert bulk.result(TIMEOUT) == vectors(0, 20)
+    # The query rode along with the bulk's second slice
+    assert "t100" in model.batches[1]
+    assert all(len(batch) <= 4 for batch in model.batches)
+
+
+def test_failed_pass_fails_only_its_callers():
+    model = RecordingEmbeddings(fail_on="t0")
+    model.release.clear()
+    batcher = EmbeddingBatcher(model, max_batch_size=2, max_wait_ms=1)
+
+    failing = batcher.submit(texts(0, 6))
+    assert model.started.wait(TIMEOUT)
+    model.release.set()
+    with pytest.raises(RuntimeError):
+        failing.result(TIMEOUT)
+
+    # The rest of the failed submission is dropped, and the batcher keeps serving
+    assert batcher.submit(texts(10, 12)).result(TIMEOUT) == vectors(10, 12)
+    assert not any("t2" in batch for batch in model.batches)
@@ -0,0 +1,21 @@
+"""Retrieval hints parsed from chat questions."""
+from utils import query_hints
+from utils.query_hints import QueryHints, parse_query_hints
+
+
+def test_month_and_category():
+    hints = parse_query_hints("How much did I spend on Food in July 2025?", ["2025-07"], ["Food"])
+    assert hints.months == {"2025-07"}
+    assert hints.categories == {"Food"}
+
+
+def test_order_number_is_not_a_month():
+    assert parse_query_hints("Where is order 2024-99?", ["2024-09"], []).is_empty()
+
+
+def test_parse_errors_give_no_hints(monkeypatch):
+    def broken(*args, **kwargs):
+        raise ValueError("month must be in 1..12")
+
+    monkeypatch.setattr(query_hints, "parse_period", broken)
+    assert parse_query_hints("spending in 2025-07", ["2025-07"], []) == QueryHints()
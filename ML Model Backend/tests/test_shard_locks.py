@@ -0,0 +1,117 @@
+"""Per-shard reader/writer locks."""
+import threading
+import time
+
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from vectorstore.rw_lock import ReadWriteLock
+from vectorstore.shard_io import write_shard
+from vectorstore.vector_store import VectorStore, staging_shard_id
+
+TIMEOUT = 5
+
+
+def in_thread(func):
+    """Starts func in a thread; returns an event set once it has finished."""
+    done = threading.Event()
+
+    def run():
+        func()
+        done.set()
+
+    threading.Thread(target=run, daemon=True).start()
+    return done
+
+
+# ---------------------------------------------------------------
+# ReadWriteLock
+# ---------------------------------------------------------------
+def hold(context):
+    with context:
+        pass
+
+
+def test_readers_share():
+    lock = ReadWriteLock()
+    with lock.read():
+        assert in_thread(lambda: hold(lock.read())).wait(TIMEOUT)
+
+
+def test_writer_waits_for_readers():
+    lock = ReadWriteLock()
+    with lock.read():
+        wrote = in_thread(lambda: hold(lock.write()))
+        assert not wrote.wait(0.1)
+    assert wrote.wait(TIMEOUT)
+
+
+def test_waiting_writer_goes_before_new_readers():
+    lock = ReadWriteLock()
+    order = []
+
+    def write():
+        with lock.write():
+            order.append("write")
+
+    def read():
+        with lock.read():
+            order.append("read")
+
+    with lock.read():
+        wrote = in_thread(write)
+        while not lock._writers_waiting:
+            time.sleep(0.001)
+        read_done = in_thread(read)
+        assert not read_done.wait(0.1)
+    assert wrote.wait(TIMEOUT) and read_done.wait(TIMEOUT)
+    assert order == ["write", "read"]
+
+
+# ---------------------------------------------------------------
+# VectorStore
+# ---------------------------------------------------------------
+def store():
+    vectors = VectorStore()
+    vectors.embeddings = DeterministicFakeEmbedding(size=16)
+    for user_id in ("a", "b"):
+        vectors.add_documents(user_id, [{"text": f"rent for {user_id}", "metadata": {"type": "monthly_summary"}}])
+    return vectors
+
+
+def test_write_blocks_only_the_same_user():
+    vectors = store()
+    with vectors.writing("a"):
+        assert in_thread(lambda: vectors.search("b", "rent")).wait(TIMEOUT)
+        same_user = in_thread(lambda: vectors.search("a", "rent"))
+        assert not same_user.wait(0.1)
+    assert same_user.wait(TIMEOUT)
+
+
+def test_staging_shards_share_the_owner_lock():
+    vectors = store()
+    staging_id = staging_shard_id("a", "sync")
+    with vectors.reading("a"):
+        staged = in_thread(lambda: vectors.add_documents(staging_id, [{"text": "new", "metadata": {}}]))
+        assert not staged.wait(0.1)
+    assert staged.wait(TIMEOUT)
+    assert sorted(vectors.user_ids()) == ["a", "b"]
+
+
+def test_restored_shard_loads_once(tmp_path):
+    source = store()
+    index_path, docstore_path = str(tmp_path / "a.faiss"), str(tmp_path / "a.pkl")
+    write_shard(source.get_shard("a"), index_path, docstore_path)
+
+    vectors = VectorStore()
+    vectors.embeddings = source.embeddings
+    vectors.attach_shard_files("a", index_path, docstore_path)
+    shards = []
+    threads = [threading.Thread(target=lambda: shards.append(vectors.get_shard("a"))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(TIMEOUT)
+
+    assert len({id(shard) for shard in shards}) == 1
+    assert vectors.get_shard("a") is shards[0]
+    assert [doc.page_content for doc in vectors.search("a", "rent")] == ["rent for a"]
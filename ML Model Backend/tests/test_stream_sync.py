@@ -0,0 +1,93 @@
+"""Streamed NDJSON full sync against /sync-user-data/stream."""
+import json
+
+import pytest
+
+from routes import sync_data
+
+
+def tx(record_id, date, amount, category="Food"):
+    return {
+        "_id": record_id, "date": date, "type": "expense", "amount": amount,
+        "category": category, "status": "Completed", "paymentMethod": "UPI",
+    }
+
+
+TRANSACTIONS = [
+    tx("a", "2025-06-01", 10),
+    tx("b", "2025-06-20", 20, "Rent"),
+    tx("c", "2025-07-02", 30),
+    tx("d", "2025-07-15", 40),
+    tx("e", "2025-08-01", 50),
+]
+BUDGETS = [{"_id": "bud1", "month": "2025-07", "category": "Food", "budgetAmount": 200}]
+
+
+def ndjson(transactions, budgets=()):
+    lines = [json.dumps({"kind": "transactions", "record": t}) for t in transactions]
+    lines += [json.dumps({"kind": "budgets", "record": b}) for b in budgets]
+    return ("\n".join(lines) + "\n").encode()
+
+
+def pieces(body, size=37):
+    """A chunked request body, split mid-line."""
+    for start in range(0, len(body), size):
+        yield body[start:start + size]
+
+
+def stream(client, user_id, body):
+    return client.post("/sync-user-data/stream", params={"user_id": user_id}, content=body)
+
+
+def texts(stores, user_id):
+    shard = stores.vectors.get_shard(user_id)
+    return sorted(doc.page_content for doc in shard.docstore._dict.values()) if shard is not None else []
+
+
+def by_id(records):
+    return sorted(records, key=lambda record: record["_id"])
+
+
+def assert_matches_full_sync(client, stores, streamed, transactions, budgets):
+    assert client.post("/sync-user-data", json={
+        "user_id": "full", "transactions": transactions, "budgets": budgets,
+    }).status_code == 200
+    assert texts(stores, streamed) == texts(stores, "full")
+    for kind in ("transactions", "budgets"):
+        assert by_id(stores.records.records(streamed, kind)) == by_id(stores.records.records("full", kind))
+
+
+def test_sorted_stream_matches_a_full_sync(sync_client, stores):
+    response = stream(sync_client, "u", pieces(ndjson(TRANSACTIONS, BUDGETS)))
+    assert response.status_code == 200
+    assert response.json()["months_streamed"] == 3
+    assert response.json()["months_reopened"] == 0
+    assert_matches_full_sync(sync_client, stores, "u", TRANSACTIONS, BUDGETS)
+
+
+def test_out_of_order_months_are_reopened(sync_client, stores, monkeypatch):
+    # June comes back after July was started: June is rebuilt from all its records
+    shuffled = [TRANSACTIONS[0], TRANSACTIONS[2], TRANSACTIONS[1], TRANSACTIONS[4], TRANSACTIONS[3]]
+    monkeypatch.setattr(sync_data, "STREAM_SAVE_RECORDS", 2)
+    response = stream(sync_client, "u", pieces(ndjson(shuffled, BUDGETS)))
+    assert response.status_code == 200
+    assert response.json()["months_reopened"] == 2
+    assert_matches_full_sync(sync_client, stores, "u", TRANSACTIONS, BUDGETS)
+
+
+@pytest.mark.parametrize("bad_line", [b"{not json\n", b'{"kind": "unknown", "record": {}}\n'])
+def test_bad_line_rolls_back(sync_client, stores, bad_line):
+    assert stream(sync_client, "u", ndjson(TRANSACTIONS[:2])).status_code == 200
+    before = texts(stores, "u"), stores.records.user_data("u"), stores.records.version("u")
+
+    response = stream(sync_client, "u", ndjson(TRANSACTIONS) + bad_line)
+    assert response.status_code == 400
+
+    # The user keeps their previous data, and nothing staged is left behind
+    assert (texts(stores, "u"), stores.records.user_data("u"), stores.records.version("u")) == before
+    assert stores.vectors.user_ids() == ["u"]
+    assert not stores.records._staged
+
+
+def test_staging_separator_is_rejected(sync_client):
+    assert stream(sync_client, "a#b", ndjson(TRANSACTIONS)).status_code == 400
@@ -0,0 +1,442 @@
+"""
+Per-user month x category x type aggregate cube, and a deterministic
+engine that answers simple aggregate questions straight from it.
+"""
+from __future__ import annotations
+
+import re
+import threading
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import Any, Dict, Hashable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from utils.chunk_builder import to_readable_date
+
+# Same mapping as the monthly summary chunks: only "income" and "expense"
+# count towards the totals; any other type is kept apart so it still counts
+# as a transaction
+TYPES = ("income", "expense", "other")
+BALANCE_FIELDS = ("currentAssets", "currentLiabilities", "totalLiabilities", "totalEquity")
+
+MONTH_NAMES = {
+    datetime(2000, m, 1).strftime("%B").lower(): m for m in range(1, 13)
+}
+MONTH_NAMES.update({name[:3]: m for name, m in list(MONTH_NAMES.items())})
+# "may" is usually the verb unless it reads like a date
+MONTH_PATTERNS = [
+    (
+        re.compile(r"\b(in|of|for|during) may\b|\bmay \d{4}\b" if name == "may" else rf"\b{name}\b"),
+        num,
+    )
+    for name, num in MONTH_NAMES.items()
+]
+
+
+@dataclass
+class AggregateCube:
+    months: List[str]                 # sorted "YYYY-MM"
+    categories: List[str]
+    sums: np.ndarray                  # [month, category, type] float64
+    counts: np.ndarray                # [month, category, type] int64
+    budgets: np.ndarray               # [month, category] float64
+    budget_set: np.ndarray            # [month, category] bool
+    balance_dates: List[str] = field(default_factory=list)
+    balance: Dict[str, np.ndarray] = field(default_factory=dict)
+
+    def month_index(self, months: Sequence[str]) -> np.ndarray:
+        lookup = {m: i for i, m in enumerate(self.months)}
+        return np.array([lookup[m] for m in months if m in lookup], dtype=np.int64)
+
+    def category_index(self, category: Optional[str]) -> Optional[int]:
+        if category is None:
+            return None
+        return self.categories.index(category)
+
+
+_TYPE_POS = {"income": 0, "expense": 1}
+
+
+def _month_keys(dates: Sequence[Any]) -> List[str]:
+    """Same grouping as build_chunks, parsing each distinct date string once."""
+    raw = [str(d).replace("Z", "") for d in dates]
+    parsed: Dict[str, str] = {}
+    for value in set(raw):
+        try:
+            parsed[value] = datetime.fromisoformat(value).strftime("%Y-%m")
+        except ValueError:
+            parsed[value] = "unknown"
+    return [parsed[v] for v in raw]
+
+
+def _to_float(value: Any) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def build_cube(user_data: Dict[str, List[Any]]) -> AggregateCube:
+    """Builds the cube from the same inputs build_chunks receives."""
+    transactions = user_data.get("transactions", []) or []
+    budgets = user_data.get("budgets", []) or []
+    balance_sheets = user_data.get("balance_sheets", []) or []
+
+    tx_months = _month_keys([tx.get("date") for tx in transactions])
+    tx_categories = [str(tx.get("category")) for tx in transactions]
+    budget_months = [str(b.get("month", "unknown")) for b in budgets]
+    budget_categories = [str(b.get("category")) for b in budgets]
+
+    months = sorted(set(tx_months) | set(budget_months))
+    categories = sorted(set(tx_categories) | set(budget_categories))
+    month_pos = {m: i for i, m in enumerate(months)}
+    cat_pos = {c: i for i, c in enumerate(categories)}
+
+    sums = np.zeros((len(months), len(categories), len(TYPES)), dtype=np.float64)
+    counts = np.zeros(sums.shape, dtype=np.int64)
+    if transactions:
+        m_idx = np.fromiter((month_pos[m] for m in tx_months), dtype=np.int64, count=len(transactions))
+        c_idx = np.fromiter((cat_pos[c] for c in tx_categories), dtype=np.int64, count=len(transactions))
+        t_idx = np.fromiter(
+            (_TYPE_POS.get(tx.get("type"), 2) for tx in transactions),
+            dtype=np.int64, count=len(transactions),
+        )
+        amounts = np.fromiter(
+            (_to_float(tx.get("amount", 0)) for tx in transactions),
+            dtype=np.float64, count=len(transactions),
+        )
+        np.add.at(sums, (m_idx, c_idx, t_idx), amounts)
+        np.add.at(counts, (m_idx, c_idx, t_idx), 1)
+
+    budget_totals = np.zeros((len(months), len(categories)), dtype=np.float64)
+    budget_set = np.zeros(budget_totals.shape, dtype=bool)
+    if budgets:
+        m_idx = np.array([month_pos[m] for m in budget_months], dtype=np.int64)
+        c_idx = np.array([cat_pos[c] for c in budget_categories], dtype=np.int64)
+        np.add.at(budget_totals, (m_idx, c_idx), [_to_float(b.get("budgetAmount")) for b in budgets])
+        budget_set[m_idx, c_idx] = True
+
+    sheets = sorted(balance_sheets, key=lambda bs: str(bs.get("date", "")))
+    balance = {
+        name: np.array([_to_float(bs.get(name)) for bs in sheets], dtype=np.float64)
+        for name in BALANCE_FIELDS
+    }
+
+    return AggregateCube(
+        months=months,
+        categories=categories,
+        sums=sums,
+        counts=counts,
+        budgets=budget_totals,
+        budget_set=budget_set,
+        balance_dates=[str(bs.get("date", "")) for bs in sheets],
+        balance=balance,
+    )
+
+
+class CubeStore:
+    """Latest cube per user, tagged with the data version it was built from."""
+
+    def __init__(self):
+        self._cubes: Dict[str, Tuple[Hashable, AggregateCube]] = {}
+        self._lock = threading.Lock()
+
+    def put(self, user_id: str, version: Hashable, cube: AggregateCube):
+        with self._lock:
+            self._cubes[user_id] = (version, cube)
+
+    def get(self, user_id: str, version: Hashable) -> Optional[AggregateCube]:
+        with self._lock:
+            entry = self._cubes.get(user_id)
+        if entry is None or entry[0] != version:
+            return None
+        return entry[1]
+
+    def delete_user(self, user_id: str):
+        with self._lock:
+            self._cubes.pop(user_id, None)
+
+
+# Singleton instance
+cube_store = CubeStore()
+
+
+# =================================================================
+#                     DETERMINISTIC QUERY ENGINE
+# =================================================================
+
+# Questions that need reasoning rather than arithmetic go to RAG
+_UNSUPPORTED = re.compile(
+    r"\b(why|should|advice|advise|suggest|recommend|pattern|trend|compare|average|predict|forecast|reduce|improve|habit|hobby|afford|can i|may i)\b"
+)
+# Only questions about the user's own money; "how much does a Tesla cost" isn't one
+_FIRST_PERSON = re.compile(r"\b(i|me|my|mine)\b")
+_AGGREGATE_CUE = re.compile(r"\b(total|how much|how many|sum|overall|net|count|number of)\b")
+_EXPENSE = re.compile(r"\b(spend|spent|spending|expense|expenses|expences|expenditure|paid|pay|cost)\b")
+_INCOME = re.compile(r"\b(income|earn|earned|earning|earnings|receive|received|made)\b")
+_NET = re.compile(r"\b(net|saving|savings|saved|net flow)\b")
+_BUDGET = re.compile(r"\b(budget|budgets|over budget|under budget)\b")
+_COUNT = re.compile(r"\b(how many|count|number of)\b")
+_CURRENT_RATIO = re.compile(r"\bcurrent ratio\b")
+_DEBT_EQUITY = re.compile(r"\bdebt[\s-]*(to|/)[\s-]*equity\b")
+_ISO_MONTH = re.compile(r"\b(\d{4})-(0[1-9]|1[0-2])\b")
+# Looks like YYYY-MM but isn't a month ("2025-13", order "2024-99")
+_ISO_LIKE = re.compile(r"\b\d{4}-\d{2}\b")
+_RELATIVE_PERIOD = re.compile(r"\b(last|previous|this|current) (month|year)\b")
+_YEAR = re.compile(r"\b(19|20)(\d{2})\b")
+_NUMERIC_DATE = re.compile(r"\b\d{1,2}[/.]\d{1,2}[/.]\d{2,4}\b")
+
+# Qualifiers the cube can't apply (it only has month x category x type):
+# the question goes to RAG rather than get an unfiltered total
+_EXCLUSION = re.compile(r"\b(excluding|exclude|excludes|except|without|other than|apart from|besides|not|no|minus)\b|n't\b")
+_RECORD_FILTER = re.compile(
+    r"\b(card|cards|credit|debit|cash|upi|bank|cheque|check|wallet|online|transfer|transfers|method|via|"
+    r"status|pending|completed|complete|failed|cancelled|canceled|refunded|refund|unpaid|overdue|due|bill|bills|"
+    r"note|notes|memo|description|tagged|labelled|labeled)\b"
+)
+_SUB_MONTH = re.compile(
+    r"\b(day|days|daily|week|weeks|weekly|weekend|weekends|fortnight|today|yesterday|tonight|morning|evening|"
+    r"first|second|third|fourth|half|between|from|since|until|till|before|after|\d{1,2}(st|nd|rd|th))\b"
+)
+# Words that carry no meaning for the cube; anything else left over after
+# the recognised parts are removed means the question asks for more
+_FILLER = {
+    "what", "whats", "what's", "was", "is", "are", "were", "am", "be", "been", "the", "a", "an", "my", "i", "me",
+    "mine", "i'm", "i've", "did", "do", "does", "have", "has", "had", "in", "on", "for", "of", "during", "to",
+    "all", "much", "many", "how", "amount", "money", "there", "tell", "show", "give", "please", "so", "far",
+    "transaction", "transactions", "vs", "versus", "actual", "and", "it", "that", "at", "up", "by", "get",
+    "total", "overall", "month", "year", "altogether",
+}
+
+
+def _fmt(amount: float) -> str:
+    return f"{amount:,.2f}"
+
+
+def _transactions(n: int) -> str:
+    return f"{int(n)} transaction" + ("" if int(n) == 1 else "s")
+
+
+def _month_label(month: str) -> str:
+    year, num = month.split("-")
+    return f"{datetime(2000, int(num), 1).strftime('%B')} {year}"
+
+
+def _shift_month(d: date, delta: int) -> str:
+    index = d.year * 12 + (d.month - 1) + delta
+    return f"{index // 12:04d}-{index % 12 + 1:02d}"
+
+
+def parse_period(text: str, known_months: Sequence[str], today: Optional[date] = None) -> Tuple[Optional[List[str]], str]:
+    """
+    Returns (months, label) for the period the question refers to.
+    months is None for "all time"; known_months (sorted) resolves a month
+    name without a year and a bare year. "This" / "last" month or year are
+    relative to the latest month with data, and to today only without data.
+    """
+    data_months = [m for m in known_months if m != "unknown"]
+    if data_months:
+        latest = datetime.strptime(data_months[-1], "%Y-%m").date()
+    else:
+        latest = today or date.today()
+
+    if re.search(r"\b(last|previous) month\b", text):
+        month = _shift_month(latest, -1)
+        return [month], _month_label(month)
+    if re.search(r"\b(this|current) month\b", text):
+        month = _shift_month(latest, 0)
+        return [month], _month_label(month)
+
+    iso = _ISO_MONTH.search(text)
+    if iso:
+        month = f"{iso.group(1)}-{iso.group(2)}"
+        return [month], _month_label(month)
+    if _ISO_LIKE.search(text):
+        return None, "overall"
+
+    year_match = _YEAR.search(text)
+    year = year_match.group(0) if year_match else None
+    for pattern, num in MONTH_PATTERNS:
+        if pattern.search(text):
+            if year is None:
+                # Month without a year: the latest one we have data for
+                candidates = [m for m in known_months if m.endswith(f"-{num:02d}")]
+                if not candidates:
+                    return [], datetime(2000, num, 1).strftime("%B")
+                month = candidates[-1]
+            else:
+                month = f"{year}-{num:02d}"
+            return [month], _month_label(month)
+
+    if re.search(r"\b(last|previous) year\b", text):
+        year = str(latest.year - 1)
+    elif re.search(r"\b(this|current) year\b", text):
+        year = str(latest.year)
+    if year is not None:
+        return [m for m in known_months if m.startswith(f"{year}-")], year
+
+    return None, "overall"
+
+
+def find_category(text: str, categories: Sequence[str]) -> Optional[str]:
+    # Longest names first so "Credit Card Payment" wins over "Payment"
+    for category in sorted(categories, key=len, reverse=True):
+        if category and re.search(rf"\b{re.escape(category.lower())}\b", text):
+            return category
+    return None
+
+
+def _unparsed_tokens(text: str, category: Optional[str]) -> List[str]:
+    """Words of the question left once every part the engine understands is removed."""
+    rest = text
+    patterns = [
+        _FIRST_PERSON, _AGGREGATE_CUE, _EXPENSE, _INCOME, _NET, _BUDGET, _COUNT,
+        _CURRENT_RATIO, _DEBT_EQUITY, _ISO_MONTH, _YEAR, _RELATIVE_PERIOD,
+    ] + [pattern for pattern, _ in MONTH_PATTERNS]
+    if category:
+        patterns.append(re.compile(rf"\b{re.escape(category.lower())}\b"))
+    for pattern in patterns:
+        rest = pattern.sub(" ", rest)
+    return [token for token in re.findall(r"[a-z0-9']+", rest) if token not in _FILLER]
+
+
+def _balance_answer(text: str, cube: AggregateCube, months: Optional[List[str]], label: str) -> Optional[str]:
+    if not cube.balance_dates:
+        return None
+    # Latest snapshot inside the period (or overall)
+    positions = [
+        i for i, d in enumerate(cube.balance_dates)
+        if months is None or d[:7] in months
+    ]
+    if not positions:
+        return None
+    i = positions[-1]
+    when = to_readable_date(cube.balance_dates[i])
+    b = {name: values[i] for name, values in cube.balance.items()}
+
+    if _CURRENT_RATIO.search(text):
+        if not b["currentLiabilities"]:
+            return None
+        ratio = b["currentAssets"] / b["currentLiabilities"]
+        return (
+            f"Your current ratio on {when} was {ratio:.2f} "
+            f"(current assets {_fmt(b['currentAssets'])} / current liabilities {_fmt(b['currentLiabilities'])})."
+        )
+    if not b["totalEquity"]:
+        return None
+    ratio = b["totalLiabilities"] / b["totalEquity"]
+    return (
+        f"Your debt-to-equity ratio on {when} was {ratio:.2f} "
+        f"(total liabilities {_fmt(b['totalLiabilities'])} / total equity {_fmt(b['totalEquity'])})."
+    )
+
+
+def _budget_answer(cube: AggregateCube, m_idx: np.ndarray, c_idx: Optional[int], label: str) -> Optional[str]:
+    budgets = cube.budgets[m_idx].sum(axis=0)
+    budget_set = cube.budget_set[m_idx].any(axis=0)
+    actual = cube.sums[m_idx, :, 1].sum(axis=0)
+
+    cats = [c_idx] if c_idx is not None else list(np.flatnonzero(budget_set))
+    cats = [c for c in cats if budget_set[c]]
+    if not cats:
+        return None
+
+    lines = []
+    for c in cats:
+        remaining = budgets[c] - actual[c]
+        status = "under budget" if remaining >= 0 else "over budget"
+        lines.append(
+            f"- {cube.categories[c]}: budget {_fmt(budgets[c])}, spent {_fmt(actual[c])}, "
+            f"{status} by {_fmt(abs(remaining))}"
+        )
+    return f"Budget vs actual for {label}:\n" + "\n".join(lines)
+
+
+def answer_aggregate(message: str, cube: Optional[AggregateCube], today: Optional[date] = None) -> Optional[str]:
+    """
+    Answers recognised aggregate questions about the user's own data
+    exactly from the cube. Only call it for FINANCIAL questions. Returns
+    None when the question isn't one we can answer exactly, so the caller
+    falls back to RAG.
+    """
+    if cube is None:
+        return None
+    text = " ".join(message.lower().split())
+    if not _FIRST_PERSON.search(text):
+        return None
+    if _UNSUPPORTED.search(text) or _NUMERIC_DATE.search(text):
+        return None
+
+    # Anything beyond period, category and kind (exclusions, payment method,
+    # status, notes, part of a month, words we don't know) needs RAG.
+    # Checked without the category name, so "Credit Card Payment" is fine.
+    category = find_category(text, cube.categories)
+    rest = re.sub(rf"\b{re.escape(category.lower())}\b", " ", text) if category else text
+    if _EXCLUSION.search(rest) or _RECORD_FILTER.search(rest) or _SUB_MONTH.search(rest):
+        return None
+    if _unparsed_tokens(text, category):
+        return None
+
+    months, label = parse_period(text, cube.months, today)
+    period = f"in {label}" if months is not None else "overall"
+
+    if _CURRENT_RATIO.search(text) or _DEBT_EQUITY.search(text):
+        return _balance_answer(text, cube, months, label)
+
+    m_idx = cube.month_index(months) if months is not None else np.arange(len(cube.months))
+    if m_idx.size == 0:
+        return None
+    c_idx = cube.category_index(category)
+
+    if _BUDGET.search(text):
+        return _budget_answer(cube, m_idx, c_idx, label if months is not None else "all months")
+
+    if not _AGGREGATE_CUE.search(text):
+        return None
+
+    sums = cube.sums[m_idx].sum(axis=0)        # [category, type]
+    counts = cube.counts[m_idx].sum(axis=0)
+    if c_idx is not None:
+        sums, counts = sums[c_idx], counts[c_idx]
+    else:
+        sums, counts = sums.sum(axis=0), counts.sum(axis=0)
+    on = f" on {category}" if category else ""
+
+    if _COUNT.search(text) and "transaction" in text:
+        if _INCOME.search(text):
+            n, kind = counts[0], "income transactions"
+        elif _EXPENSE.search(text):
+            n, kind = counts[1], "expense transactions"
+        else:
+            n, kind = counts.sum(), "transactions"
+        if counts.sum() == 0:
+            return None
+        return f"You have {int(n)} {kind}{on} {period}."
+
+    if _NET.search(text) and c_idx is None:
+        if counts.sum() == 0:
+            return None
+        income, expense = sums[0], sums[1]
+        return (
+            f"Your net savings {period} are {_fmt(income - expense)} "
+            f"(income {_fmt(income)} minus expenses {_fmt(expense)})."
+        )
+
+    if _INCOME.search(text) and not _EXPENSE.search(text):
+        if counts[0] == 0:
+            return None
+        return f"Your total income{on} {period} is {_fmt(sums[0])} across {_transactions(counts[0])}."
+
+    if _EXPENSE.search(text):
+        if counts[1] == 0:
+            if c_idx is not None and counts[0]:
+                # e.g. "spend on salary": the category only has income
+                return (
+                    f"{category} is an income category: you received {_fmt(sums[0])} "
+                    f"{period} across {_transactions(counts[0])}."
+                )
+            return None
+        return f"You spent a total of {_fmt(sums[1])}{on} {period} across {_transactions(counts[1])}."
+
+    return None
@@ -0,0 +1,121 @@
+"""Semantic answer cache keyed by user, data version and query embedding."""
+from __future__ import annotations
+
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Hashable, Optional, Sequence
+
+import numpy as np
+
+from app.core.config import (
+    ANSWER_CACHE_ENABLED,
+    ANSWER_CACHE_THRESHOLD,
+    ANSWER_CACHE_TTL_SECONDS,
+    ANSWER_CACHE_MAX_ENTRIES,
+)
+
+
+@dataclass
+class _Entry:
+    vector: np.ndarray
+    answer: str
+    expires_at: float
+
+
+class SemanticAnswerCache:
+    """
+    Reuses a previous answer when a new question from the same user, against
+    the same data version, has cosine similarity >= threshold with a cached
+    question. Entries expire after ttl_seconds and the oldest-used entries
+    are evicted beyond max_entries.
+    """
+
+    def __init__(self, threshold: float = 0.95, ttl_seconds: float = 3600, max_entries: int = 10_000):
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._users: Dict[str, Dict[int, _Entry]] = {}
+        self._versions: Dict[str, Hashable] = {}
+        self._lru: "OrderedDict[int, str]" = OrderedDict()
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+    @staticmethod
+    def _unit(vector: Sequence[float]) -> np.ndarray:
+        v = np.asarray(vector, dtype=np.float32)
+        return v / (np.linalg.norm(v) + 1e-12)
+
+    def _user_entries(self, user_id: str, version: Hashable) -> Dict[int, _Entry]:
+        """The user's entries, dropping them all if the data version moved on."""
+        if self._versions.get(user_id) != version:
+            self._drop_user(user_id)
+            self._versions[user_id] = version
+        return self._users.setdefault(user_id, {})
+
+    def _drop_user(self, user_id: str):
+        for entry_id in self._users.pop(user_id, {}):
+            self._lru.pop(entry_id, None)
+
+    def lookup(self, user_id: str, version: Hashable, vector: Sequence[float]) -> Optional[str]:
+        query = self._unit(vector)
+        now = time.time()
+        with self._lock:
+            entries = self._user_entries(user_id, version)
+            for entry_id in [i for i, e in entries.items() if e.expires_at <= now]:
+                entries.pop(entry_id)
+                self._lru.pop(entry_id, None)
+
+            if entries:
+                ids = list(entries.keys())
+                sims = np.stack([entries[i].vector for i in ids]) @ query
+                best = int(np.argmax(sims))
+                if sims[best] >= self.threshold:
+                    self._lru.move_to_end(ids[best])
+                    self._counters["hits"] += 1
+                    return entries[ids[best]].answer
+
+            self._counters["misses"] += 1
+            return None
+
+    def store(self, user_id: str, version: Hashable, vector: Sequence[float], answer: str):
+        with self._lock:
+            entries = self._user_entries(user_id, version)
+            entry_id = next(self._ids)
+            entries[entry_id] = _Entry(self._unit(vector), answer, time.time() + self.ttl_seconds)
+            self._lru[entry_id] = user_id
+
+            while len(self._lru) > self.max_entries:
+                old_id, old_user = self._lru.popitem(last=False)
+                self._users.get(old_user, {}).pop(old_id, None)
+                self._counters["evictions"] += 1
+
+    def invalidate_user(self, user_id: str):
+        """Drops every cached answer for a user (called on sync)."""
+        with self._lock:
+            self._drop_user(user_id)
+            self._versions.pop(user_id, None)
+            self._counters["invalidations"] += 1
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            stats = dict(self._counters)
+            stats["entries"] = len(self._lru)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+
+# Singleton instance (None when disabled)
+answer_cache = (
+    SemanticAnswerCache(
+        threshold=ANSWER_CACHE_THRESHOLD,
+        ttl_seconds=ANSWER_CACHE_TTL_SECONDS,
+        max_entries=ANSWER_CACHE_MAX_ENTRIES,
+    )
+    if ANSWER_CACHE_ENABLED
+    else None
+)
@@ -1,7 +1,9 @@
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Tuple
 from datetime import datetime
 from collections import defaultdict
 
+from app.core.config import CHUNK_MAX_TRANSACTIONS
+
 
 def to_readable_date(date_value):
     """Safely convert any date into a readable format."""
@@ -17,26 +19,243 @@ def normalize(text: str):
     return " ".join(text.split()).strip()
 
 
-def build_chunks(user_data: Dict[str, List[Any]]) -> List[Dict[str, Any]]:
+def transaction_month(tx) -> str:
+    """Year-month key ("2025-07") a transaction is grouped under."""
+    try:
+        d = datetime.fromisoformat(str(tx["date"]).replace("Z", ""))
+        return d.strftime("%Y-%m")   # Example: "2025-07"
+    except:
+        return "unknown"
+
+
+def monthly_transaction_chunk(month, month_name, year, total_income, total_expense, category_lines, lines, categories=()):
+    text = f"""
+    MONTHLY TRANSACTION OVERVIEW
+    Month: {month_name} {year}
+
+    Total Income: {total_income}
+    Total Expense: {total_expense}
+    Net Savings: {total_income - total_expense}
+
+    Category Summary:
+    {chr(10).join(category_lines)}
+
+    All Transactions:
+    {chr(10).join(lines)}
+
+    Meaning:
+    This chunk summarizes ALL transactions of {month_name} {year}.
+    """
+
+    return {
+        "text": normalize(text),
+        "metadata": {
+            "type": "monthly_transaction",
+            "month": month,
+            "year": year,
+            "categories": [str(c) for c in categories],
+        }
+    }
+
+
+def transaction_parent_id(month) -> str:
+    return f"monthly_transaction:{month}"
+
+
+def monthly_overview_chunk(month, month_name, year, total_income, total_expense, category_lines, categories, transaction_count, parts):
+    """Parent of a month split into transaction parts: totals and categories, no lines."""
+    text = f"""
+    MONTHLY TRANSACTION OVERVIEW
+    Month: {month_name} {year}
+
+    Total Income: {total_income}
+    Total Expense: {total_expense}
+    Net Savings: {total_income - total_expense}
+
+    Category Summary:
+    {chr(10).join(category_lines)}
+
+    Transactions: {transaction_count}, listed by category in {parts} MONTHLY TRANSACTIONS parts.
+
+    Meaning:
+    This chunk summarizes ALL transactions of {month_name} {year}.
+    """
+
+    return {
+        "text": normalize(text),
+        "metadata": {
+            "type": "monthly_transaction",
+            "month": month,
+            "year": year,
+            "categories": [str(c) for c in categories],
+            "chunk_id": transaction_parent_id(month),
+            "parts": parts,
+        }
+    }
+
+
+def transaction_part_chunk(month, month_name, year, lines, categories, part, parts):
+    """One bounded slice of a split month's transaction lines; links back to its overview."""
+    text = f"""
+    MONTHLY TRANSACTIONS (PART {part} OF {parts})
+    Month: {month_name} {year}
+    Categories: {", ".join(str(c) for c in categories)}
+
+    Transactions:
+    {chr(10).join(lines)}
+
+    Meaning:
+    Part {part} of {parts} of the transactions of {month_name} {year}.
+    Month totals are in the MONTHLY TRANSACTION OVERVIEW.
+    """
+
+    return {
+        "text": normalize(text),
+        "metadata": {
+            "type": "monthly_transaction_part",
+            "month": month,
+            "year": year,
+            "categories": [str(c) for c in categories],
+            "parent_id": transaction_parent_id(month),
+            "part": part,
+        }
+    }
+
+
+def split_transaction_lines(lines, line_categories, max_lines) -> List[Tuple[List[str], List[Any]]]:
+    """(lines, categories) parts: lines grouped by category, at most max_lines each."""
+    by_category = defaultdict(list)
+    for line, category in zip(lines, line_categories):
+        by_category[category].append((line, category))
+    ordered = [entry for entries in by_category.values() for entry in entries]
+
+    parts = []
+    for start in range(0, len(ordered), max_lines):
+        piece = ordered[start:start + max_lines]
+        parts.append(([line for line, _ in piece], list(dict.fromkeys(c for _, c in piece))))
+    return parts
+
+
+def monthly_transaction_chunks(month, month_name, year, total_income, total_expense, category_lines, lines,
+                               categories, line_categories, max_lines=CHUNK_MAX_TRANSACTIONS):
+    """
+    One chunk for a month that fits max_lines; otherwise a totals-only
+    overview plus category-grouped parts, so every embedded text stays short.
+    """
+    if max_lines <= 0 or len(lines) <= max_lines:
+        return [monthly_transaction_chunk(
+            month, month_name, year, total_income, total_expense, category_lines, lines, categories=categories,
+        )]
+
+    parts = split_transaction_lines(lines, line_categories, max_lines)
+    chunks = [monthly_overview_chunk(
+        month, month_name, year, total_income, total_expense, category_lines, categories, len(lines), len(parts),
+    )]
+    for number, (part_lines, part_categories) in enumerate(parts, 1):
+        chunks.append(transaction_part_chunk(month, month_name, year, part_lines, part_categories, number, len(parts)))
+    return chunks
+
+
+def monthly_summary_chunk(month, month_name, year, total_income, total_expense):
+    summary = f"""
+    MONTH SUMMARY (FINANCIAL)
+    Month: {month_name} {year}
+    Total Income: {total_income}
+    Total Expense: {total_expense}
+    Net Flow: {total_income - total_expense}
+
+    Meaning: Use this for fast monthly financial questions.
+    """
+
+    return {
+        "text": normalize(summary),
+        "metadata": {
+            "type": "monthly_summary",
+            "month": month,
+            "year": year
+        }
+    }
+
+
+def budget_chunks(budgets: List[Any]) -> List[Dict[str, Any]]:
+    """One chunk per budget month."""
+    budgets_by_month = defaultdict(list)
+    for b in budgets:
+        budgets_by_month[b.get("month", "unknown")].append(b)
+
+    chunks = []
+    for month, b_list in budgets_by_month.items():
+        lines = [
+            f"- {b['category']} → Budget: {b['budgetAmount']} | Notes: {b.get('notes', 'None')}"
+            for b in b_list
+        ]
+
+        text = f"""
+        MONTHLY BUDGET OVERVIEW
+        Month: {month}
+
+        Budgets:
+        {chr(10).join(lines)}
+
+        Meaning:
+        This contains ALL budget allocations for {month}.
+        """
+
+        chunks.append({
+            "text": normalize(text),
+            "metadata": {
+                "type": "monthly_budget",
+                "month": month,
+                "categories": list(dict.fromkeys(str(b.get("category")) for b in b_list)),
+            }
+        })
+
+    return chunks
+
+
+def balance_sheet_chunks(balance_sheets: List[Any]) -> List[Dict[str, Any]]:
+    """One chunk per balance sheet entry (usually few rows)."""
+    chunks = []
+    for bs in balance_sheets:
+        date = to_readable_date(bs.get("date"))
+
+        text = f"""
+        BALANCE SHEET SNAPSHOT
+        Date: {date}
+        Current Assets: {bs.get('currentAssets')}
+        Current Liabilities: {bs.get('currentLiabilities')}
+        Total Liabilities: {bs.get('totalLiabilities')}
+        Total Equity: {bs.get('totalEquity')}
+        Notes: {bs.get('notes', 'None')}
+
+        Meaning:
+        This represents the user's financial position on {date}.
+        """
+
+        chunks.append({
+            "text": normalize(text),
+            "metadata": {
+                "type": "balance_sheet",
+                "date": str(bs.get("date", "")),
+                "doc_id": str(bs.get("_id", "")),
+            }
+        })
+
+    return chunks
+
+
+def build_chunks(user_data: Dict[str, List[Any]], max_lines: int = CHUNK_MAX_TRANSACTIONS) -> List[Dict[str, Any]]:
     chunks = []
 
     transactions = user_data.get("transactions", [])
     budgets = user_data.get("budgets", [])
     balance_sheets = user_data.get("balance_sheets", [])
-    print("transactions: \n", transactions)
-    print("budgets: \n", budgets)
-    print("balance_sheets: \n", balance_sheets)
     # -------------------------------------------------------------
     # 🔥 GROUP TRANSACTIONS BY YEAR-MONTH
     # -------------------------------------------------------------
     tx_by_month = defaultdict(list)
     for tx in transactions:
-        try:
-            d = datetime.fromisoformat(str(tx["date"]).replace("Z", ""))
-            key = d.strftime("%Y-%m")   # Example: "2025-07"
-        except:
-            key = "unknown"
-        tx_by_month[key].append(tx)
+        tx_by_month[transaction_month(tx)].append(tx)
 
     # -------------------------------------------------------------
     # 🔥 TRANSACTION: MONTH-WISE CHUNKS
@@ -47,6 +266,7 @@ def build_chunks(user_data: Dict[str, List[Any]]) -> List[Dict[str, Any]]:
         month_name = datetime.strptime(month_num, "%m").strftime("%B")
 
         lines = []
+        line_categories = []
         total_income = 0
         total_expense = 0
         category_summary = defaultdict(float)
@@ -65,6 +285,7 @@ def build_chunks(user_data: Dict[str, List[Any]]) -> List[Dict[str, Any]]:
                 total_expense += amount
 
             category_summary[category] += amount
+            line_categories.append(category)
 
             lines.append(
                 f"- [{date}] {tx_type.upper()} | {amount} | Category: {category} | Status: {tx.get('status')} | Payment: {tx.get('paymentMethod')}"
@@ -75,32 +296,10 @@ def build_chunks(user_data: Dict[str, List[Any]]) -> List[Dict[str, Any]]:
             f"- {cat}: {amt}" for cat, amt in category_summary.items()
         ]
 
-        text = f"""
-        MONTHLY TRANSACTION OVERVIEW
-        Month: {month_name} {year}
-
-        Total Income: {total_income}
-        Total Expense: {total_expense}
-        Net Savings: {total_income - total_expense}
-
-        Category Summary:
-        {chr(10).join(category_lines)}
-
-        All Transactions:
-        {chr(10).join(lines)}
-
-        Meaning:
-        This chunk summarizes ALL transactions of {month_name} {year}.
-        """
-
-        chunks.append({
-            "text": normalize(text),
-            "metadata": {
-                "type": "monthly_transaction",
-                "month": month,
-                "year": year
-            }
-        })
+        chunks.extend(monthly_transaction_chunks(
+            month, month_name, year, total_income, total_expense, category_lines, lines,
+            list(category_summary.keys()), line_categories, max_lines,
+        ))
 
     # -------------------------------------------------------------
     # 🔥 ADD MINI SUMMARY CHUNKS (PER MONTH)
@@ -113,83 +312,10 @@ def build_chunks(user_data: Dict[str, List[Any]]) -> List[Dict[str, Any]]:
         total_income = sum(tx["amount"] for tx in tx_list if tx["type"] == "income")
         total_expense = sum(tx["amount"] for tx in tx_list if tx["type"] == "expense")
 
-        summary = f"""
-        MONTH SUMMARY (FINANCIAL)
-        Month: {month_name} {year}
-        Total Income: {total_income}
-        Total Expense: {total_expense}
-        Net Flow: {total_income - total_expense}
-
-        Meaning: Use this for fast monthly financial questions.
-        """
-
-        chunks.append({
-            "text": normalize(summary),
-            "metadata": {
-                "type": "monthly_summary",
-                "month": month,
-                "year": year
-            }
-        })
-
-    # -------------------------------------------------------------
-    # 🔥 BUDGETS – month-wise chunk
-    # -------------------------------------------------------------
-    budgets_by_month = defaultdict(list)
-    for b in budgets:
-        budgets_by_month[b.get("month", "unknown")].append(b)
-
-    for month, b_list in budgets_by_month.items():
-        lines = [
-            f"- {b['category']} → Budget: {b['budgetAmount']} | Notes: {b.get('notes', 'None')}"
-            for b in b_list
-        ]
-
-        text = f"""
-        MONTHLY BUDGET OVERVIEW
-        Month: {month}
-
-        Budgets:
-        {chr(10).join(lines)}
-
-        Meaning:
-        This contains ALL budget allocations for {month}.
-        """
+        chunks.append(monthly_summary_chunk(month, month_name, year, total_income, total_expense))
 
-        chunks.append({
-            "text": normalize(text),
-            "metadata": {
-                "type": "monthly_budget",
-                "month": month
-            }
-        })
-
-    # -------------------------------------------------------------
-    # 🔥 BALANCE SHEETS – one chunk per entry (usually few rows)
-    # -------------------------------------------------------------
-    for bs in balance_sheets:
-        date = to_readable_date(bs.get("date"))
-
-        text = f"""
-        BALANCE SHEET SNAPSHOT
-        Date: {date}
-        Current Assets: {bs.get('currentAssets')}
-        Current Liabilities: {bs.get('currentLiabilities')}
-        Total Liabilities: {bs.get('totalLiabilities')}
-        Total Equity: {bs.get('totalEquity')}
-        Notes: {bs.get('notes', 'None')}
-
-        Meaning:
-        This represents the user's financial position on {date}.
-        """
-
-        chunks.append({
-            "text": normalize(text),
-            "metadata": {
-                "type": "balance_sheet",
-                "date": str(bs.get("date", "")),
-            }
-        })
+    chunks.extend(budget_chunks(budgets))
+    chunks.extend(balance_sheet_chunks(balance_sheets))
 
     return chunks
 
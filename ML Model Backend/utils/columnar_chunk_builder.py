@@ -0,0 +1,298 @@
+"""
+Columnar build_chunks for large transaction histories.
+
+Produces exactly the same chunks as utils.chunk_builder.build_chunks, but
+reads each transaction field once into a column, parses each distinct
+date string once, and groups rows with NumPy (stable argsort over month /
+category codes) instead of repeated per-row dict grouping. Totals are
+still folded in row order with Python number semantics (int stays int,
+float addition order unchanged), so the texts are byte-identical.
+
+Inputs the reference builder would choke on (missing keys, non-numeric
+amounts, unparseable dates) are handed to it unchanged, so errors and
+edge-case output match too.
+"""
+from __future__ import annotations
+
+from datetime import datetime
+from functools import reduce
+from operator import add, itemgetter
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from app.core.config import CHUNK_MAX_TRANSACTIONS
+from utils.chunk_builder import (
+    balance_sheet_chunks,
+    budget_chunks,
+    build_chunks,
+    monthly_overview_chunk,
+    monthly_summary_chunk,
+    monthly_transaction_chunk,
+    to_readable_date,
+    transaction_part_chunk,
+)
+
+_NUMBER_TYPES = {int, float}
+_EXACT_INT_LIMIT = 2 ** 53
+_LINES_PLACEHOLDER = "\x00transaction-lines\x00"
+_CATEGORIES_PLACEHOLDER = "\x00categories\x00"
+_PART_PLACEHOLDER = "\x00part\x00"
+
+
+def _factorize(values: List[Any]):
+    """Codes in order of first appearance (dict semantics, like defaultdict keys)."""
+    uniques = list(dict.fromkeys(values))
+    code_of = {v: i for i, v in enumerate(uniques)}
+    codes = np.fromiter(map(code_of.__getitem__, values), dtype=np.int64, count=len(values))
+    return codes, uniques
+
+
+def _month_of(date_str: str) -> Optional[str]:
+    try:
+        return datetime.fromisoformat(date_str.replace("Z", "")).strftime("%Y-%m")
+    except ValueError:
+        return None
+
+
+def _pick(values: List[Any], idx: np.ndarray) -> List[Any]:
+    if len(idx) == 0:
+        return []
+    if len(idx) == 1:
+        return [values[idx[0]]]
+    return list(itemgetter(*idx.tolist())(values))
+
+
+def _fold(amounts: List[Any], as_float: Optional[np.ndarray], is_float: np.ndarray, rows: np.ndarray, start):
+    """
+    reduce(add, amounts[rows], start) without the per-row Python adds.
+
+    Python promotes to float at the first float operand; with ints small
+    enough that every partial sum is exact in float64, a strictly
+    left-to-right float64 accumulate rounds identically. All-int folds
+    must stay int, so they go through reduce.
+    """
+    if as_float is not None and len(rows) and (type(start) is float or is_float[rows].any()):
+        return float(np.add.accumulate(np.concatenate(([start], as_float[rows])))[-1])
+    return reduce(add, _pick(amounts, rows), start)
+
+
+def _is_normalized(values) -> bool:
+    """True if normalize() would leave every value untouched inside a line."""
+    try:
+        unique = set(values)
+    except TypeError:
+        return False
+    for v in unique:
+        text = str(v)
+        if not text or text != " ".join(text.split()):
+            return False
+    return True
+
+
+def _with_lines(template, lines: List[str], rows: np.ndarray, splice: bool, *args, **kwargs) -> Dict[str, Any]:
+    """template(..., lines, ...) with the lines of rows, spliced into a placeholder when safe."""
+    if not splice:
+        return template(*args, lines=_pick(lines, rows), **kwargs)
+    chunk = template(*args, lines=[_LINES_PLACEHOLDER], **kwargs)
+    head, _, tail = chunk["text"].rpartition(_LINES_PLACEHOLDER)
+    chunk["text"] = head + " ".join(_pick(lines, rows)) + tail
+    return chunk
+
+
+def _part_chunks(lines: List[str], categories: List[Any], ordered: np.ndarray, max_lines: int, splice: bool,
+                 month, month_name, year) -> List[Dict[str, Any]]:
+    """transaction_part_chunk for each max_lines slice of a split month's category-ordered rows."""
+    ordered_lines = _pick(lines, ordered)
+    ordered_categories = _pick(categories, ordered)
+    starts = range(0, len(ordered_lines), max_lines)
+    parts = len(starts)
+    if not splice:
+        return [
+            transaction_part_chunk(
+                month, month_name, year, lines=ordered_lines[start:start + max_lines],
+                categories=list(dict.fromkeys(ordered_categories[start:start + max_lines])),
+                part=number, parts=parts,
+            )
+            for number, start in enumerate(starts, 1)
+        ]
+
+    # Render and normalize the template once per month, then fill it per part
+    base = transaction_part_chunk(
+        month, month_name, year, lines=[_LINES_PLACEHOLDER],
+        categories=[_CATEGORIES_PLACEHOLDER], part=_PART_PLACEHOLDER, parts=parts,
+    )
+    template = (
+        base["text"].replace("{", "{{").replace("}", "}}")
+        .replace(_LINES_PLACEHOLDER, "{lines}")
+        .replace(_CATEGORIES_PLACEHOLDER, "{categories}")
+        .replace(_PART_PLACEHOLDER, "{part}")
+    ).format
+    metadata = base["metadata"]
+    chunks = []
+    for number, start in enumerate(starts, 1):
+        part_categories = [str(c) for c in dict.fromkeys(ordered_categories[start:start + max_lines])]
+        chunks.append({
+            "text": template(
+                lines=" ".join(ordered_lines[start:start + max_lines]),
+                categories=", ".join(part_categories),
+                part=number,
+            ),
+            "metadata": {**metadata, "categories": part_categories, "part": number},
+        })
+    return chunks
+
+
+def _transaction_columns(transactions: List[Dict[str, Any]]):
+    """Reads the columns build_chunks uses, or None if the reference path must handle them."""
+    try:
+        dates = [tx["date"] for tx in transactions]
+        types = [tx["type"] for tx in transactions]
+        amounts = [tx["amount"] for tx in transactions]
+    except (KeyError, TypeError):
+        return None
+    if set(map(type, types)) - {str}:
+        return None
+    if set(map(type, amounts)) - _NUMBER_TYPES:
+        return None
+
+    categories = [tx.get("category") for tx in transactions]
+    statuses = [tx.get("status") for tx in transactions]
+    payments = [tx.get("paymentMethod") for tx in transactions]
+
+    # Dates: parse each distinct value once, then map months back per row.
+    # Distinct dates are in first-appearance order, so months are too.
+    date_keys = list(map(str, dates))
+    date_codes, unique_dates = _factorize(date_keys)
+    months = [_month_of(d) for d in unique_dates]
+    if any(m is None for m in months):
+        return None
+    month_of_date, month_keys = _factorize(months)
+    if set(map(type, dates)) == {str}:
+        unique_readable = [to_readable_date(d) for d in unique_dates]
+        readable = _pick(unique_readable, date_codes)
+    else:  # datetime values render differently from their str()
+        readable = list(map(to_readable_date, dates))
+        unique_readable = readable
+
+    try:
+        category_codes, _ = _factorize(categories)
+    except TypeError:  # unhashable category
+        return None
+
+    return {
+        "types": types,
+        "amounts": amounts,
+        "categories": categories,
+        "category_codes": category_codes,
+        "statuses": statuses,
+        "payments": payments,
+        "readable": readable,
+        "unique_readable": unique_readable,
+        "month_codes": month_of_date[date_codes],
+        "month_keys": month_keys,
+    }
+
+
+def build_chunks_columnar(user_data: Dict[str, List[Any]], max_lines: int = CHUNK_MAX_TRANSACTIONS) -> List[Dict[str, Any]]:
+    transactions = user_data.get("transactions", [])
+    budgets = user_data.get("budgets", [])
+    balance_sheets = user_data.get("balance_sheets", [])
+
+    cols = _transaction_columns(transactions) if transactions else None
+    if transactions and cols is None:
+        return build_chunks(user_data, max_lines)
+
+    chunks: List[Dict[str, Any]] = []
+    summaries: List[Dict[str, Any]] = []
+
+    if cols is not None:
+        types = cols["types"]
+        amounts = cols["amounts"]
+        categories = cols["categories"]
+        is_income = np.fromiter(map("income".__eq__, types), dtype=bool, count=len(types))
+        is_expense = np.fromiter(map("expense".__eq__, types), dtype=bool, count=len(types))
+        upper = {t: t.upper() for t in set(types)}
+        is_float = np.fromiter(map(float.__instancecheck__, amounts), dtype=bool, count=len(amounts))
+        try:
+            as_float = np.fromiter(amounts, dtype=np.float64, count=len(amounts))
+        except OverflowError:  # int too large for a double
+            as_float = None
+        if as_float is not None and np.abs(as_float[~is_float]).sum() >= _EXACT_INT_LIMIT:
+            as_float = None  # int partial sums could round in float64
+
+        # normalize() on a month's text is mostly whitespace-splitting the
+        # transaction lines. When no field can change under it, normalize
+        # the template once with a placeholder and splice the lines in.
+        splice_lines = (
+            _is_normalized(cols["unique_readable"]) and _is_normalized(upper.values())
+            and _is_normalized(categories) and _is_normalized(cols["statuses"])
+            and _is_normalized(cols["payments"])
+        )
+
+        lines = [
+            f"- [{date}] {upper[tx_type]} | {amount} | Category: {category} | Status: {status} | Payment: {payment}"
+            for date, tx_type, amount, category, status, payment in zip(
+                cols["readable"], types, amounts, categories, cols["statuses"], cols["payments"]
+            )
+        ]
+
+        # Group rows by month, months in first-appearance order, rows in input order
+        month_codes, month_keys = cols["month_codes"], cols["month_keys"]
+        order = np.argsort(month_codes, kind="stable")
+        bounds = np.flatnonzero(np.diff(month_codes[order])) + 1
+        groups = np.split(order, bounds)
+
+        for month, idx in zip(month_keys, groups):
+            year, month_num = month.split("-")
+            month_name = datetime.strptime(month_num, "%m").strftime("%B")
+
+            income_idx = idx[is_income[idx]]
+            other_idx = idx[~is_income[idx]]
+            expense_idx = idx[is_expense[idx]]
+
+            # Same left-to-right folds as the reference loop
+            total_income = _fold(amounts, as_float, is_float, income_idx, 0)
+            total_expense = _fold(amounts, as_float, is_float, other_idx, 0)
+
+            cat_codes = cols["category_codes"][idx]
+            category_lines = []
+            month_categories = []
+            category_rows = []
+            first_seen = np.unique(cat_codes, return_index=True)[1]
+            for pos in np.sort(first_seen):
+                code = cat_codes[pos]
+                rows = idx[cat_codes == code]
+                total = _fold(amounts, as_float, is_float, rows, 0.0)
+                category_lines.append(f"- {categories[idx[pos]]}: {total}")
+                month_categories.append(categories[idx[pos]])
+                category_rows.append(rows)
+
+            if max_lines <= 0 or len(idx) <= max_lines:
+                chunks.append(_with_lines(
+                    monthly_transaction_chunk, lines, idx, splice_lines,
+                    month, month_name, year, total_income, total_expense, category_lines,
+                    categories=month_categories,
+                ))
+            else:
+                # Same category-grouped parts as split_transaction_lines
+                ordered = np.concatenate(category_rows)
+                parts = -(-len(ordered) // max_lines)
+                chunks.append(monthly_overview_chunk(
+                    month, month_name, year, total_income, total_expense, category_lines,
+                    month_categories, len(idx), parts,
+                ))
+                chunks.extend(_part_chunks(
+                    lines, categories, ordered, max_lines, splice_lines, month, month_name, year,
+                ))
+
+            summaries.append(monthly_summary_chunk(
+                month, month_name, year,
+                sum(_pick(amounts, income_idx)),
+                sum(_pick(amounts, expense_idx)),
+            ))
+
+    chunks.extend(summaries)
+    chunks.extend(budget_chunks(budgets))
+    chunks.extend(balance_sheet_chunks(balance_sheets))
+    return chunks
@@ -0,0 +1,174 @@
+"""
+Token-budgeted assembly of the RAG context.
+
+Retrieved chunks are added in score order until the budget is spent.
+Exact duplicates are skipped, and a month's monthly_summary is dropped
+when its monthly_transaction chunk (full month or, for split months, the
+totals-only overview) is in, since that repeats the same totals.
+A chunk that doesn't fit is cut back to whole transaction lines if enough
+budget is left, so the month totals at its top still make it in.
+"""
+import math
+import re
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
+
+from langchain_core.documents import Document
+
+from app.core.config import (
+    CONTEXT_MIN_TRUNCATED_TOKENS,
+    CONTEXT_TOKEN_BUDGET,
+    CONTEXT_TOKENIZER,
+    HUGGINGFACE_API_KEY,
+)
+
+SEPARATOR = "\n\n"
+EMPTY_CONTEXT = "No relevant financial records available."
+
+# Fallback when the tokenizer can't be loaded; Gemma splits digits one per
+# token, so finance text runs well under the usual 4 chars/token
+CHARS_PER_TOKEN = 3.0
+
+# Entries inside a normalized chunk ("- [01 July 2025] EXPENSE | ...", "- Rent: ...")
+_ENTRY = re.compile(r" (?=- )")
+
+
+class TokenCounter:
+    """Counts tokens with the generation model's tokenizer, loaded at warm-up or on first use."""
+
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+        self._tokenizer = None
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def _load(self):
+        with self._lock:
+            if self._loaded:
+                return
+            try:
+                from transformers import AutoTokenizer
+
+                self._tokenizer = AutoTokenizer.from_pretrained(self.model_name, token=HUGGINGFACE_API_KEY)
+            except Exception as e:
+                print(f"Warning: tokenizer {self.model_name} unavailable, estimating tokens: {e}")
+            self._loaded = True
+
+    def warm_up(self):
+        """Loads the tokenizer now; falls back to estimating, as on first use."""
+        self._load()
+
+    @property
+    def exact(self) -> bool:
+        self._load()
+        return self._tokenizer is not None
+
+    def count(self, text: str) -> int:
+        if not self._loaded:
+            self._load()
+        if self._tokenizer is None:
+            return math.ceil(len(text) / CHARS_PER_TOKEN)
+        return len(self._tokenizer.encode(text, add_special_tokens=False))
+
+
+@dataclass
+class PackedContext:
+    text: str
+    tokens: int
+    chunks: int
+    dropped: int
+    truncated: int
+
+
+def _month_key(doc: Document) -> Optional[str]:
+    return doc.metadata.get("month")
+
+
+def _truncate(text: str, budget: int, counter: TokenCounter) -> Optional[str]:
+    """Longest prefix of whole entries (plus an omission note) within budget."""
+    entries = _ENTRY.split(text)
+    if len(entries) < 2:
+        return None
+
+    def render(keep: int) -> str:
+        omitted = len(entries) - keep
+        return " ".join(entries[:keep]) + f" ... ({omitted} more entries omitted)"
+
+    # Binary search on the number of entries kept
+    low, high, best = 1, len(entries) - 1, None
+    while low <= high:
+        mid = (low + high) // 2
+        candidate = render(mid)
+        if counter.count(candidate) <= budget:
+            best, low = candidate, mid + 1
+        else:
+            high = mid - 1
+    return best
+
+
+def pack_context(
+    docs: Sequence[Document],
+    counter: TokenCounter,
+    budget: int = CONTEXT_TOKEN_BUDGET,
+    min_truncated_tokens: int = CONTEXT_MIN_TRUNCATED_TOKENS,
+) -> PackedContext:
+    """Fills budget with docs in the given (score) order."""
+    separator_tokens = counter.count(SEPARATOR)
+    packed: List[Dict] = []            # {"doc", "text", "tokens"}
+    seen_texts = set()
+    transaction_months = set()
+    used = dropped = truncated = 0
+
+    for doc in docs:
+        text = doc.page_content
+        chunk_type = doc.metadata.get("type")
+        month = _month_key(doc)
+
+        if text in seen_texts:
+            dropped += 1
+            continue
+        if chunk_type == "monthly_summary" and month in transaction_months:
+            dropped += 1
+            continue
+
+        cost = counter.count(text) + (separator_tokens if packed else 0)
+        remaining = budget - used
+        if cost > remaining:
+            room = remaining - (separator_tokens if packed else 0)
+            cut = _truncate(text, room, counter) if room >= min_truncated_tokens else None
+            if cut is None:
+                dropped += 1
+                continue
+            text = cut
+            cost = counter.count(text) + (separator_tokens if packed else 0)
+            truncated += 1
+
+        seen_texts.add(doc.page_content)
+        packed.append({"doc": doc, "text": text, "tokens": cost})
+        used += cost
+
+        if chunk_type == "monthly_transaction":
+            transaction_months.add(month)
+            # Its summary is now redundant; give the budget back
+            for entry in list(packed):
+                entry_doc = entry["doc"]
+                if entry_doc.metadata.get("type") == "monthly_summary" and _month_key(entry_doc) == month:
+                    first = packed[0] is entry
+                    packed.remove(entry)
+                    used -= entry["tokens"]
+                    dropped += 1
+                    if first and packed:
+                        # The next entry now leads and loses its separator
+                        packed[0]["tokens"] -= separator_tokens
+                        used -= separator_tokens
+
+    if not packed:
+        return PackedContext(EMPTY_CONTEXT, counter.count(EMPTY_CONTEXT), 0, dropped, truncated)
+
+    text = SEPARATOR.join(entry["text"] for entry in packed)
+    return PackedContext(text, counter.count(text), len(packed), dropped, truncated)
+
+
+# Singleton instance
+token_counter = TokenCounter(CONTEXT_TOKENIZER)
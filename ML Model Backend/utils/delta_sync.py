@@ -0,0 +1,59 @@
+from typing import Any, Dict, List, Set
+
+from utils.chunk_builder import transaction_month
+from vectorstore.record_store import RECORD_KINDS, record_key
+
+
+# Chunk types rebuilt from each record kind
+TRANSACTION_CHUNK_TYPES = {"monthly_transaction", "monthly_transaction_part", "monthly_summary"}
+BUDGET_CHUNK_TYPES = {"monthly_budget"}
+BALANCE_SHEET_CHUNK_TYPES = {"balance_sheet"}
+
+
+def empty_scope() -> Dict[str, Set[str]]:
+    return {kind: set() for kind in RECORD_KINDS}
+
+
+def affected_scope(touched: Dict[str, List[Dict[str, Any]]]) -> Dict[str, Set[str]]:
+    """
+    Works out which chunks a set of touched records invalidates:
+    transaction months, budget months and individual balance sheets.
+    """
+    scope = empty_scope()
+    for tx in touched.get("transactions", []):
+        scope["transactions"].add(transaction_month(tx))
+    for b in touched.get("budgets", []):
+        scope["budgets"].add(b.get("month", "unknown"))
+    for bs in touched.get("balance_sheets", []):
+        scope["balance_sheets"].add(record_key(bs))
+    return scope
+
+
+def select_records(user_data: Dict[str, List[Dict[str, Any]]], scope: Dict[str, Set[str]]):
+    """Subset of a user's records that feeds the chunks in scope."""
+    return {
+        "transactions": [
+            tx for tx in user_data.get("transactions", [])
+            if transaction_month(tx) in scope["transactions"]
+        ],
+        "budgets": [
+            b for b in user_data.get("budgets", [])
+            if b.get("month", "unknown") in scope["budgets"]
+        ],
+        "balance_sheets": [
+            bs for bs in user_data.get("balance_sheets", [])
+            if record_key(bs) in scope["balance_sheets"]
+        ],
+    }
+
+
+def chunk_in_scope(metadata: Dict[str, Any], scope: Dict[str, Set[str]]) -> bool:
+    """True when a stored chunk was built from records in scope."""
+    chunk_type = metadata.get("type")
+    if chunk_type in TRANSACTION_CHUNK_TYPES:
+        return metadata.get("month") in scope["transactions"]
+    if chunk_type in BUDGET_CHUNK_TYPES:
+        return metadata.get("month") in scope["budgets"]
+    if chunk_type in BALANCE_SHEET_CHUNK_TYPES:
+        return metadata.get("doc_id") in scope["balance_sheets"]
+    return False
@@ -0,0 +1,73 @@
+"""
+Metadata hints (period, category, chunk type) parsed out of a chat question,
+used to pre-filter retrieval candidates.
+"""
+import re
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Optional, Sequence, Set
+
+from utils.aggregate_cube import find_category, parse_period
+
+_BALANCE_SHEET = re.compile(
+    r"\b(balance sheet|assets?|liabilit(y|ies)|equity|net worth|current ratio|debt[\s-]*(to|/)[\s-]*equity)\b"
+)
+_BUDGET = re.compile(r"\b(budget|budgets|budgeted|allocation|allocations)\b")
+
+
+@dataclass
+class QueryHints:
+    months: Optional[Set[str]] = None     # "YYYY-MM"; None = any
+    years: Optional[Set[str]] = None
+    categories: Set[str] = field(default_factory=set)
+    chunk_types: Optional[Set[str]] = None
+
+    def is_empty(self) -> bool:
+        return self.months is None and self.years is None and not self.categories and self.chunk_types is None
+
+
+def parse_query_hints(
+    message: str,
+    known_months: Sequence[str] = (),
+    known_categories: Sequence[str] = (),
+    today: Optional[date] = None,
+) -> QueryHints:
+    """
+    known_months / known_categories come from the user's aggregate cube;
+    without them only explicit dates ("2025-07", "July 2025") are recognised.
+    Hints only narrow retrieval, so a question they can't be parsed from
+    gets none rather than failing the request.
+    """
+    try:
+        return _parse_query_hints(message, known_months, known_categories, today)
+    except Exception as e:
+        print(f"Error parsing query hints: {e}")
+        return QueryHints()
+
+
+def _parse_query_hints(
+    message: str,
+    known_months: Sequence[str],
+    known_categories: Sequence[str],
+    today: Optional[date],
+) -> QueryHints:
+    text = message.lower()
+    hints = QueryHints()
+
+    months, label = parse_period(text, known_months, today)
+    if months is not None:
+        if label.isdigit():
+            hints.years = {label}
+        elif months:
+            hints.months = set(months)
+
+    category = find_category(text, known_categories)
+    if category is not None:
+        hints.categories = {category}
+
+    if _BALANCE_SHEET.search(text):
+        hints.chunk_types = {"balance_sheet"}
+    elif _BUDGET.search(text):
+        # Budget questions usually compare against actual spending too
+        hints.chunk_types = {"monthly_budget", "monthly_transaction", "monthly_transaction_part", "monthly_summary"}
+    return hints
@@ -0,0 +1,110 @@
+"""
+Incremental pieces of the NDJSON sync path (/sync-user-data/stream).
+
+Each line of the body is one record:
+
+    {"kind": "transactions", "record": {...}}
+
+Records are parsed as bytes arrive and transactions are grouped into
+months on the fly. Histories usually arrive in date order, so a month is
+treated as complete once a record from another month shows up and can be
+chunked and embedded straight away. A month that shows up again after it
+was flushed is "reopened" and rebuilt from the staged records at the end.
+
+Records are only held until the caller saves them (take_unsaved), so
+memory stays bounded by one month plus what is read between saves,
+whatever the size of the upload.
+"""
+import json
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+from utils.chunk_builder import transaction_month
+from vectorstore.record_store import RECORD_KINDS
+
+
+class NDJSONError(ValueError):
+    """A body line that isn't a valid record."""
+
+
+class NDJSONDecoder:
+    """Splits a byte stream into parsed (kind, record) lines."""
+
+    def __init__(self):
+        self._buffer = b""
+        self.line_number = 0
+
+    def feed(self, data: bytes) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        self._buffer += data
+        *lines, self._buffer = self._buffer.split(b"\n")
+        for line in lines:
+            parsed = self._parse(line)
+            if parsed is not None:
+                yield parsed
+
+    def close(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        line, self._buffer = self._buffer, b""
+        parsed = self._parse(line)
+        if parsed is not None:
+            yield parsed
+
+    def _parse(self, line: bytes) -> Optional[Tuple[str, Dict[str, Any]]]:
+        self.line_number += 1
+        if not line.strip():
+            return None
+        try:
+            item = json.loads(line)
+        except ValueError as e:
+            raise NDJSONError(f"line {self.line_number}: invalid JSON ({e})")
+        if not isinstance(item, dict) or item.get("kind") not in RECORD_KINDS:
+            raise NDJSONError(f"line {self.line_number}: 'kind' must be one of {', '.join(RECORD_KINDS)}")
+        record = item.get("record")
+        if not isinstance(record, dict):
+            raise NDJSONError(f"line {self.line_number}: 'record' must be an object")
+        return item["kind"], record
+
+
+class MonthStream:
+    """Groups a user's streamed records and hands back transaction months as they complete."""
+
+    def __init__(self):
+        self.unsaved: Dict[str, List[Dict[str, Any]]] = {kind: [] for kind in RECORD_KINDS}
+        self.unsaved_count = 0
+        self.flushed: Set[str] = set()
+        self.reopened: Set[str] = set()
+        self._month: Optional[str] = None
+        self._pending: List[Dict[str, Any]] = []
+
+    def add(self, kind: str, record: Dict[str, Any]) -> Optional[List[Dict[str, Any]]]:
+        """Returns the previous month's transactions when this record starts a new month."""
+        self.unsaved[kind].append(record)
+        self.unsaved_count += 1
+        if kind != "transactions":
+            return None
+
+        month = transaction_month(record)
+        if month == self._month:
+            self._pending.append(record)
+            return None
+        if month in self.flushed:
+            self.reopened.add(month)
+            return None
+
+        completed = self.finish()
+        self._month, self._pending = month, [record]
+        return completed
+
+    def finish(self) -> Optional[List[Dict[str, Any]]]:
+        """Returns the month still being collected, if any."""
+        if self._month is None:
+            return None
+        completed = self._pending
+        self.flushed.add(self._month)
+        self._month, self._pending = None, []
+        return completed
+
+    def take_unsaved(self) -> Dict[str, List[Dict[str, Any]]]:
+        """Records added since the last call, for the caller to save; forgets them."""
+        unsaved = self.unsaved
+        self.unsaved = {kind: [] for kind in RECORD_KINDS}
+        self.unsaved_count = 0
+        return unsaved
@@ -0,0 +1,152 @@
+"""Cross-request micro-batching for embedding computation."""
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Deque, Dict, List, Optional, Tuple
+
+from langchain_core.embeddings import Embeddings
+
+
+class _Request:
+    """One submit() call: its texts, the vectors computed so far and its future."""
+
+    def __init__(self, texts: List[str], future: Future):
+        self.texts = texts
+        self.future = future
+        self.vectors: List[List[float]] = []
+        self.sent = 0  # texts handed to a forward pass so far
+
+    @property
+    def remaining(self) -> int:
+        return len(self.texts) - self.sent
+
+
+class EmbeddingBatcher:
+    """
+    Collects texts from concurrent callers for up to max_wait_ms (or until
+    max_batch_size texts are queued), runs one batched forward pass and
+    resolves each caller's future with its slice of the result.
+
+    Forward passes never exceed max_batch_size texts: a large submission
+    (a full sync) is sliced, and pending requests take turns round-robin,
+    so a chat query waits behind at most one slice of it.
+    """
+
+    def __init__(self, embeddings: Embeddings, max_batch_size: int = 64, max_wait_ms: float = 5.0):
+        self.embeddings = embeddings
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue: "queue.Queue[_Request]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._counters = {"batches": 0, "texts": 0, "requests": 0}
+
+    def submit(self, texts: List[str]) -> Future:
+        self._ensure_started()
+        future: Future = Future()
+        self._queue.put(_Request(texts, future))
+        return future
+
+    def _ensure_started(self):
+        if self._thread is None:
+            with self._start_lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(
+                        target=self._run, name="embedding-batcher", daemon=True
+                    )
+                    self._thread.start()
+
+    def _run(self):
+        # Requests with texts not yet sent, in round-robin order
+        pending: Deque[_Request] = deque()
+        while True:
+            fresh = [] if pending else [self._queue.get()]
+            size = sum(request.remaining for request in pending) + sum(r.remaining for r in fresh)
+            deadline = time.monotonic() + self.max_wait
+
+            # Wait briefly for concurrent callers while the batch isn't full
+            while size < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    request = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                fresh.append(request)
+                size += request.remaining
+            # Anything else already queued joins this round
+            while True:
+                try:
+                    fresh.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            # New requests go ahead of ones that already had a slice
+            pending.extendleft(reversed(fresh))
+            self._process(self._next_batch(pending))
+
+    def _next_batch(self, pending: Deque[_Request]) -> List[Tuple[_Request, int, int]]:
+        """Up to max_batch_size texts as (request, start, end) slices; partly sent requests go to the back."""
+        batch = []
+        capacity = self.max_batch_size
+        for _ in range(len(pending)):
+            if capacity <= 0:
+                break
+            request = pending.popleft()
+            if request.future.done():
+                continue  # failed with an earlier slice
+            take = min(request.remaining, capacity)
+            batch.append((request, request.sent, request.sent + take))
+            request.sent += take
+            capacity -= take
+            if request.remaining:
+                pending.append(request)
+        return batch
+
+    def _process(self, batch: List[Tuple[_Request, int, int]]):
+        texts = [text for request, start, end in batch for text in request.texts[start:end]]
+        try:
+            vectors = self.embeddings.embed_documents(texts) if texts else []
+        except Exception as e:
+            for request, _, _ in batch:
+                request.sent = len(request.texts)  # drop any unsent remainder
+                if not request.future.done():
+                    request.future.set_exception(e)
+            return
+
+        self._counters["batches"] += 1
+        self._counters["texts"] += len(texts)
+
+        offset = 0
+        for request, start, end in batch:
+            request.vectors.extend(vectors[offset:offset + end - start])
+            offset += end - start
+            if end == len(request.texts) and not request.future.done():
+                self._counters["requests"] += 1
+                request.future.set_result(request.vectors)
+
+    def stats(self) -> Dict[str, float]:
+        stats = dict(self._counters)
+        stats["queued"] = self._queue.qsize()
+        stats["avg_batch_size"] = stats["texts"] / stats["batches"] if stats["batches"] else 0.0
+        return stats
+
+
+class BatchedEmbeddings(Embeddings):
+    """Embeddings wrapper that routes every call through an EmbeddingBatcher."""
+
+    def __init__(self, batcher: EmbeddingBatcher):
+        self.batcher = batcher
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        return self.batcher.submit(list(texts)).result()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
@@ -0,0 +1,174 @@
+"""Content-addressed embedding cache (in-memory LRU + SQLite on disk)."""
+from __future__ import annotations
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.split()).strip()
+
+
+class EmbeddingCache:
+    """
+    Embeddings keyed by sha256(model name + normalized text).
+
+    Lookups go memory LRU -> SQLite; disk hits are promoted to memory.
+    Both tiers are size-capped and evict least recently used entries.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        path: Optional[str] = None,
+        memory_items: int = 10_000,
+        disk_items: int = 500_000,
+    ):
+        self.model_name = model_name
+        self.memory_items = memory_items
+        self.disk_items = disk_items
+        self._memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+
+        self.path = path
+        self._db: Optional[sqlite3.Connection] = None
+
+    def _connect(self) -> Optional[sqlite3.Connection]:
+        """Opens the SQLite tier on first use, so processes that never embed never open it. Call under _lock."""
+        if self._db is None and self.path:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            db = sqlite3.connect(self.path, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                " key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_used REAL NOT NULL)"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS idx_last_used ON embeddings(last_used)")
+            db.commit()
+            self._db = db
+        return self._db
+
+    def key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model_name}\0{_normalize(text)}".encode("utf-8")).hexdigest()
+
+    def get_many(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        """Returns the cached vectors for whichever keys are present."""
+        found: Dict[str, np.ndarray] = {}
+        with self._lock:
+            missing = []
+            for k in keys:
+                vector = self._memory.get(k)
+                if vector is None:
+                    missing.append(k)
+                    continue
+                self._memory.move_to_end(k)
+                found[k] = vector
+                self._counters["memory_hits"] += 1
+
+            if missing and self._connect() is not None:
+                now = time.time()
+                for start in range(0, len(missing), 500):
+                    batch = missing[start:start + 500]
+                    rows = self._db.execute(
+                        f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(batch))})",
+                        batch,
+                    ).fetchall()
+                    for k, blob in rows:
+                        vector = np.frombuffer(blob, dtype=np.float32)
+                        found[k] = vector
+                        self._remember(k, vector)
+                        self._counters["disk_hits"] += 1
+                    if rows:
+                        self._db.executemany(
+                            "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                            [(now, k) for k, _ in rows],
+                        )
+                self._db.commit()
+
+            self._counters["misses"] += len(keys) - len(found)
+        return found
+
+    def put_many(self, items: Dict[str, np.ndarray]):
+        if not items:
+            return
+        with self._lock:
+            for k, vector in items.items():
+                self._remember(k, vector)
+            if self._connect() is not None:
+                now = time.time()
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)",
+                    [(k, np.asarray(v, dtype=np.float32).tobytes(), now) for k, v in items.items()],
+                )
+                self._evict_disk()
+                self._db.commit()
+
+    def _remember(self, k: str, vector: np.ndarray):
+        self._memory[k] = vector
+        self._memory.move_to_end(k)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def _evict_disk(self):
+        (count,) = self._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        overflow = count - self.disk_items
+        if overflow > 0:
+            # Evict a little extra so we don't pay this on every insert
+            overflow += self.disk_items // 20
+            self._db.execute(
+                "DELETE FROM embeddings WHERE key IN ("
+                " SELECT key FROM embeddings ORDER BY last_used ASC LIMIT ?)",
+                (overflow,),
+            )
+            self._counters["evictions"] += overflow
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            stats = dict(self._counters)
+            stats["memory_items"] = len(self._memory)
+            if self._connect() is not None:
+                stats["disk_items"] = self._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["memory_hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+        return stats
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper that only runs the model for texts not already cached."""
+
+    def __init__(self, embeddings: Embeddings, cache: EmbeddingCache):
+        self.embeddings = embeddings
+        self.cache = cache
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [self.cache.key(t) for t in texts]
+        found = self.cache.get_many(list(dict.fromkeys(keys)))
+
+        # Embed each missing text once, even if it repeats in the batch
+        pending: Dict[str, str] = {}
+        for k, text in zip(keys, texts):
+            if k not in found and k not in pending:
+                pending[k] = text
+
+        if pending:
+            vectors = self.embeddings.embed_documents(list(pending.values()))
+            computed = {
+                k: np.asarray(v, dtype=np.float32) for k, v in zip(pending.keys(), vectors)
+            }
+            self.cache.put_many(computed)
+            found.update(computed)
+
+        return [found[k].tolist() for k in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
@@ -0,0 +1,141 @@
+"""
+Per-shard metadata inverted indexes and a BM25 keyword index.
+
+Hybrid retrieval narrows a shard to the chunks whose month / year /
+category / type match the question, ranks those candidates both by BM25
+and by vector distance, and fuses the two rankings with reciprocal rank
+fusion. Built lazily per shard and dropped whenever the shard changes.
+"""
+from __future__ import annotations
+
+import math
+import re
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from langchain_community.vectorstores import FAISS
+
+from utils.query_hints import QueryHints
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+# Reciprocal rank fusion constant (Cormack et al.); larger flattens rank differences
+RRF_K = 60
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN.findall(text.lower())
+
+
+def _metadata_fields(metadata: Dict) -> Iterable[Tuple[str, str]]:
+    """(field, value) pairs indexed for a chunk; balance sheets get their month from the date."""
+    if metadata.get("type"):
+        yield "type", str(metadata["type"])
+
+    month = metadata.get("month") or str(metadata.get("date", ""))[:7]
+    if re.fullmatch(r"\d{4}-\d{2}", month or ""):
+        yield "month", month
+        yield "year", month[:4]
+    elif metadata.get("year"):
+        yield "year", str(metadata["year"])
+
+    for category in metadata.get("categories", ()):
+        yield "category", category
+
+
+class ShardKeywordIndex:
+    """Inverted indexes over one shard's chunks, addressed by FAISS position."""
+
+    def __init__(self, shard: FAISS, k1: float = 1.2, b: float = 0.75):
+        self.size = shard.index.ntotal
+        self.k1 = k1
+        self.b = b
+
+        postings: Dict[Tuple[str, str], List[int]] = defaultdict(list)
+        has_field: Dict[str, np.ndarray] = defaultdict(lambda: np.zeros(self.size, dtype=bool))
+        term_positions: Dict[str, List[int]] = defaultdict(list)
+        term_counts: Dict[str, List[int]] = defaultdict(list)
+        self.doc_lengths = np.zeros(self.size, dtype=np.float32)
+        # Parent chunks (month overviews of split months): chunk_id -> position
+        self.parents: Dict[str, int] = {}
+
+        for position in range(self.size):
+            doc = shard.docstore.search(shard.index_to_docstore_id[position])
+            for name, value in _metadata_fields(doc.metadata):
+                postings[(name, value)].append(position)
+                has_field[name][position] = True
+            if doc.metadata.get("chunk_id"):
+                self.parents[doc.metadata["chunk_id"]] = position
+
+            counts = Counter(tokenize(doc.page_content))
+            self.doc_lengths[position] = sum(counts.values())
+            for term, count in counts.items():
+                term_positions[term].append(position)
+                term_counts[term].append(count)
+
+        self.postings = {key: np.array(p, dtype=np.int64) for key, p in postings.items()}
+        self.has_field = dict(has_field)
+        self.terms = {
+            term: (np.array(term_positions[term], dtype=np.int64), np.array(term_counts[term], dtype=np.float32))
+            for term in term_positions
+        }
+        self.avg_length = float(self.doc_lengths.mean()) if self.size else 0.0
+
+    def _allowed(self, name: str, values: Iterable[str], strict: bool) -> np.ndarray:
+        """Chunks whose field matches; non-strict also lets through chunks without that field."""
+        mask = np.zeros(self.size, dtype=bool)
+        for value in values:
+            positions = self.postings.get((name, value))
+            if positions is not None:
+                mask[positions] = True
+        if not strict and name in self.has_field:
+            mask |= ~self.has_field[name]
+        elif not strict:
+            mask[:] = True
+        return mask
+
+    def candidates(self, hints: QueryHints) -> Optional[np.ndarray]:
+        """Positions passing the hinted filters, or None when nothing restricts the search."""
+        mask = None
+        filters = [
+            ("month", hints.months, False),
+            ("year", hints.years, False),
+            ("category", hints.categories or None, False),
+            ("type", hints.chunk_types, True),
+        ]
+        for name, values, strict in filters:
+            if values is None:
+                continue
+            allowed = self._allowed(name, values, strict)
+            mask = allowed if mask is None else mask & allowed
+        return None if mask is None else np.flatnonzero(mask)
+
+    def bm25(self, query: str, positions: Optional[np.ndarray], limit: int) -> np.ndarray:
+        """Top BM25 positions (score > 0), optionally only among positions."""
+        scores = np.zeros(self.size, dtype=np.float32)
+        for term in set(tokenize(query)):
+            entry = self.terms.get(term)
+            if entry is None:
+                continue
+            term_positions, tf = entry
+            df = len(term_positions)
+            idf = math.log(1 + (self.size - df + 0.5) / (df + 0.5))
+            norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[term_positions] / self.avg_length)
+            scores[term_positions] += idf * tf * (self.k1 + 1) / (tf + norm)
+
+        if positions is not None:
+            restricted = np.zeros_like(scores)
+            restricted[positions] = scores[positions]
+            scores = restricted
+
+        ranked = np.argsort(-scores, kind="stable")[:limit]
+        return ranked[scores[ranked] > 0]
+
+
+def reciprocal_rank_fusion(rankings: Iterable[Iterable[int]], limit: int, k: int = RRF_K) -> List[int]:
+    scores: Dict[int, float] = defaultdict(float)
+    for ranking in rankings:
+        for rank, position in enumerate(ranking):
+            scores[int(position)] += 1.0 / (k + rank + 1)
+    return sorted(scores, key=lambda p: -scores[p])[:limit]
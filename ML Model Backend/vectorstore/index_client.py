@@ -0,0 +1,82 @@
+"""Client side of the shared index server (vectorstore/index_server.py)."""
+from __future__ import annotations
+
+import threading
+import time
+from contextlib import contextmanager
+from multiprocessing.connection import Client, Connection
+from typing import Any, Iterator, Optional
+
+from app.core.config import INDEX_SERVER_ADDRESS, INDEX_SERVER_CONNECT_TIMEOUT
+
+
+class IndexServerUnavailable(RuntimeError):
+    """Raised when the index server can't be reached or the connection drops."""
+
+
+class IndexClient:
+    """
+    Calls store methods in the index server process.
+
+    Each thread (event loop, worker-pool threads) keeps its own connection,
+    so concurrent calls from one worker are served in parallel by the
+    server. A dropped connection is not retried, since the call may have
+    been applied; the next call from that thread reconnects.
+    """
+
+    def __init__(self, address: str, connect_timeout: float = 30):
+        self.address = address
+        self.connect_timeout = connect_timeout
+        self._local = threading.local()
+
+    def _connection(self) -> Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            try:
+                conn = Client(self.address, family="AF_UNIX")
+            except OSError as e:
+                raise IndexServerUnavailable(f"Index server at {self.address} unreachable: {e}") from e
+            self._local.conn = conn
+        return conn
+
+    def call(self, target: str, method: str, *args: Any, **kwargs: Any) -> Any:
+        conn = self._connection()
+        try:
+            conn.send((target, method, args, kwargs))
+            status, result = conn.recv()
+        except (OSError, EOFError) as e:
+            self._local.conn = None
+            conn.close()
+            raise IndexServerUnavailable(f"Lost connection to index server: {e}") from e
+        if status == "error":
+            raise result
+        return result
+
+    @contextmanager
+    def user_lock(self, user_id: str) -> Iterator[None]:
+        """
+        Holds the user's sync lock in the server. Calls made inside the
+        block go over the same connection; if this worker dies, the server
+        releases the lock when the connection closes.
+        """
+        self.call("server", "acquire_user_lock", user_id)
+        try:
+            yield
+        finally:
+            self.call("server", "release_user_lock", user_id)
+
+    def wait_ready(self, timeout: Optional[float] = None):
+        """Blocks until the server answers a ping (it may still be starting)."""
+        deadline = time.monotonic() + (self.connect_timeout if timeout is None else timeout)
+        while True:
+            try:
+                self.call("server", "ping")
+                return
+            except IndexServerUnavailable:
+                if time.monotonic() >= deadline:
+                    raise
+                time.sleep(0.2)
+
+
+# Singleton instance (None when the stores live in this process)
+index_client = IndexClient(INDEX_SERVER_ADDRESS, INDEX_SERVER_CONNECT_TIMEOUT) if INDEX_SERVER_ADDRESS else None
@@ -0,0 +1,255 @@
+"""
+Configurable FAISS index types for user shards.
+
+LangChain always builds an exact IndexFlatL2. Shards start out that way
+(small shards are searched fastest brute force). Once a shard reaches
+IndexConfig.train_min vectors it is rebuilt as the configured type:
+HNSW, IVF-PQ or int8 scalar quantization, optionally behind a PCA
+projection. Vector positions are preserved, so LangChain's
+index_to_docstore_id map stays valid.
+"""
+from __future__ import annotations
+
+import math
+import time
+from dataclasses import dataclass, replace
+from typing import Any, Dict, List, Optional
+
+import faiss
+import numpy as np
+
+from app.core.config import (
+    VECTOR_INDEX_HNSW_EF_SEARCH,
+    VECTOR_INDEX_HNSW_M,
+    VECTOR_INDEX_IVF_NLIST,
+    VECTOR_INDEX_IVF_NPROBE,
+    VECTOR_INDEX_PCA_DIM,
+    VECTOR_INDEX_PQ_M,
+    VECTOR_INDEX_TRAIN_MIN,
+    VECTOR_INDEX_TYPE,
+)
+
+INDEX_TYPES = ("flat", "hnsw", "ivfpq", "sq8")
+
+# Cap on vectors used to train PCA / IVF / PQ / SQ
+MAX_TRAINING_VECTORS = 65536
+# 8-bit PQ codes: 256 centroids per sub-quantizer
+MIN_PQ_TRAINING_VECTORS = 256
+
+
+@dataclass(frozen=True)
+class IndexConfig:
+    kind: str = "flat"
+    train_min: int = 2048
+    pca_dim: int = 0
+    hnsw_m: int = 32
+    ef_search: int = 64
+    ivf_nlist: int = 0
+    nprobe: int = 16
+    pq_m: int = 16
+
+    def __post_init__(self):
+        if self.kind not in INDEX_TYPES:
+            raise ValueError(f"Unknown index type {self.kind!r}; expected one of {', '.join(INDEX_TYPES)}")
+
+    @classmethod
+    def from_settings(cls) -> "IndexConfig":
+        return cls(
+            kind=VECTOR_INDEX_TYPE,
+            train_min=VECTOR_INDEX_TRAIN_MIN,
+            pca_dim=VECTOR_INDEX_PCA_DIM,
+            hnsw_m=VECTOR_INDEX_HNSW_M,
+            ef_search=VECTOR_INDEX_HNSW_EF_SEARCH,
+            ivf_nlist=VECTOR_INDEX_IVF_NLIST,
+            nprobe=VECTOR_INDEX_IVF_NPROBE,
+            pq_m=VECTOR_INDEX_PQ_M,
+        )
+
+    @property
+    def min_vectors(self) -> int:
+        """Shard size at which the configured type replaces flat."""
+        if self.kind == "flat":
+            return 0
+        if self.kind == "ivfpq":
+            return max(self.train_min, MIN_PQ_TRAINING_VECTORS)
+        return self.train_min
+
+    def factory_string(self, dim: int, n: int) -> str:
+        """faiss.index_factory description for n vectors of dimension dim."""
+        parts = []
+        if self.kind != "flat" and 0 < self.pca_dim < dim:
+            parts.append(f"PCA{self.pca_dim}")
+            dim = self.pca_dim
+
+        if self.kind == "flat":
+            parts.append("Flat")
+        elif self.kind == "hnsw":
+            parts.append(f"HNSW{self.hnsw_m}")
+        elif self.kind == "sq8":
+            parts.append("SQ8")
+        else:
+            if dim % self.pq_m:
+                raise ValueError(f"VECTOR_INDEX_PQ_M={self.pq_m} must divide the vector dimension {dim}")
+            if n < MIN_PQ_TRAINING_VECTORS:
+                raise ValueError(f"IVF-PQ needs at least {MIN_PQ_TRAINING_VECTORS} vectors to train, got {n}")
+            # ~39 training points per centroid keeps k-means quiet
+            nlist = self.ivf_nlist or int(4 * math.sqrt(n))
+            nlist = max(1, min(nlist, n // 39))
+            # "np": skip polysemous training, ~10x slower to train and unused at search time
+            parts.append(f"IVF{nlist},PQ{self.pq_m}x8np")
+        return ",".join(parts)
+
+
+def index_kind(index) -> str:
+    """Which of INDEX_TYPES an index is, looking through a PCA wrapper."""
+    index = faiss.downcast_index(index)
+    if isinstance(index, faiss.IndexPreTransform):
+        index = faiss.downcast_index(index.index)
+    if isinstance(index, faiss.IndexHNSW):
+        return "hnsw"
+    if isinstance(index, faiss.IndexIVFPQ):
+        return "ivfpq"
+    if isinstance(index, faiss.IndexScalarQuantizer):
+        return "sq8"
+    return "flat"
+
+
+def compacts_on_remove(index) -> bool:
+    """
+    True if remove_ids shifts later vectors down, which is what LangChain's
+    FAISS.delete assumes when it renumbers index_to_docstore_id. IVF keeps
+    explicit ids and HNSW can't remove at all, so those shards are rebuilt.
+    """
+    index = faiss.downcast_index(index)
+    if isinstance(index, faiss.IndexPreTransform):
+        index = faiss.downcast_index(index.index)
+    return isinstance(index, faiss.IndexFlatCodes)
+
+
+def needs_rebuild(config: IndexConfig, index) -> bool:
+    kind = index_kind(index)
+    if config.kind == "flat":
+        return kind != "flat"
+    return kind != config.kind and index.ntotal >= config.min_vectors
+
+
+def build_index(config: IndexConfig, vectors: np.ndarray, kind: Optional[str] = None):
+    """Builds, trains and fills an index of the configured type with vectors, in order."""
+    if kind is not None:
+        config = replace(config, kind=kind)
+
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    n, dim = vectors.shape
+    index = faiss.index_factory(dim, config.factory_string(dim, n), faiss.METRIC_L2)
+
+    if not index.is_trained:
+        sample = vectors
+        if n > MAX_TRAINING_VECTORS:
+            rng = np.random.default_rng(0)
+            sample = vectors[rng.choice(n, MAX_TRAINING_VECTORS, replace=False)]
+        index.train(sample)
+    index.add(vectors)
+
+    inner = faiss.downcast_index(index)
+    if isinstance(inner, faiss.IndexPreTransform):
+        inner = faiss.downcast_index(inner.index)
+    if isinstance(inner, faiss.IndexHNSW):
+        inner.hnsw.efSearch = config.ef_search
+    elif isinstance(inner, faiss.IndexIVF):
+        inner.nprobe = min(config.nprobe, inner.nlist)
+    return index
+
+
+def index_vectors(index) -> Optional[np.ndarray]:
+    """Exact stored vectors of a flat index, or None for lossy / graph indexes."""
+    if index_kind(index) != "flat" or index.ntotal == 0:
+        return None
+    return index.reconstruct_n(0, index.ntotal)
+
+
+def search_subset(index, query: np.ndarray, k: int, positions: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Positions of the k nearest vectors to query, optionally only among
+    positions. Flat / SQ / IVF filter inside FAISS with an ID selector;
+    HNSW's filtered graph walk misses results on small subsets, so those
+    candidates are scored directly from the stored vectors.
+    """
+    query = np.asarray(query, dtype=np.float32).reshape(1, -1)
+    if positions is None:
+        _, ids = index.search(query, k)
+        return ids[0][ids[0] >= 0]
+    if len(positions) == 0:
+        return positions
+
+    k = min(k, len(positions))
+    outer = faiss.downcast_index(index)
+    inner = outer
+    if isinstance(outer, faiss.IndexPreTransform):
+        inner = faiss.downcast_index(outer.index)
+
+    if isinstance(inner, faiss.IndexHNSW):
+        if inner is not outer:
+            query = outer.apply_chain(1, query)
+        vectors = inner.reconstruct_batch(positions)
+        distances = ((vectors - query) ** 2).sum(axis=1)
+        return positions[np.argsort(distances, kind="stable")[:k]]
+
+    selector = faiss.IDSelectorBatch(positions.astype(np.int64))
+    if isinstance(inner, faiss.IndexIVF):
+        params = faiss.SearchParametersIVF(sel=selector, nprobe=inner.nlist)
+    else:
+        params = faiss.SearchParameters(sel=selector)
+    _, ids = index.search(query, k, params=params)
+    return ids[0][ids[0] >= 0]
+
+
+# ---------------------------------------------------------------------
+# Recall / latency report
+# ---------------------------------------------------------------------
+def _percentile_ms(samples: List[float], q: float) -> float:
+    return round(float(np.percentile(samples, q)) * 1000, 3)
+
+
+def recall_report(
+    vectors: np.ndarray,
+    queries: np.ndarray,
+    config: IndexConfig,
+    kinds=INDEX_TYPES,
+    k: int = 10,
+) -> List[Dict[str, Any]]:
+    """
+    recall@k against the exact flat index, per-query latency and memory
+    per vector for each index type, so deployments can pick a trade-off.
+    """
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    queries = np.ascontiguousarray(queries, dtype=np.float32)
+    k = min(k, len(vectors))
+
+    exact = build_index(config, vectors, kind="flat")
+    _, truth = exact.search(queries, k)
+
+    rows = []
+    for kind in kinds:
+        started = time.perf_counter()
+        index = build_index(config, vectors, kind=kind)
+        build_s = time.perf_counter() - started
+
+        latencies = []
+        found = np.empty_like(truth)
+        for i, query in enumerate(queries):
+            started = time.perf_counter()
+            _, ids = index.search(query[None, :], k)
+            latencies.append(time.perf_counter() - started)
+            found[i] = ids[0]
+
+        hits = sum(len(set(t) & set(f)) for t, f in zip(truth, found))
+        rows.append({
+            "index": kind,
+            "factory": replace(config, kind=kind).factory_string(vectors.shape[1], len(vectors)),
+            f"recall@{k}": round(hits / truth.size, 4),
+            "p50_ms": _percentile_ms(latencies, 50),
+            "p95_ms": _percentile_ms(latencies, 95),
+            "build_s": round(build_s, 3),
+            "bytes_per_vector": round(faiss.serialize_index(index).nbytes / len(vectors), 1),
+        })
+    return rows
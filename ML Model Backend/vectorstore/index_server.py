@@ -0,0 +1,157 @@
+"""
+Shared index server: one process owns the per-user FAISS shards and the
+raw record store, so several API worker processes can serve the same users.
+
+    INDEX_SERVER_ADDRESS=/tmp/insightedge-index.sock python -m vectorstore.index_server
+    INDEX_SERVER_ADDRESS=/tmp/insightedge-index.sock uvicorn main:app --workers 4
+
+Workers reach it over a Unix socket (multiprocessing.connection, pickled
+calls) through RemoteVectorStore / RemoteRecordStore. They keep the
+CPU-heavy work: embedding (each with its own cache, batcher and model),
+chunking, classification and LLM calls. The server only does FAISS and
+record bookkeeping, one thread per worker connection, and takes the
+snapshots since it owns the data.
+
+The socket is created owner-only (0600): calls are unpickled, so anyone
+who can connect can run code as this user.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import signal
+import threading
+from multiprocessing.connection import Connection, Listener
+from typing import Any, Dict, Optional
+
+from app.core.config import INDEX_SERVER_ADDRESS
+from vectorstore.record_store import RecordStore
+from vectorstore.snapshot import SnapshotManager, snapshot_manager_for
+from vectorstore.vector_store import IndexServerVectorStore, VectorStore
+
+# Methods workers may call, per target
+EXPOSED = {
+    "vectors": {
+        "add_embeddings", "count", "user_ids", "delete_user_vectors",
+        "promote_shard", "delete_documents", "replace_documents", "search", "stats",
+    },
+    "records": {
+        "version", "has_user", "keyed_by_position", "replace", "delete_user", "records",
+        "user_data", "apply",
+        "append_staged", "staged_records", "promote_staged", "discard_staged",
+    },
+}
+
+
+class IndexServer:
+    def __init__(self, address: str, vector_store: VectorStore, record_store: RecordStore):
+        self.address = address
+        self.targets = {"vectors": vector_store, "records": record_store}
+        self.record_store = record_store
+        self._listener: Optional[Listener] = None
+
+    def serve_forever(self):
+        if os.path.exists(self.address):
+            os.unlink(self.address)  # stale socket from a previous run
+        previous_umask = os.umask(0o177)
+        try:
+            self._listener = Listener(self.address, family="AF_UNIX")
+        finally:
+            os.umask(previous_umask)
+        print(f"Index server listening on {self.address}")
+
+        while True:
+            try:
+                conn = self._listener.accept()
+            except OSError:
+                break  # closed by close()
+            threading.Thread(target=self._serve, args=(conn,), name="index-conn", daemon=True).start()
+
+    def close(self):
+        if self._listener is not None:
+            self._listener.close()
+            self._listener = None
+
+    # ------------------------------------------------------------------
+    # Connections
+    # ------------------------------------------------------------------
+    def _serve(self, conn: Connection):
+        # User sync locks this connection holds, released if the worker dies
+        held: Dict[str, threading.Lock] = {}
+        try:
+            while True:
+                try:
+                    target, method, args, kwargs = conn.recv()
+                except (EOFError, OSError):
+                    break
+                try:
+                    reply = ("ok", self._dispatch(held, target, method, args, kwargs))
+                except Exception as e:
+                    reply = ("error", e)
+                try:
+                    conn.send(reply)
+                except (EOFError, OSError):
+                    break
+                except Exception as e:
+                    # Result or exception that doesn't pickle
+                    conn.send(("error", RuntimeError(f"{type(e).__name__}: {e}")))
+        finally:
+            for lock in held.values():
+                lock.release()
+            conn.close()
+
+    def _dispatch(self, held: Dict[str, threading.Lock], target: str, method: str, args, kwargs) -> Any:
+        if target == "server":
+            if method == "ping":
+                return "pong"
+            if method == "acquire_user_lock":
+                user_id = args[0]
+                lock = self.record_store.user_lock(user_id)
+                lock.acquire()
+                held[user_id] = lock
+                return None
+            if method == "release_user_lock":
+                lock = held.pop(args[0], None)
+                if lock is not None:
+                    lock.release()
+                return None
+        elif method in EXPOSED.get(target, ()):
+            return getattr(self.targets[target], method)(*args, **kwargs)
+        raise ValueError(f"Index server has no method {target}.{method}")
+
+
+def _terminate(signum, frame):
+    raise KeyboardInterrupt
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Shared vector / record index server for multi-worker serving.")
+    parser.add_argument("--address", default=INDEX_SERVER_ADDRESS, help="Unix socket path (default: INDEX_SERVER_ADDRESS)")
+    args = parser.parse_args()
+    if not args.address:
+        raise SystemExit("Set INDEX_SERVER_ADDRESS or pass --address")
+
+    vector_store = IndexServerVectorStore()
+    record_store = RecordStore()
+    snapshots: Optional[SnapshotManager] = snapshot_manager_for(vector_store, record_store)
+    if snapshots is not None:
+        snapshots.restore()
+        snapshots.start()
+
+    server = IndexServer(args.address, vector_store, record_store)
+    # Shut down (and take the final snapshot) on SIGTERM as on Ctrl-C
+    signal.signal(signal.SIGTERM, _terminate)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+        if snapshots is not None:
+            snapshots.stop()
+        if os.path.exists(args.address):
+            os.unlink(args.address)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""Deferred construction of the embedding model."""
+from __future__ import annotations
+
+import threading
+import time
+from typing import Callable, List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+
+class LazyEmbeddings(Embeddings):
+    """
+    Builds the wrapped model (sentence-transformers + torch for MiniLM) on
+    first use or on an explicit load(), exactly once even when several
+    threads get there together. Keeps importing the app cheap.
+    """
+
+    def __init__(self, factory: Callable[[], Embeddings]):
+        self.factory = factory
+        self.load_seconds: Optional[float] = None
+        self._model: Optional[Embeddings] = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._model is not None
+
+    def load(self) -> Embeddings:
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    started = time.perf_counter()
+                    model = self.factory()
+                    self.load_seconds = time.perf_counter() - started
+                    self._model = model
+        return self._model
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.load().embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.load().embed_query(text)
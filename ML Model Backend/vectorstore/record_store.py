@@ -0,0 +1,240 @@
+import threading
+import uuid
+from collections import defaultdict
+from typing import Any, ContextManager, Dict, Iterable, List, Optional, Set, Tuple
+
+from utils.chunk_builder import transaction_month
+from vectorstore.index_client import IndexClient, index_client
+
+RECORD_KINDS = ("transactions", "budgets", "balance_sheets")
+
+# (store epoch, per-user counter): see RecordStore.version
+DataVersion = Tuple[str, int]
+
+
+def record_key(record: Dict[str, Any], position: Optional[int] = None) -> str:
+    """Stable key for a record: its Mongo _id, or its position when it has none."""
+    record_id = record.get("_id")
+    if record_id is not None and str(record_id):
+        return str(record_id)
+    return f"_pos{position}"
+
+
+class RecordStore:
+    """
+    Per-user copy of the raw records last synced for each user, keyed by Mongo _id.
+
+    Delta syncs use it to rebuild only the chunks an upsert/delete touches.
+    User locks serialise syncs of one user; _lock guards the maps
+    themselves, so snapshots never iterate them mid-change.
+
+    Streamed full syncs collect their records under a staging id, apart
+    from the users (no versions, not in snapshots), and promote them once
+    the whole stream is in.
+    """
+
+    def __init__(self):
+        self._users: Dict[str, Dict[str, Dict[str, Dict[str, Any]]]] = {}
+        self._staged: Dict[str, Dict[str, Dict[str, Dict[str, Any]]]] = {}
+        # Records appended per staging id and kind, for positional keys as in replace()
+        self._staged_counts: Dict[str, Dict[str, int]] = {}
+        self._versions: Dict[str, int] = {}
+        # New on every start: a store restored from an older snapshot counts
+        # versions up again, and workers' caches must not take those for the old ones
+        self.epoch = uuid.uuid4().hex
+        # Bumped on every change; snapshots use it to skip unchanged saves
+        self.generation = 0
+        self._lock = threading.RLock()
+        self._user_locks: Dict[str, threading.Lock] = defaultdict(threading.Lock)
+        self._locks_guard = threading.Lock()
+
+    def user_lock(self, user_id: str) -> threading.Lock:
+        """Serialises syncs for one user so their deletes/adds don't interleave."""
+        with self._locks_guard:
+            return self._user_locks[user_id]
+
+    def version(self, user_id: str) -> DataVersion:
+        """Per-user data version, bumped on every sync that changes the user's data."""
+        with self._lock:
+            return self.epoch, self._versions.get(user_id, 0)
+
+    def _bump(self, user_id: str):
+        self._versions[user_id] = self._versions.get(user_id, 0) + 1
+        self.generation += 1
+
+    def has_user(self, user_id: str) -> bool:
+        with self._lock:
+            return user_id in self._users
+
+    def keyed_by_position(self, user_id: str) -> bool:
+        """True when some of the user's records had no _id (e.g. a CSV backfill); deltas can't address them."""
+        with self._lock:
+            kinds = self._users.get(user_id, {})
+            return any(key.startswith("_pos") for records in kinds.values() for key in records)
+
+    def replace(self, user_id: str, user_data: Dict[str, List[Dict[str, Any]]]):
+        """Replaces everything stored for a user (full sync)."""
+        records = {
+            kind: {
+                record_key(record, i): record
+                for i, record in enumerate(user_data.get(kind, []) or [])
+            }
+            for kind in RECORD_KINDS
+        }
+        with self._lock:
+            self._users[user_id] = records
+            self._bump(user_id)
+
+    def delete_user(self, user_id: str):
+        with self._lock:
+            if self._users.pop(user_id, None) is not None:
+                self._bump(user_id)
+
+    def records(self, user_id: str, kind: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            return list(self._users.get(user_id, {}).get(kind, {}).values())
+
+    def user_data(self, user_id: str) -> Dict[str, List[Dict[str, Any]]]:
+        """All records for a user, in the shape build_chunks expects."""
+        with self._lock:
+            return {kind: self.records(user_id, kind) for kind in RECORD_KINDS}
+
+    def apply(
+        self,
+        user_id: str,
+        kind: str,
+        upserts: Iterable[Dict[str, Any]] = (),
+        deletes: Iterable[str] = (),
+    ) -> List[Dict[str, Any]]:
+        """
+        Applies upserts/deletes for one record kind.
+        Returns every record version touched (previous and new), so callers
+        can work out which chunks went stale.
+        """
+        upserts = list(upserts)
+        for record in upserts:
+            if record.get("_id") is None:
+                raise ValueError(f"Upserted {kind} record is missing '_id'")
+
+        with self._lock:
+            store = self._users.setdefault(user_id, {k: {} for k in RECORD_KINDS})[kind]
+            touched = []
+
+            for record_id in deletes:
+                old = store.pop(str(record_id), None)
+                if old is not None:
+                    touched.append(old)
+
+            for record in upserts:
+                key = str(record["_id"])
+                old = store.get(key)
+                if old is not None:
+                    touched.append(old)
+                store[key] = record
+                touched.append(record)
+
+            if touched:
+                self._bump(user_id)
+            return touched
+
+    def append_staged(self, staging_id: str, user_data: Dict[str, List[Dict[str, Any]]]):
+        """Adds the next records of a streamed full sync, keyed as replace() would key them."""
+        with self._lock:
+            staged = self._staged.setdefault(staging_id, {kind: {} for kind in RECORD_KINDS})
+            counts = self._staged_counts.setdefault(staging_id, {kind: 0 for kind in RECORD_KINDS})
+            for kind in RECORD_KINDS:
+                for record in user_data.get(kind, []) or []:
+                    staged[kind][record_key(record, counts[kind])] = record
+                    counts[kind] += 1
+
+    def staged_records(self, staging_id: str, kind: str, months: Optional[Set[str]] = None) -> List[Dict[str, Any]]:
+        """Staged records of one kind; for transactions, optionally only those in months."""
+        with self._lock:
+            records = list(self._staged.get(staging_id, {}).get(kind, {}).values())
+        if months is not None and kind == "transactions":
+            records = [tx for tx in records if transaction_month(tx) in months]
+        return records
+
+    def promote_staged(self, staging_id: str, user_id: str):
+        """Replaces everything stored for user_id with the records staged under staging_id."""
+        with self._lock:
+            self._users[user_id] = self._staged.pop(staging_id, None) or {kind: {} for kind in RECORD_KINDS}
+            self._staged_counts.pop(staging_id, None)
+            self._bump(user_id)
+
+    def discard_staged(self, staging_id: str):
+        with self._lock:
+            self._staged.pop(staging_id, None)
+            self._staged_counts.pop(staging_id, None)
+
+    def to_state(self) -> Dict[str, Any]:
+        """Plain-dict state for snapshots, copied under the lock so it is never torn."""
+        with self._lock:
+            return {
+                "users": {
+                    user_id: {kind: dict(records) for kind, records in kinds.items()}
+                    for user_id, kinds in self._users.items()
+                },
+                "versions": dict(self._versions),
+            }
+
+    def load_state(self, state: Dict[str, Any]):
+        with self._lock:
+            self._users = state["users"]
+            self._versions = state["versions"]
+
+
+class RemoteRecordStore:
+    """RecordStore API over the index server, for running several workers."""
+
+    def __init__(self, client: IndexClient):
+        self.client = client
+
+    def user_lock(self, user_id: str) -> ContextManager[None]:
+        return self.client.user_lock(user_id)
+
+    def version(self, user_id: str) -> DataVersion:
+        return self.client.call("records", "version", user_id)
+
+    def has_user(self, user_id: str) -> bool:
+        return self.client.call("records", "has_user", user_id)
+
+    def keyed_by_position(self, user_id: str) -> bool:
+        return self.client.call("records", "keyed_by_position", user_id)
+
+    def replace(self, user_id: str, user_data: Dict[str, List[Dict[str, Any]]]):
+        self.client.call("records", "replace", user_id, user_data)
+
+    def delete_user(self, user_id: str):
+        self.client.call("records", "delete_user", user_id)
+
+    def records(self, user_id: str, kind: str) -> List[Dict[str, Any]]:
+        return self.client.call("records", "records", user_id, kind)
+
+    def user_data(self, user_id: str) -> Dict[str, List[Dict[str, Any]]]:
+        return self.client.call("records", "user_data", user_id)
+
+    def apply(
+        self,
+        user_id: str,
+        kind: str,
+        upserts: Iterable[Dict[str, Any]] = (),
+        deletes: Iterable[str] = (),
+    ) -> List[Dict[str, Any]]:
+        return self.client.call("records", "apply", user_id, kind, list(upserts), list(deletes))
+
+    def append_staged(self, staging_id: str, user_data: Dict[str, List[Dict[str, Any]]]):
+        self.client.call("records", "append_staged", staging_id, user_data)
+
+    def staged_records(self, staging_id: str, kind: str, months: Optional[Set[str]] = None) -> List[Dict[str, Any]]:
+        return self.client.call("records", "staged_records", staging_id, kind, months)
+
+    def promote_staged(self, staging_id: str, user_id: str):
+        self.client.call("records", "promote_staged", staging_id, user_id)
+
+    def discard_staged(self, staging_id: str):
+        self.client.call("records", "discard_staged", staging_id)
+
+
+# Singleton instance (a client of the index server when one is configured)
+record_store_instance = RemoteRecordStore(index_client) if index_client is not None else RecordStore()
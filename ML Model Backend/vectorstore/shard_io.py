@@ -0,0 +1,89 @@
+"""Reading and writing single FAISS shards to disk."""
+from __future__ import annotations
+
+import fcntl
+import hashlib
+import os
+import pickle
+import shutil
+
+import faiss
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS
+from langchain_core.embeddings import Embeddings
+
+# Snapshot directory layout, shared by SnapshotManager and the offline backfill
+MANIFEST = "manifest.json"
+LATEST = "LATEST"
+DIRECTORY_LOCK = ".lock"
+
+
+def shard_name(user_id: str) -> str:
+    """File name stem of a user's shard inside a snapshot's shards/ directory."""
+    return hashlib.sha1(user_id.encode("utf-8")).hexdigest()
+
+
+def lock_directory(directory: str, exclusive: bool = False, blocking: bool = True):
+    """
+    flock()s the snapshot directory. The API / index server hold it shared
+    while they own the directory; the offline backfill takes it exclusively,
+    so neither flips LATEST or prunes snapshots under the other.
+
+    Returns the open lock file (closing it releases the lock), or None when
+    not blocking and the lock is taken.
+    """
+    os.makedirs(directory, exist_ok=True)
+    f = open(os.path.join(directory, DIRECTORY_LOCK), "a")
+    flags = fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH
+    try:
+        fcntl.flock(f, flags if blocking else flags | fcntl.LOCK_NB)
+    except BlockingIOError:
+        f.close()
+        return None
+    return f
+
+
+def write_latest(directory: str, name: str) -> None:
+    """Atomically points LATEST at a completed snapshot."""
+    tmp = os.path.join(directory, LATEST + ".tmp")
+    with open(tmp, "w") as f:
+        f.write(name)
+    os.replace(tmp, os.path.join(directory, LATEST))
+
+
+def write_shard(shard: FAISS, index_path: str, docstore_path: str) -> None:
+    """Writes a shard's FAISS index and its docstore / id map side by side."""
+    faiss.write_index(shard.index, index_path)
+    with open(docstore_path, "wb") as f:
+        pickle.dump(
+            {"docstore": shard.docstore._dict, "index_to_docstore_id": shard.index_to_docstore_id},
+            f,
+            protocol=pickle.HIGHEST_PROTOCOL,
+        )
+
+
+def read_index(index_path: str):
+    """Memory-maps the index when the FAISS build supports it for this index type."""
+    try:
+        return faiss.read_index(index_path, faiss.IO_FLAG_MMAP)
+    except RuntimeError:
+        return faiss.read_index(index_path)
+
+
+def read_shard(index_path: str, docstore_path: str, embeddings: Embeddings) -> FAISS:
+    with open(docstore_path, "rb") as f:
+        state = pickle.load(f)
+    return FAISS(
+        embeddings,
+        read_index(index_path),
+        InMemoryDocstore(state["docstore"]),
+        state["index_to_docstore_id"],
+    )
+
+
+def link_or_copy(src: str, dst: str) -> None:
+    """Hard-links an unchanged file into a new snapshot, copying if links aren't supported."""
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
@@ -0,0 +1,242 @@
+"""Periodic on-disk snapshots of the vector store and record store."""
+from __future__ import annotations
+
+import json
+import os
+import pickle
+import shutil
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Optional
+
+from app.core.config import (
+    VECTOR_SNAPSHOT_DIR,
+    VECTOR_SNAPSHOT_INTERVAL_SECONDS,
+    VECTOR_SNAPSHOT_RETENTION,
+)
+from vectorstore.record_store import RecordStore, record_store_instance
+from vectorstore.shard_io import (
+    LATEST,
+    MANIFEST,
+    link_or_copy,
+    lock_directory,
+    shard_name,
+    write_latest,
+    write_shard,
+)
+from vectorstore.vector_store import VectorStore, vector_db_instance
+
+
+class SnapshotManager:
+    """
+    Writes snapshot-<timestamp>/ directories holding one FAISS file + docstore
+    pickle per shard, the raw record store and a manifest, then flips LATEST.
+    Only snapshots with a manifest are ever restored or counted for retention.
+
+    Shards unchanged since the previous snapshot are hard-linked instead of
+    rewritten, and restore only registers shard files; each shard is
+    memory-mapped the first time its user is queried, so restart time does
+    not grow with corpus size.
+
+    From the first restore/save until stop() it holds the directory lock
+    (shared), which keeps the offline backfill out while it owns LATEST.
+    """
+
+    def __init__(
+        self,
+        vector_store: VectorStore,
+        record_store: RecordStore,
+        directory: str,
+        interval_seconds: float = 300,
+        retention: int = 3,
+    ):
+        self.vector_store = vector_store
+        self.record_store = record_store
+        self.directory = directory
+        self.interval_seconds = interval_seconds
+        self.retention = max(1, retention)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._save_lock = threading.Lock()
+        self._directory_lock = None
+        self._directory_lock_guard = threading.Lock()
+        self._saved_generations = (
+            (vector_store.generation, record_store.generation) if self.owns_data else None
+        )
+
+    @property
+    def owns_data(self) -> bool:
+        """False for the remote stores of a multi-worker deployment: the index server snapshots those."""
+        return isinstance(self.vector_store, VectorStore) and isinstance(self.record_store, RecordStore)
+
+    def _hold_directory(self):
+        with self._directory_lock_guard:
+            if self._directory_lock is not None:
+                return
+            self._directory_lock = lock_directory(self.directory, blocking=False)
+            if self._directory_lock is None:
+                print(f"Waiting for the backfill holding {self.directory} to finish...")
+                self._directory_lock = lock_directory(self.directory)
+
+    def _release_directory(self):
+        with self._directory_lock_guard:
+            if self._directory_lock is not None:
+                self._directory_lock.close()
+                self._directory_lock = None
+
+    # ------------------------------------------------------------------
+    # Save
+    # ------------------------------------------------------------------
+    def save(self, force: bool = False) -> Optional[str]:
+        """Writes a new snapshot if anything changed. Returns its path."""
+        if not self.owns_data:
+            return None
+        with self._save_lock:
+            vector_generation = self.vector_store.generation
+            record_generation = self.record_store.generation
+            unchanged = (vector_generation, record_generation) == self._saved_generations
+            if unchanged and not force:
+                return None
+
+            self._hold_directory()
+            name = "snapshot-" + datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+            path = os.path.join(self.directory, name)
+            os.makedirs(os.path.join(path, "shards"))
+
+            started = time.perf_counter()
+            manifest = {"created_at": time.time(), "users": {}}
+            written = linked = 0
+
+            for user_id in self.vector_store.user_ids():
+                stem = shard_name(user_id)
+                index_file = os.path.join("shards", f"{stem}.faiss")
+                docstore_file = os.path.join("shards", f"{stem}.pkl")
+                index_path = os.path.join(path, index_file)
+                docstore_path = os.path.join(path, docstore_file)
+
+                # Held per shard so the files and the clean mark always agree;
+                # searches go on, changes to this user wait
+                with self.vector_store.reading(user_id):
+                    existing = self.vector_store.shard_files(user_id)
+                    if existing and all(os.path.exists(p) for p in existing):
+                        link_or_copy(existing[0], index_path)
+                        link_or_copy(existing[1], docstore_path)
+                        linked += 1
+                    else:
+                        shard = self.vector_store.get_shard(user_id)
+                        if shard is None:
+                            continue
+                        write_shard(shard, index_path, docstore_path)
+                        written += 1
+                    self.vector_store.mark_clean(user_id, index_path, docstore_path)
+
+                manifest["users"][user_id] = {"index": index_file, "docstore": docstore_file}
+
+            with open(os.path.join(path, "records.pkl"), "wb") as f:
+                pickle.dump(self.record_store.to_state(), f, protocol=pickle.HIGHEST_PROTOCOL)
+            # The manifest goes last: a snapshot without one is incomplete
+            with open(os.path.join(path, MANIFEST), "w") as f:
+                json.dump(manifest, f)
+
+            write_latest(self.directory, name)
+            self._saved_generations = (vector_generation, record_generation)
+            self._apply_retention()
+            print(
+                f"Snapshot {name}: {written} shards written, {linked} linked "
+                f"in {time.perf_counter() - started:.2f}s"
+            )
+            return path
+
+    def _apply_retention(self):
+        snapshots = sorted(
+            d for d in os.listdir(self.directory)
+            if d.startswith("snapshot-") and os.path.exists(os.path.join(self.directory, d, MANIFEST))
+        )
+        for old in snapshots[:-self.retention]:
+            # Mapped shard files stay valid after unlink on POSIX
+            shutil.rmtree(os.path.join(self.directory, old), ignore_errors=True)
+
+    # ------------------------------------------------------------------
+    # Restore
+    # ------------------------------------------------------------------
+    def restore(self) -> bool:
+        """Loads the latest snapshot, if any. Shards are mapped lazily."""
+        if not self.owns_data:
+            return False
+        self._hold_directory()
+        latest_file = os.path.join(self.directory, LATEST)
+        if not os.path.exists(latest_file):
+            return False
+
+        with open(latest_file) as f:
+            path = os.path.join(self.directory, f.read().strip())
+
+        started = time.perf_counter()
+        with open(os.path.join(path, MANIFEST)) as f:
+            manifest = json.load(f)
+        for user_id, files in manifest["users"].items():
+            self.vector_store.attach_shard_files(
+                user_id,
+                os.path.join(path, files["index"]),
+                os.path.join(path, files["docstore"]),
+            )
+
+        records_path = os.path.join(path, "records.pkl")
+        if os.path.exists(records_path):
+            with open(records_path, "rb") as f:
+                self.record_store.load_state(pickle.load(f))
+
+        print(
+            f"Restored {len(manifest['users'])} shards from {path} "
+            f"in {time.perf_counter() - started:.2f}s"
+        )
+        return True
+
+    # ------------------------------------------------------------------
+    # Background loop
+    # ------------------------------------------------------------------
+    def start(self):
+        if self.interval_seconds <= 0 or self._thread is not None or not self.owns_data:
+            return
+        self._thread = threading.Thread(target=self._run, name="vector-snapshots", daemon=True)
+        self._thread.start()
+
+    def stop(self, final_save: bool = True):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval_seconds)
+            self._thread = None
+        if final_save:
+            self.save()
+        self._release_directory()
+
+    def _run(self):
+        while not self._stop.wait(self.interval_seconds):
+            try:
+                self.save()
+            except Exception as e:
+                print(f"Warning: snapshot failed: {e}")
+
+
+def snapshot_manager_for(vector_store, record_store) -> Optional[SnapshotManager]:
+    """
+    A SnapshotManager with the configured settings, or None when snapshots
+    are disabled or the stores are clients of the index server.
+    """
+    if not VECTOR_SNAPSHOT_DIR:
+        return None
+    if not (isinstance(vector_store, VectorStore) and isinstance(record_store, RecordStore)):
+        return None
+    return SnapshotManager(
+        vector_store,
+        record_store,
+        VECTOR_SNAPSHOT_DIR,
+        interval_seconds=VECTOR_SNAPSHOT_INTERVAL_SECONDS,
+        retention=VECTOR_SNAPSHOT_RETENTION,
+    )
+
+
+# Singleton instance (None when snapshots are disabled, or when the
+# index server owns the stores and takes the snapshots)
+snapshot_manager = snapshot_manager_for(vector_db_instance, record_store_instance)
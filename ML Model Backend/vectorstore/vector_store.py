@@ -1,14 +1,77 @@
 import os
-from typing import List, Dict, Any
+import threading
+import uuid
+from abc import ABC, abstractmethod
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from typing import List, Dict, Any, Callable, Iterator, Optional, Tuple
+
+import numpy as np
 from langchain_huggingface import HuggingFaceEndpointEmbeddings,HuggingFaceEmbeddings
 from langchain_community.vectorstores import FAISS
 from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from app.core.metrics import stage
+from app.core.config import (
+    EMBEDDING_MODEL,
+    EMBEDDING_CACHE_PATH,
+    EMBEDDING_CACHE_MEMORY_ITEMS,
+    EMBEDDING_CACHE_DISK_ITEMS,
+    EMBEDDING_BATCH_SIZE,
+    EMBEDDING_BATCH_WAIT_MS,
+)
+from vectorstore.embedding_cache import EmbeddingCache, CachedEmbeddings
+from vectorstore.embedding_batcher import EmbeddingBatcher, BatchedEmbeddings
+from vectorstore.index_client import IndexClient, IndexServerUnavailable, index_client
+from vectorstore.lazy_embeddings import LazyEmbeddings
+from vectorstore.hybrid_index import ShardKeywordIndex, reciprocal_rank_fusion
+from vectorstore.index_factory import (
+    IndexConfig,
+    build_index,
+    compacts_on_remove,
+    index_kind,
+    index_vectors,
+    needs_rebuild,
+    search_subset,
+)
+from utils.query_hints import QueryHints
+from vectorstore.rw_lock import ReadWriteLock
+from vectorstore.shard_io import read_shard
+
+# Staging shards are built under "<user_id>#<purpose>-<random>" and promoted over the user's
+# shard; the routes reject user ids containing the separator so the two can't collide
+STAGING_SEPARATOR = "#"
+
+
+def check_user_id(user_id: str) -> str:
+    """Rejects user ids that would read as staging shards. Returns the id (for validators)."""
+    if STAGING_SEPARATOR in user_id:
+        raise ValueError(f"user_id must not contain {STAGING_SEPARATOR!r}")
+    return user_id
+
+
+def staging_shard_id(user_id: str, purpose: str) -> str:
+    return f"{user_id}{STAGING_SEPARATOR}{purpose}-{uuid.uuid4().hex}"
 
-os.environ['HF_HOME'] = 'D:/huggingface_cache'
 
+def is_staging_shard(shard_id: str) -> bool:
+    return STAGING_SEPARATOR in shard_id
+
+
+def shard_owner(shard_id: str) -> str:
+    """The user a shard (or staging shard) belongs to."""
+    return shard_id.split(STAGING_SEPARATOR, 1)[0]
+
+
+class EmbeddingStore(ABC):
+    """Embedding side of a vector store: cache -> batcher -> lazily loaded model."""
 
-class VectorStore:
     def __init__(self):
+        self._init_embeddings()
+        self.index_config = IndexConfig.from_settings()
+
+    def _init_embeddings(self):
         token = os.getenv("HUGGINGFACEHUB_API_TOKEN")
         if not token:
             raise ValueError("HUGGINGFACEHUB_API_TOKEN is not set in the environment variables.")
@@ -19,73 +82,489 @@ class VectorStore:
         #     huggingfacehub_api_token=token,
         # )
         
-        self.embeddings = HuggingFaceEmbeddings(model_name='sentence-transformers/all-MiniLM-L6-v2')
-        self.vector_db = None
+        self.embedding_cache = EmbeddingCache(
+            EMBEDDING_MODEL,
+            path=EMBEDDING_CACHE_PATH or None,
+            memory_items=EMBEDDING_CACHE_MEMORY_ITEMS,
+            disk_items=EMBEDDING_CACHE_DISK_ITEMS,
+        )
+        # Loads sentence-transformers / torch on first use or warm_up(),
+        # not at import. The model cache location comes from HF_HOME.
+        self.embedding_model = LazyEmbeddings(lambda: HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL))
+        # Cache first, so only misses from concurrent callers get batched
+        self.embedding_batcher = EmbeddingBatcher(
+            self.embedding_model,
+            max_batch_size=EMBEDDING_BATCH_SIZE,
+            max_wait_ms=EMBEDDING_BATCH_WAIT_MS,
+        )
+        self.embeddings = CachedEmbeddings(
+            BatchedEmbeddings(self.embedding_batcher),
+            self.embedding_cache,
+        )
+
+    def warm_up(self):
+        """Loads the embedding model and runs one forward pass (bypassing the cache)."""
+        self.embedding_model.load().embed_query("warm up")
 
     def add_documents(self, user_id: str, documents: List[Dict[str, Any]]):
         """
-        Adds documents to the vector store.
+        Adds documents to the user's shard.
         documents: List of dicts with 'text' and 'metadata'.
+        Embeds here, then hands the vectors to add_embeddings.
         """
         if not documents:
             return
 
-        docs = []
+        # Embed outside the lock so other users' requests aren't held up
+        with stage("sync", "embed_documents"):
+            vectors = self.embeddings.embed_documents([doc["text"] for doc in documents])
+        self.add_embeddings(user_id, documents, vectors)
+
+    @abstractmethod
+    def add_embeddings(self, user_id: str, documents: List[Dict[str, Any]], vectors):
+        """Adds documents whose vectors the caller already computed."""
+
+    def embedding_stats(self) -> Dict[str, Any]:
+        return {
+            "embedding_cache": self.embedding_cache.stats(),
+            "embedding_batcher": self.embedding_batcher.stats(),
+            "embedding_model_loaded": self.embedding_model.loaded,
+        }
+
+
+class VectorStore(EmbeddingStore):
+    """
+    Per-user partitioned vector store.
+
+    Every user gets their own FAISS shard, tracked in a user -> shard map,
+    so add/delete/search only ever touch that user's vectors.
+
+    Locking: _lock guards the maps and is only held for bookkeeping. Each
+    user's shards (their own and any staging shards) share a reader/writer
+    lock, so searches run in parallel with each other and with other
+    users' syncs, and only wait for changes to the same user's vectors.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.shards: Dict[str, FAISS] = {}
+
+        # Snapshot bookkeeping: shards restored but not yet read from disk,
+        # the on-disk files of every shard unchanged since it was written,
+        # and a counter bumped on every change.
+        self._lazy_shards: Dict[str, Tuple[str, str]] = {}
+        self._shard_files: Dict[str, Tuple[str, str]] = {}
+        # Hybrid retrieval indexes, built on first use: user -> (shard, index)
+        self._keyword_indexes: Dict[str, Tuple[FAISS, ShardKeywordIndex]] = {}
+        self.generation = 0
+        self._lock = threading.RLock()
+        self._shard_locks: Dict[str, ReadWriteLock] = defaultdict(ReadWriteLock)
+
+    def _shard_lock(self, shard_id: str) -> ReadWriteLock:
+        with self._lock:
+            return self._shard_locks[shard_owner(shard_id)]
+
+    @contextmanager
+    def reading(self, user_id: str) -> Iterator[None]:
+        """Holds off changes to the user's shards (searches, snapshot writes)."""
+        with self._shard_lock(user_id).read():
+            yield
+
+    @contextmanager
+    def writing(self, user_id: str) -> Iterator[None]:
+        """Exclusive access to the user's shards, for changes."""
+        with self._shard_lock(user_id).write():
+            yield
+
+    def get_shard(self, user_id: str) -> Optional[FAISS]:
+        """
+        Returns the FAISS shard for a user, or None if they have no vectors.
+        A restored shard is read from disk outside _lock, so other users'
+        lookups don't wait for it; only publishing it takes the lock.
+        """
+        with self._lock:
+            shard = self.shards.get(user_id)
+            files = self._lazy_shards.get(user_id) if shard is None else None
+        if files is None:
+            return shard
+
+        shard = read_shard(files[0], files[1], self.embeddings)
+        with self._lock:
+            if self._lazy_shards.get(user_id) == files:
+                del self._lazy_shards[user_id]
+                self.shards[user_id] = shard
+                return shard
+        # Another reader published it first (or the files were re-attached)
+        return self.get_shard(user_id)
+
+    def user_ids(self) -> List[str]:
+        """Users with a shard; staging shards still being built are left out."""
+        with self._lock:
+            shard_ids = self.shards.keys() | self._lazy_shards.keys()
+        return [shard_id for shard_id in shard_ids if not is_staging_shard(shard_id)]
+
+    def attach_shard_files(self, user_id: str, index_path: str, docstore_path: str):
+        """Registers a snapshotted shard; it is memory-mapped on first use."""
+        with self._lock:
+            self.shards.pop(user_id, None)
+            self._lazy_shards[user_id] = (index_path, docstore_path)
+            self._shard_files[user_id] = (index_path, docstore_path)
+
+    def shard_files(self, user_id: str) -> Optional[Tuple[str, str]]:
+        """On-disk files of a shard that is unchanged since they were written."""
+        with self._lock:
+            return self._shard_files.get(user_id)
+
+    def mark_clean(self, user_id: str, index_path: str, docstore_path: str):
+        with self._lock:
+            self._shard_files[user_id] = (index_path, docstore_path)
+
+    def _mark_dirty(self, user_id: str):
+        with self._lock:
+            self.generation += 1
+            self._shard_files.pop(user_id, None)
+            self._keyword_indexes.pop(user_id, None)
+
+    def add_embeddings(self, user_id: str, documents: List[Dict[str, Any]], vectors):
+        """Adds documents whose vectors the caller already computed."""
+        with self.writing(user_id):
+            self._add_locked(user_id, documents, vectors)
+
+    def _add_locked(self, user_id: str, documents: List[Dict[str, Any]], vectors):
+        texts = []
+        metadatas = []
         for doc in documents:
             # Ensure userId is in metadata
             metadata = doc.get("metadata", {})
             metadata["user_id"] = user_id
-            docs.append(Document(page_content=doc["text"], metadata=metadata))
-        
-        if self.vector_db is None:
-            self.vector_db = FAISS.from_documents(docs, self.embeddings)
-        else:
-            self.vector_db.add_documents(docs)
+            texts.append(doc["text"])
+            metadatas.append(metadata)
+        text_embeddings = list(zip(texts, vectors))
+
+        with stage("sync", "index_add"):
+            shard = self.get_shard(user_id)
+            if shard is None:
+                shard = FAISS.from_embeddings(text_embeddings, self.embeddings, metadatas=metadatas)
+                with self._lock:
+                    self.shards[user_id] = shard
+            else:
+                shard.add_embeddings(text_embeddings, metadatas=metadatas)
+            self._maybe_rebuild_index(shard)
+            self._mark_dirty(user_id)
+
+    def _shard_vectors(self, shard: FAISS) -> np.ndarray:
+        """Original vectors of a shard, in index order."""
+        vectors = index_vectors(shard.index)
+        if vectors is not None:
+            return vectors
+        # Lossy / graph indexes: re-embed the texts, normally all cache hits
+        texts = [
+            shard.docstore.search(shard.index_to_docstore_id[i]).page_content
+            for i in range(shard.index.ntotal)
+        ]
+        return np.asarray(self.embeddings.embed_documents(texts), dtype=np.float32)
+
+    def _maybe_rebuild_index(self, shard: FAISS):
+        """Switches a shard to the configured index type once it is big enough to train."""
+        if needs_rebuild(self.index_config, shard.index):
+            shard.index = build_index(self.index_config, self._shard_vectors(shard))
+
+    def _rebuild_without(self, shard: FAISS, ids_to_delete: List[str]):
+        """Delete for indexes whose remove_ids doesn't compact: rebuild from the survivors."""
+        doomed = set(ids_to_delete)
+        vectors = self._shard_vectors(shard)
+        keep = [i for i in range(shard.index.ntotal) if shard.index_to_docstore_id[i] not in doomed]
+        kind = self.index_config.kind if len(keep) >= self.index_config.min_vectors else "flat"
+
+        shard.index = build_index(self.index_config, vectors[keep], kind=kind)
+        shard.docstore.delete(ids_to_delete)
+        shard.index_to_docstore_id = {
+            position: shard.index_to_docstore_id[i] for position, i in enumerate(keep)
+        }
+
+    def count(self, user_id: str) -> int:
+        """Vectors in the user's shard."""
+        with self.reading(user_id):
+            shard = self.get_shard(user_id)
+            return shard.index.ntotal if shard is not None else 0
 
     def delete_user_vectors(self, user_id: str):
         """
         Deletes all vectors for a specific user.
+        Dropping the shard is O(1) and never touches other users' vectors.
         """
-        if self.vector_db is None:
-            return
-            
-        if not hasattr(self.vector_db, "docstore") or not self.vector_db.docstore:
-            return
+        with self.writing(user_id), stage("sync", "index_delete"):
+            with self._lock:
+                dropped = self.shards.pop(user_id, None) is not None or self._lazy_shards.pop(user_id, None)
+            if dropped:
+                self._mark_dirty(user_id)
 
-        # Safe deletion strategy for in-memory FAISS
-        ids_to_delete = []
-        
-        try:
-            # Accessing internal docstore dict - this is specific to FAISS implementation in LangChain
-            for doc_id, doc in self.vector_db.docstore._dict.items():
-                if doc.metadata.get("user_id") == user_id:
-                    ids_to_delete.append(doc_id)
-                    
-            if ids_to_delete:
-                self.vector_db.delete(ids_to_delete)
-        except Exception as e:
-            print(f"Warning: Failed to delete vectors for user {user_id}: {e}")
+    def promote_shard(self, staging_id: str, user_id: str):
+        """
+        Replaces the user's shard with one built under staging_id, so
+        searches see either the old vectors or the new ones, never a mix.
+        """
+        # Staging shards share their user's lock, so this covers both
+        with self.writing(user_id):
+            shard = self.get_shard(staging_id)
+            if shard is not None:
+                for doc in shard.docstore._dict.values():
+                    doc.metadata["user_id"] = user_id
+            with self._lock:
+                self.shards.pop(staging_id, None)
+                self.shards.pop(user_id, None)
+                self._lazy_shards.pop(user_id, None)
+                if shard is not None:
+                    self.shards[user_id] = shard
+                self._mark_dirty(staging_id)
+                self._mark_dirty(user_id)
 
-    def search(self, user_id: str, query: str, top_k: int = 5) -> List[Document]:
+    def delete_documents(self, user_id: str, predicate: Callable[[Dict[str, Any]], bool]) -> int:
         """
-        Search for documents relevant to the query, filtered by user_id.
+        Deletes the user's vectors whose metadata matches predicate.
+        Returns how many were removed.
         """
-        if self.vector_db is None:
-            return []
+        with self.writing(user_id), stage("sync", "index_delete"):
+            return self._delete_locked(user_id, predicate)
+
+    def _delete_locked(self, user_id: str, predicate: Callable[[Dict[str, Any]], bool]) -> int:
+        shard = self.get_shard(user_id)
+        if shard is None:
+            return 0
+
+        ids_to_delete = [
+            doc_id for doc_id, doc in shard.docstore._dict.items()
+            if predicate(doc.metadata)
+        ]
+        if not ids_to_delete:
+            return 0
 
-        # Fetch more to allow for filtering
+        if len(ids_to_delete) == len(shard.index_to_docstore_id):
+            with self._lock:
+                self.shards.pop(user_id, None)
+        elif compacts_on_remove(shard.index):
+            shard.delete(ids_to_delete)
+        else:
+            self._rebuild_without(shard, ids_to_delete)
+        self._mark_dirty(user_id)
+        return len(ids_to_delete)
+
+    def replace_documents(
+        self,
+        user_id: str,
+        predicate: Callable[[Dict[str, Any]], bool],
+        documents: List[Dict[str, Any]],
+        vectors,
+    ) -> int:
+        """
+        Deletes the user's vectors matching predicate and adds documents with
+        their precomputed vectors, as one change searches never see half of.
+        Returns how many were removed.
+        """
+        with self.writing(user_id):
+            with stage("sync", "index_delete"):
+                deleted = self._delete_locked(user_id, predicate)
+            if documents:
+                self._add_locked(user_id, documents, vectors)
+            return deleted
+
+    def search(
+        self,
+        user_id: str,
+        query: str,
+        top_k: int = 5,
+        query_vector: Optional[List[float]] = None,
+        hints: Optional[QueryHints] = None,
+    ) -> List[Document]:
+        """
+        Search for documents relevant to the query within the user's shard.
+        Pass query_vector to reuse an embedding the caller already computed.
+        Pass hints for hybrid retrieval: metadata pre-filtering plus BM25,
+        fused with the vector ranking. Transaction parts come back with
+        their month overview (totals) in front of them.
+        """
         try:
-            results = self.vector_db.similarity_search(query, k=top_k * 4)
-            
-            filtered_results = [
-                doc for doc in results 
-                if doc.metadata.get("user_id") == user_id
-            ]
-            
-            return filtered_results[:top_k]
+            if query_vector is None:
+                query_vector = self.embeddings.embed_query(query)
+            with self.reading(user_id):
+                shard = self.get_shard(user_id)
+                if shard is None:
+                    return []
+                k = min(top_k, shard.index.ntotal)
+                if k <= 0:
+                    return []
+                if hints is None:
+                    docs = shard.similarity_search_by_vector(query_vector, k=k)
+                else:
+                    docs = self._hybrid_search(user_id, shard, query, query_vector, k, hints)
+                return self._with_parents(user_id, shard, docs)
         except Exception as e:
             print(f"Error during search: {e}")
             return []
 
-# Singleton instance
-vector_db_instance = VectorStore()
+    def _keyword_index(self, user_id: str, shard: FAISS) -> ShardKeywordIndex:
+        """Called under the user's read lock; concurrent first searches may both build it."""
+        with self._lock:
+            cached = self._keyword_indexes.get(user_id)
+        if cached is None or cached[0] is not shard:
+            cached = (shard, ShardKeywordIndex(shard))
+            with self._lock:
+                self._keyword_indexes[user_id] = cached
+        return cached[1]
+
+    def _hybrid_search(
+        self,
+        user_id: str,
+        shard: FAISS,
+        query: str,
+        query_vector: List[float],
+        k: int,
+        hints: QueryHints,
+    ) -> List[Document]:
+        keyword_index = self._keyword_index(user_id, shard)
+        candidates = keyword_index.candidates(hints)
+        if candidates is not None and len(candidates) == 0:
+            candidates = None  # hints matched nothing; don't answer from an empty context
+
+        pool = max(k * 4, 20)
+        by_vector = search_subset(shard.index, np.asarray(query_vector), pool, candidates)
+        by_keyword = keyword_index.bm25(query, candidates, pool)
+        positions = reciprocal_rank_fusion([by_vector, by_keyword], limit=k)
+        return [shard.docstore.search(shard.index_to_docstore_id[p]) for p in positions]
+
+    def _with_parents(self, user_id: str, shard: FAISS, docs: List[Document]) -> List[Document]:
+        """Puts the month overview in front of retrieved transaction parts that lack it."""
+        if not any("parent_id" in doc.metadata for doc in docs):
+            return docs
+
+        present = {doc.metadata.get("chunk_id") for doc in docs}
+        parents = self._keyword_index(user_id, shard).parents
+        expanded = []
+        for doc in docs:
+            parent_id = doc.metadata.get("parent_id")
+            if parent_id is not None and parent_id not in present and parent_id in parents:
+                expanded.append(shard.docstore.search(shard.index_to_docstore_id[parents[parent_id]]))
+                present.add(parent_id)
+            expanded.append(doc)
+        return expanded
+
+    def stats(self) -> Dict[str, Any]:
+        """Shard count and per-shard vector counts. Staging shards are left out."""
+        with self._lock:
+            shards = {
+                user_id: shard for user_id, shard in self.shards.items()
+                if not is_staging_shard(user_id)
+            }
+            lazy = sum(1 for user_id in self._lazy_shards if not is_staging_shard(user_id))
+        vectors = {user_id: shard.index.ntotal for user_id, shard in shards.items()}
+        index_types = Counter(index_kind(shard.index) for shard in shards.values())
+        return {
+            "shards": len(vectors) + lazy,
+            "shards_on_disk": lazy,
+            "vectors": vectors,
+            "index_type": self.index_config.kind,
+            "index_types": dict(index_types),
+            **self.embedding_stats(),
+        }
+
+
+class VectorsOnly(Embeddings):
+    """Embedding function of a store that is only ever handed vectors."""
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        raise RuntimeError("This store takes precomputed vectors only; embed in the calling worker")
+
+    def embed_query(self, text: str) -> List[float]:
+        raise RuntimeError("This store takes precomputed vectors only; embed in the calling worker")
+
+
+class IndexServerVectorStore(VectorStore):
+    """
+    FAISS shards without the embedding side, for the index server: workers
+    send vectors, so the server never opens the embedding cache (shared
+    with the workers on disk) or loads the model.
+    """
+
+    def _init_embeddings(self):
+        self.embeddings = VectorsOnly()
+
+    def warm_up(self):
+        pass
+
+    def embedding_stats(self) -> Dict[str, Any]:
+        return {}
+
+
+class RemoteVectorStore(EmbeddingStore):
+    """
+    VectorStore API over the index server, for running several workers.
+
+    Shards live in the server; embeddings (the CPU-heavy part of chat and
+    sync) are computed here, in the calling worker, and only vectors,
+    hints and documents cross the socket.
+    """
+
+    def __init__(self, client: IndexClient):
+        super().__init__()
+        self.client = client
+
+    def add_embeddings(self, user_id: str, documents: List[Dict[str, Any]], vectors):
+        with stage("sync", "index_add"):
+            self.client.call("vectors", "add_embeddings", user_id, documents, np.asarray(vectors, dtype=np.float32))
+
+    def count(self, user_id: str) -> int:
+        return self.client.call("vectors", "count", user_id)
+
+    def user_ids(self) -> List[str]:
+        return self.client.call("vectors", "user_ids")
+
+    def delete_user_vectors(self, user_id: str):
+        with stage("sync", "index_delete"):
+            self.client.call("vectors", "delete_user_vectors", user_id)
+
+    def promote_shard(self, staging_id: str, user_id: str):
+        self.client.call("vectors", "promote_shard", staging_id, user_id)
+
+    def delete_documents(self, user_id: str, predicate: Callable[[Dict[str, Any]], bool]) -> int:
+        """predicate is pickled to the server: pass a module-level function or partial, not a lambda."""
+        with stage("sync", "index_delete"):
+            return self.client.call("vectors", "delete_documents", user_id, predicate)
+
+    def replace_documents(
+        self,
+        user_id: str,
+        predicate: Callable[[Dict[str, Any]], bool],
+        documents: List[Dict[str, Any]],
+        vectors,
+    ) -> int:
+        with stage("sync", "index_add"):
+            return self.client.call(
+                "vectors", "replace_documents", user_id, predicate, documents,
+                np.asarray(vectors, dtype=np.float32),
+            )
+
+    def search(
+        self,
+        user_id: str,
+        query: str,
+        top_k: int = 5,
+        query_vector: Optional[List[float]] = None,
+        hints: Optional[QueryHints] = None,
+    ) -> List[Document]:
+        try:
+            if query_vector is None:
+                query_vector = self.embeddings.embed_query(query)
+            return self.client.call(
+                "vectors", "search", user_id, query, top_k=top_k, query_vector=query_vector, hints=hints
+            )
+        except IndexServerUnavailable as e:
+            print(f"Error during search: {e}")
+            return []
+
+    def stats(self) -> Dict[str, Any]:
+        # Shard counts from the server, embedding stats from this worker
+        return {**self.client.call("vectors", "stats"), **self.embedding_stats()}
+
+
+# Singleton instance (a client of the index server when one is configured)
+vector_db_instance = RemoteVectorStore(index_client) if index_client is not None else VectorStore()